@@ -1,47 +1,143 @@
-import json, os, random, re
+import collections, os, random, threading
 from dotenv import load_dotenv
-from openai import OpenAI
 from construction import CONSTRUCTION_DATA  # Ensure construction.py exists with project data
+from memory_store import AsyncWriter, MemoryStore, TAIL_TURNS
+from classifier import classify
+from project_store import ProjectStore
+from session import SessionManager
+from llm import MODEL, StreamMetrics, stream_completion
+from response_cache import ResponseCache
+from context_window import ContextWindow, RECENT_MESSAGES
+from replies import ProjectReplies, change_notice, compile_fixed, tts_safe
+from backends import BACKENDS, BackendUnavailable, LLM_TIMEOUT
+import metrics
 
 # ---- Load environment ----
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
-MEMORY_FILE = "memory.json"
+client = None  # built by get_client() on first use; tests may assign a stub here
+_client_checked = False
+_client_lock = threading.Lock()
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", MODEL)
+# Project data: CONSTRUCTION_DATA unless RIVERDALE_PROJECTS points at a .json or SQLite file
+PROJECTS_FILE = os.getenv("RIVERDALE_PROJECTS")
+PROJECTS = ProjectStore.load(PROJECTS_FILE) if PROJECTS_FILE else ProjectStore(CONSTRUCTION_DATA)
+# Live updates on top of that: a feed directory or SQLite file (project_feed.py)
+PROJECT_FEED = os.getenv("RIVERDALE_PROJECT_FEED")
+SESSIONS = SessionManager()
+MEMORY_FILE = "memory.json"  # legacy whole-file format, imported once into the log
+# Searchable copy of the history (history_index.py); RIVERDALE_HISTORY_INDEX=0 turns it off
+HISTORY_INDEX = os.getenv("RIVERDALE_HISTORY_INDEX", "history.db")
+_store = None
+_writer = None
+_store_lock = threading.Lock()
+
+
+def get_client():
+    """
+    The process-wide OpenAI client, or None without an API key. The openai
+    package is only imported here, so importing ai_core stays cheap. One instance
+    keeps its connection pool across turns; it fails fast and leaves retrying to
+    the "llm" circuit breaker.
+    """
+    global client, _client_checked
+    if not _client_checked:
+        with _client_lock:
+            if not _client_checked:
+                if client is None and OPENAI_API_KEY:
+                    from openai import OpenAI
+                    client = OpenAI(api_key=OPENAI_API_KEY, timeout=LLM_TIMEOUT, max_retries=0)
+                _client_checked = True
+    return client
+
+
+def _probe_llm():
+    llm = get_client()
+    if llm is None:
+        raise BackendUnavailable("no API key")
+    llm.models.list()
+
+
+BACKENDS.register("llm", probe=_probe_llm)
 
 
 # ---------------- MEMORY ----------------
-def load_memory():
+def memory_store():
+    global _store, _writer
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = MemoryStore()
+                store.import_legacy(MEMORY_FILE)
+                index = _history_index()
+                _writer = AsyncWriter(store, [index.add] if index else [])
+                if index is not None:
+                    # Turns logged before the index existed (memory.json's included) go in once,
+                    # on the writer thread and ahead of any live turn
+                    _writer.call(lambda: index.backfill(store))
+                _store = store
+    return _store
+
+
+def _history_index():
+    if HISTORY_INDEX in ("", "0"):
+        return None
     try:
-        with open(MEMORY_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-            f.write("[]")
+        from history_index import HistoryIndex
+        return HistoryIndex(HISTORY_INDEX)
+    except Exception as e:
+        print("⚠️ History index unavailable:", e)
+        return None
+
+
+def flush_memory():
+    """Wait for queued writes to reach disk (shutdown, tests, benchmarks)."""
+    if _writer is not None:
+        _writer.flush()
+
+
+def load_memory(limit=TAIL_TURNS):
+    """Load only the most recent `limit` entries of the conversation log."""
+    try:
+        store = memory_store()
+        memory = store.tail(limit)
+        store.synced = len(memory)
+        return memory
+    except Exception as e:
+        print("⚠️ Error loading memory:", e)
         return []
 
 
-def save_memory(memory):
+def save_memory(memory, new_entries=None):
+    """
+    Queue this turn's entries (or anything unsynced in `memory`) for the log.
+    All disk writes go through one writer thread, so concurrent turns never interleave.
+    """
     try:
-        with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-            json.dump(memory, f, indent=2, ensure_ascii=False)
+        store = memory_store()
+        if new_entries is None:
+            new_entries = memory[min(store.synced, len(memory)):]
+        _writer.submit(new_entries)
+        store.synced = len(memory)
     except Exception as e:
         print("⚠️ Error saving memory:", e)
 
 
+def trim_memory(memory, keep=TAIL_TURNS):
+    """Keep only the newest `keep` entries in RAM; older turns live in the on-disk log."""
+    excess = len(memory) - keep
+    if excess > 0:
+        del memory[:excess]
+        memory_store().synced = len(memory)
+
+
 # ---------------- LANGUAGE DETECTION ----------------
 def detect_hindi_text(text):
-    return any("\u0900" <= ch <= "\u097F" for ch in (text or ""))
+    return classify(text).lang_mode == "hindi"
 
 
 def detect_hinglish(text):
-    if detect_hindi_text(text):
-        return False
-    hinglish_words = [
-        "kya", "hai", "nahi", "kaise", "batao", "bolo", "kar", "mera", "tum", "aap",
-        "hain", "tha", "abhi", "ek", "achha", "thoda", "ha", "haan", "bhi"
-    ]
-    return any(re.search(rf"\b{word}\b", text.lower()) for word in hinglish_words)
+    return classify(text).lang_mode == "hinglish"
 
 
 # ---------------- PROMPT ----------------
@@ -57,166 +153,294 @@ def build_system_prompt():
 
 # ---------------- INTENT CLASSIFIER ----------------
 def classify_intent(user_input: str):
-    text = (user_input or "").lower()
-    construction_keywords = [
-        "cement", "plumbing", "floor", "paint", "construction", "update", "project",
-        "roof", "site", "status", "work", "tiles", "foundation", "brick", "sand"
-    ]
-    fun_keywords = ["joke", "funny", "hello", "hi", "how are you", "namaste", "thanks", "thank you"]
-    restricted_keywords = [
-        "gaza", "war", "politics", "religion", "israel", "palestine", "biden",
-        "modi", "trump", "attack", "terror", "violence"
-    ]
-
-    if any(word in text for word in restricted_keywords):
-        return "restricted"
-    elif any(word in text for word in construction_keywords):
-        return "construction"
-    elif any(word in text for word in fun_keywords):
-        return "fun"
-    else:
-        return "general"
+    """restricted / construction / fun / general (see classifier.py for the keyword tables)."""
+    return classify(user_input).intent
 
 
 # ---------------- CLEAN OUTPUT ----------------
 def clean_output(text):
-    """Remove unwanted characters (like asterisks) for TTS."""
-    return re.sub(r"[*]", "", text)
+    """Remove unwanted characters (like asterisks) for TTS. Only model output needs this per reply."""
+    return tts_safe(text)
 
 
 # ---------------- CONSTRUCTION REPLY ----------------
 def construction_reply(project_id, user_input, lang_mode):
-    project = CONSTRUCTION_DATA.get(project_id)
-    if not project:
-        return clean_output({
-            "hindi": "क्षमा करें, ऐसा कोई प्रोजेक्ट नहीं मिला।",
-            "hinglish": "Sorry, aisa koi project nahi mila.",
-            "english": "Sorry, no such project found."
-        }[lang_mode])
-
-    input_lower = user_input.lower()
-
-    # Check in-progress tasks
-    for task, prog in project.get("in_progress", {}).items():
-        if task.lower() in input_lower:
-            return clean_output({
-                "hindi": f"🏗️ {project['name']} — {task} {prog}% पूरा हुआ है।",
-                "hinglish": f"🏗️ {project['name']} — {task} {prog}% complete hai.",
-                "english": f"🏗️ Project Update — {project['name']}\n{task}: {prog}% done."
-            }[lang_mode])
-
-    # Check completed
-    for task in project.get("completed", []):
-        if task.lower() in input_lower:
-            return clean_output({
-                "hindi": f"🏗️ {project['name']} — {task} काम पूरा हो चुका है।",
-                "hinglish": f"🏗️ {project['name']} — {task} kaam complete ho chuka hai.",
-                "english": f"🏗️ Project Update — {project['name']}\n{task}: Completed."
-            }[lang_mode])
-
-    # Check pending
-    for task in project.get("pending", []):
-        if task.lower() in input_lower:
-            return clean_output({
-                "hindi": f"🏗️ {project['name']} — {task} अभी लंबित है।",
-                "hinglish": f"🏗️ {project['name']} — {task} abhi pending hai.",
-                "english": f"🏗️ Project Update — {project['name']}\n{task}: Pending."
-            }[lang_mode])
-
-    # Full project summary
-    in_prog = project.get("in_progress", {})
-    if in_prog:
-        current_task, current_progress = next(iter(in_prog.items()))
-    else:
-        current_task, current_progress = "N/A", 0
-
-    return clean_output({
-        "hindi": f"🏗️ {project['name']} का प्रोजेक्ट {project['progress']}% पूरा हुआ है.\n"
-                 f"वर्तमान काम: {current_task} ({current_progress}%)\n"
-                 f"✅ पूरा हुआ: {', '.join(project['completed'])}\n"
-                 f"⏳ लंबित: {', '.join(project['pending'])}\n"
-                 f"📊 स्थिति: {project['status']}",
-        "hinglish": f"🏗️ {project['name']} ka project {project['progress']}% complete hai.\n"
-                    f"Current work: {current_task} ({current_progress}%)\n"
-                    f"✅ Completed: {', '.join(project['completed'])}\n"
-                    f"⏳ Pending: {', '.join(project['pending'])}\n"
-                    f"📊 Status: {project['status']}",
-        "english": f"🏗️ Project Update — {project['name']}\n"
-                   f"Overall progress: {project['progress']}%\n"
-                   f"🔧 {current_task} ({current_progress}% done)\n"
-                   f"✅ Completed: {', '.join(project['completed'])}\n"
-                   f"⏳ Pending: {', '.join(project['pending'])}\n"
-                   f"📊 Status: {project['status']}"
-    }[lang_mode])
+    if project_id not in PROJECTS:
+        return _LOCAL_REPLIES["project_not_found"][lang_mode]
+
+    # Task the user asked about (stems and synonyms: "cementing", "plumbing kaisa hai")
+    match = PROJECTS.find_task(project_id, user_input)
+    if match:
+        task, state, prog = match
+        return REPLIES.task(project_id, task, state, prog, lang_mode)
+
+    # Full project summary (cached per project and language until its data changes)
+    return REPLIES.summary(project_id, lang_mode)
 
 
 # ---------------- LOCAL RESPONSES ----------------
-def local_response(user_input, lang_mode):
-    intent = classify_intent(user_input)
+# Fixed replies, one per language mode (also pre-rendered by `tts_cache.py warm`)
+LOCAL_REPLIES = {
+    "restricted": {
+        "hindi": "माफ कीजिए, मैं इस विषय पर चर्चा नहीं कर सकती। क्या आप साइट अपडेट जानना चाहेंगे?",
+        "hinglish": "Sorry yaar, main uss topic pe baat nahi kar sakti. Site ka update sunoge?",
+        "english": "I’m sorry, I can’t discuss that topic. Would you like a construction update instead?"
+    },
+    "ask_project": {
+        "hindi": "कृपया अपना प्रोजेक्ट ID दें ताकि मैं अपडेट साझा कर सकूं।",
+        "hinglish": "Please apna project ID do taki main update share kar saku.",
+        "english": "Please provide your project ID or name so I can share the update."
+    },
+    "greeting": {
+        "hindi": "नमस्ते जी! आपका दिन कैसा जा रहा है?",
+        "hinglish": "Heyy! Aaj kaam kaisa chal raha hai site pe?",
+        "english": "Hey there! How’s your day going at the site?"
+    },
+    "general": {
+        "hindi": "मैं आपकी साइट अपडेट या किसी भी काम से जुड़ी जानकारी दे सकती हूँ। बताइए क्या जानना चाहेंगे?",
+        "hinglish": "Main aapko site updates ya construction info de sakti hoon. Kya jaana chahoge?",
+        "english": "I can help with your project updates or share a light joke. What would you like to know?"
+    },
+    "project_not_found": {
+        "hindi": "क्षमा करें, ऐसा कोई प्रोजेक्ट नहीं मिला।",
+        "hinglish": "Sorry, aisa koi project nahi mila.",
+        "english": "Sorry, no such project found."
+    },
+}
+
+JOKES = {
+    "hindi": ["एक दीवार ने दूसरी दीवार से क्या कहा? 'कोने पर मिलते हैं!' 😂"],
+    "hinglish": ["Ek wall ne doosri wall se bola — ‘corner pe milte hain!’ 😂"],
+    "english": ["Why did the scarecrow win an award? Because he was outstanding in his field!"]
+}
+
+# TTS-safe copies, stripped once here instead of on every reply
+_LOCAL_REPLIES = compile_fixed(LOCAL_REPLIES)
+_JOKES = compile_fixed(JOKES)
+REPLIES = ProjectReplies(PROJECTS)
+
+
+def local_response(user_input, lang_mode, classification=None):
+    classification = classification or classify(user_input)
+    intent = classification.intent
 
     if intent == "restricted":
-        return clean_output({
-            "hindi": "माफ कीजिए, मैं इस विषय पर चर्चा नहीं कर सकती। क्या आप साइट अपडेट जानना चाहेंगे?",
-            "hinglish": "Sorry yaar, main uss topic pe baat nahi kar sakti. Site ka update sunoge?",
-            "english": "I’m sorry, I can’t discuss that topic. Would you like a construction update instead?"
-        }[lang_mode])
+        return _LOCAL_REPLIES["restricted"][lang_mode]
 
     if intent == "construction":
-        return clean_output({
-            "hindi": "कृपया अपना प्रोजेक्ट ID दें ताकि मैं अपडेट साझा कर सकूं।",
-            "hinglish": "Please apna project ID do taki main update share kar saku.",
-            "english": "Please provide your project ID or name so I can share the update."
-        }[lang_mode])
+        return _LOCAL_REPLIES["ask_project"][lang_mode]
 
     if intent == "fun":
-        jokes = {
-            "hindi": ["एक दीवार ने दूसरी दीवार से क्या कहा? 'कोने पर मिलते हैं!' 😂"],
-            "hinglish": ["Ek wall ne doosri wall se bola — ‘corner pe milte hain!’ 😂"],
-            "english": ["Why did the scarecrow win an award? Because he was outstanding in his field!"]
-        }
-        if "joke" in user_input.lower() or "batao" in user_input.lower():
-            return clean_output(random.choice(jokes[lang_mode]))
-        return clean_output({
-            "hindi": "नमस्ते जी! आपका दिन कैसा जा रहा है?",
-            "hinglish": "Heyy! Aaj kaam kaisa chal raha hai site pe?",
-            "english": "Hey there! How’s your day going at the site?"
-        }[lang_mode])
-
-    return clean_output({
-        "hindi": "मैं आपकी साइट अपडेट या किसी भी काम से जुड़ी जानकारी दे सकती हूँ। बताइए क्या जानना चाहेंगे?",
-        "hinglish": "Main aapko site updates ya construction info de sakti hoon. Kya jaana chahoge?",
-        "english": "I can help with your project updates or share a light joke. What would you like to know?"
-    }[lang_mode])
+        if classification.wants_joke:
+            return random.choice(_JOKES[lang_mode])
+        return _LOCAL_REPLIES["greeting"][lang_mode]
+
+    return _LOCAL_REPLIES["general"][lang_mode]
+
+
+# ---------------- ONLINE (LLM) RESPONSES ----------------
+last_stream_metrics = None
+# Repeated questions skip the round trip; a project's entries go when its data changes
+RESPONSE_CACHE = ResponseCache()
+PROJECTS.subscribe(RESPONSE_CACHE.invalidate_project)
+
+
+# ---------------- LIVE PROJECT UPDATES ----------------
+_feed = None
+_notice_listeners = []
+_active_users = collections.Counter()  # user -> open GUI windows / WebSockets
+_active_lock = threading.Lock()
+
+
+def subscribe_notices(callback):
+    """callback(user, project_id, text) whenever the project an attached user is on changes under them."""
+    _notice_listeners.append(callback)
+
+
+def attach_user(user):
+    """A window or socket for `user` opened; only attached users are told about project changes."""
+    with _active_lock:
+        _active_users[user] += 1
+
+
+def detach_user(user):
+    with _active_lock:
+        _active_users[user] -= 1
+        if _active_users[user] <= 0:
+            del _active_users[user]
+
+
+def _notify_sessions(pid, data, old):
+    """Tell each attached user on `pid` what changed, in their own language (runs on the feed thread)."""
+    if not _notice_listeners or data is None or not _active_users:
+        return
+    if _feed is not None and _feed.catching_up:
+        return  # replaying feed files from before this launch; nobody needs those as news
+    with _active_lock:
+        users = list(_active_users)
+    for user in users:
+        session = SESSIONS.find(user)
+        if session is None or session.project_id != pid:
+            continue
+        text = change_notice(old, data, session.lang_mode or "hinglish")
+        if not text:
+            continue
+        metrics.inc("project_notices_total")
+        for callback in list(_notice_listeners):
+            try:
+                callback(user, pid, text)
+            except Exception as e:
+                print("⚠️ Notice listener error:", e)
+
+
+PROJECTS.subscribe(_notify_sessions)
+
+
+def start_feed(path=None):
+    """Watch the project feed (default RIVERDALE_PROJECT_FEED) in the background; None if there is none."""
+    global _feed
+    path = path or PROJECT_FEED
+    if _feed is None and path:
+        from project_feed import ProjectFeed
+        _feed = ProjectFeed(PROJECTS, path)
+        _feed.start()
+    return _feed
+
+
+MAX_CONTEXTS = 256  # users with a live prompt context; the rest are rebuilt from their history
+_contexts = collections.OrderedDict()  # user -> ContextWindow, least recently used first
+_contexts_lock = threading.Lock()
+
+
+def forget_user(user, keep_session=True):
+    """Drop a user's prompt context (and, with keep_session=False, their Session) from RAM."""
+    with _contexts_lock:
+        _contexts.pop(user, None)
+    if not keep_session:
+        SESSIONS.discard(user)
+
+
+def context_for(session, memory=()):
+    """The session's bounded prompt context, seeded from the loaded history on first use."""
+    with _contexts_lock:
+        window = _contexts.get(session.user)
+        if window is not None:
+            _contexts.move_to_end(session.user)
+            return window
+        window = _contexts[session.user] = ContextWindow(build_system_prompt())
+        while len(_contexts) > MAX_CONTEXTS:
+            _contexts.popitem(last=False)
+    for m in memory[-RECENT_MESSAGES:]:
+        window.add(m.get("role"), m.get("content"))
+    return window
+
+
+def online_reply(messages, on_token=None, on_sentence=None, cache_key=None):
+    """
+    Stream a model answer for questions the templates can't handle.
+    Served from RESPONSE_CACHE when `cache_key` was answered before; only complete,
+    successful replies are cached. Returns None when offline (no key, or the "llm"
+    breaker is open) or when the call fails; text streamed before a mid-reply failure
+    is dropped, so the turn falls back to local_response instead of keeping half an answer.
+    """
+    global last_stream_metrics
+    llm = get_client()
+    if llm is None:
+        return None
+    if cache_key is not None:
+        cached = RESPONSE_CACHE.get(cache_key)
+        if cached:
+            return cached
+    breaker = BACKENDS["llm"]
+    if not breaker.allow():
+        metrics.inc("breaker_rejections_total", backend="llm")
+        return None
+    parts = []
+
+    def collect(token):
+        parts.append(token)
+        if on_token:
+            on_token(token)
+
+    stream = last_stream_metrics = StreamMetrics()
+    try:
+        with metrics.span("llm"):
+            stream_completion(llm, messages, collect, on_sentence,
+                              model=OPENAI_MODEL, metrics=stream)
+    except Exception as e:
+        print("⚠️ LLM error:", e)
+        metrics.inc("llm_errors_total")
+        breaker.record_failure()
+        if parts:
+            metrics.inc("llm_truncated_total")
+        return None
+    breaker.record_success()
+    if stream.first_token is not None:
+        metrics.observe("llm_first_token_seconds", stream.time_to_first_token)
+    reply = clean_output("".join(parts).strip()) or None
+    if reply and cache_key is not None:
+        RESPONSE_CACHE.put(cache_key, reply, stream.finished - stream.started)
+    return reply
 
 
 # ---------------- CHAT FUNCTION ----------------
-def chat_with_ai(user_input, memory):
-    memory = memory or []
-
-    # Detect language
-    if detect_hindi_text(user_input):
-        lang_mode = "hindi"
-    elif detect_hinglish(user_input):
-        lang_mode = "hinglish"
-    else:
-        lang_mode = "english"
-
-    memory.append({"role": "user", "content": user_input})
-
-    # Fetch previously selected project from memory
-    prev_project = next((m.get("project_id") for m in reversed(memory) if m.get("project_id")), None)
-
-    # Check if user entered a valid project ID
-    project_id = prev_project
-    if user_input.strip() in CONSTRUCTION_DATA:
-        project_id = user_input.strip()
-        memory.append({"role": "system", "project_id": project_id})
-        reply = construction_reply(project_id, user_input, lang_mode)
-    elif prev_project and classify_intent(user_input) == "construction":
-        reply = construction_reply(project_id, user_input, lang_mode)
-    else:
-        reply = local_response(user_input, lang_mode)
-
-    memory.append({"role": "assistant", "content": reply})
-    save_memory(memory)
+def chat_with_ai(user_input, memory, session=None, on_token=None, on_sentence=None):
+    """
+    One turn. `memory` is the append-only conversation log; everything the turn
+    needs to decide (active project, language) comes from `session`.
+    Template replies return immediately; general questions go to the model when
+    online, streaming tokens to on_token and finished sentences to on_sentence.
+    """
+    with metrics.span("turn") as turn:
+        memory = memory or []
+        session = session or SESSIONS.get()
+        window = context_for(session, memory)
+
+        # Detect language and intent in one pass
+        with metrics.span("classify"):
+            classification = classify(user_input)
+        lang_mode = classification.lang_mode
+
+        turn_start = len(memory)
+        # user/intent/project_id travel with the entries so the history index can filter on them
+        question = {"role": "user", "content": user_input, "user": session.user, "intent": classification.intent}
+        memory.append(question)
+
+        prev_project = session.project_id
+
+        # Did the user name a project (ID anywhere in the text, or the owner's name)?
+        project_id = prev_project
+        with metrics.span("reply") as stage:
+            mentioned = PROJECTS.find_project(user_input)
+            window.add("user", user_input, mentioned)
+            if mentioned:
+                project_id = mentioned
+                memory.append({"role": "system", "project_id": project_id})
+                path = "project"
+                reply = construction_reply(project_id, user_input, lang_mode)
+            elif prev_project and (classification.intent == "construction"
+                                   or PROJECTS.find_task(prev_project, user_input)):
+                path = "project"
+                reply = construction_reply(project_id, user_input, lang_mode)
+            else:
+                reply, path = None, "local"
+                if classification.intent == "general":
+                    key = ResponseCache.key(user_input, lang_mode, project_id, PROJECTS.version(project_id))
+                    reply = online_reply(window.messages(), on_token, on_sentence, key)
+                    path = "online" if reply else path
+                if not reply:
+                    reply = local_response(user_input, lang_mode, classification)
+            stage.set(path=path)
+        metrics.inc("riverdale_turns_total", path=path, lang=lang_mode)
+        turn.set(path=path, lang=lang_mode, intent=classification.intent)
+
+        question["project_id"] = project_id
+        memory.append({"role": "assistant", "content": reply, "user": session.user,
+                       "intent": classification.intent, "project_id": project_id})
+        window.add("assistant", reply)
+        with metrics.span("save_memory"):
+            save_memory(memory, memory[turn_start:])
+            trim_memory(memory)
+            session.record_turn(lang_mode, classification.intent, project_id)
+            SESSIONS.save()
     return reply, memory
@@ -0,0 +1,202 @@
+# backends.py — Miss Riverdale: network backends behind circuit breakers
+#
+# One breaker per backend ("llm", "gtts", "stt"), shared by every turn in the process.
+# While a backend is down its breaker is open and callers go straight to the offline
+# path (local_response, pyttsx3) instead of waiting out a network timeout each turn.
+# A background prober checks each backend and doubles as the half-open retry.
+#
+#   RIVERDALE_GTTS_HEALTH_URL / RIVERDALE_STT_HEALTH_URL   override the probe targets
+#   (e.g. point them, and OPENAI_BASE_URL, at fake_backend.py)
+import os, threading, time, urllib.error, urllib.request
+
+import metrics
+
+FAILURE_THRESHOLD = 3   # consecutive failures that open a breaker
+RESET_TIMEOUT = 20.0    # seconds open before one half-open trial is let through
+PROBE_INTERVAL = 15.0
+PROBE_TIMEOUT = 3.0
+LLM_TIMEOUT = 20.0      # per request, for the shared OpenAI client
+
+GTTS_HEALTH_URL = os.getenv("RIVERDALE_GTTS_HEALTH_URL", "https://translate.google.com/")
+STT_HEALTH_URL = os.getenv("RIVERDALE_STT_HEALTH_URL", "http://www.google.com/speech-api/v2/recognize")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class BackendUnavailable(Exception):
+    """The backend's breaker is open; take the offline path."""
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through; FAILURE_THRESHOLD failures in a row open the breaker.
+    open: allow() is False until `reset_timeout` has passed, then one trial call
+    (half-open) is let through — success closes the breaker, failure re-opens it.
+    subscribe() callbacks get (name, state) on every transition.
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT,
+                 clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_at = None   # when the half-open trial was handed out
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    @property
+    def state(self):
+        return self._state
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def _set(self, state):
+        """Call with the lock held; returns the listeners to notify once it is released."""
+        if state == self._state:
+            return ()
+        self._state = state
+        metrics.inc("breaker_transitions_total", backend=self.name, state=state)
+        return list(self._listeners)
+
+    def _notify(self, listeners, state):
+        for callback in listeners:
+            try:
+                callback(self.name, state)
+            except Exception as e:
+                print("⚠️ Breaker listener error:", e)
+
+    def allow(self):
+        """True if a call may go out now (closed, or this caller gets the half-open trial)."""
+        if self._state == CLOSED:
+            return True
+        listeners = ()
+        with self._lock:
+            now = self.clock()
+            if self._state == OPEN and now - self._opened_at < self.reset_timeout:
+                return False
+            # A trial whose caller never reported back expires after another reset_timeout
+            if self._trial_at is not None and now - self._trial_at < self.reset_timeout:
+                return False
+            self._trial_at = now
+            listeners = self._set(HALF_OPEN)
+        self._notify(listeners, HALF_OPEN)
+        return True
+
+    def record_success(self):
+        if self._state == CLOSED and not self.failures:
+            return
+        with self._lock:
+            self.failures = 0
+            self._trial_at = None
+            listeners = self._set(CLOSED)
+        self._notify(listeners, CLOSED)
+
+    def record_failure(self):
+        listeners = ()
+        with self._lock:
+            self.failures += 1
+            self._trial_at = None
+            if self._state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+                listeners = self._set(OPEN)
+        self._notify(listeners, OPEN)
+
+    def call(self, fn, *args, **kwargs):
+        """fn(*args) through the breaker; raises BackendUnavailable without calling it when open."""
+        if not self.allow():
+            metrics.inc("breaker_rejections_total", backend=self.name)
+            raise BackendUnavailable(f"{self.name} is offline")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+def http_probe(url, timeout=PROBE_TIMEOUT):
+    """Healthy when the host answers at all below 500 (a 4xx still means it is reachable)."""
+    try:
+        urllib.request.urlopen(urllib.request.Request(url, method="HEAD"), timeout=timeout).close()
+    except urllib.error.HTTPError as e:
+        if e.code >= 500:
+            raise
+
+
+class Backends:
+    """Named breakers plus the probe for each, and the background prober thread."""
+
+    def __init__(self, interval=PROBE_INTERVAL):
+        self.interval = interval
+        self._breakers = {}
+        self._probes = {}
+        self._listeners = []
+        self._prober = None
+        self._stop = threading.Event()
+
+    def register(self, name, probe=None, **breaker_args):
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers[name] = CircuitBreaker(name, **breaker_args)
+            for callback in self._listeners:
+                breaker.subscribe(callback)
+        if probe is not None:
+            self._probes[name] = probe
+        return breaker
+
+    def __getitem__(self, name):
+        return self._breakers.get(name) or self.register(name)
+
+    def allow(self, name):
+        return self[name].allow()
+
+    def states(self):
+        return {name: breaker.state for name, breaker in self._breakers.items()}
+
+    def subscribe(self, callback):
+        """callback(name, state) on any breaker's transitions, including ones registered later."""
+        self._listeners.append(callback)
+        for breaker in self._breakers.values():
+            breaker.subscribe(callback)
+
+    def probe(self, name):
+        """Run one probe if the breaker allows a call (closed, or due for its half-open retry)."""
+        probe, breaker = self._probes.get(name), self[name]
+        if probe is None or not breaker.allow():
+            return
+        with metrics.span("probe", backend=name):
+            try:
+                probe()
+            except Exception:
+                breaker.record_failure()
+                return
+        breaker.record_success()
+
+    def probe_all(self):
+        for name in list(self._probes):
+            self.probe(name)
+
+    def start_prober(self):
+        if self._prober is None:
+            self._prober = threading.Thread(target=self._run, name="backend-prober", daemon=True)
+            self._prober.start()
+
+    def stop_prober(self):
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            self.probe_all()
+            if self._stop.wait(self.interval):
+                return
+
+
+BACKENDS = Backends()
+BACKENDS.register("gtts", probe=lambda: http_probe(GTTS_HEALTH_URL))
+BACKENDS.register("stt", probe=lambda: http_probe(STT_HEALTH_URL))
@@ -0,0 +1,1034 @@
+# bench.py — Miss Riverdale: local benchmarks (no network, no audio device)
+import argparse, json, os, random, re, shutil, statistics, subprocess, sys, tempfile, threading, time, tracemalloc
+
+from classifier import classify, classify_batch
+from context_window import ContextWindow, estimate_tokens
+from llm import SentenceStream, StreamMetrics, StubLLMClient, stream_completion
+from memory_store import MemoryStore
+from playback import PlaybackEngine
+from project_store import ProjectStore
+from stt import RecognitionPipeline, StubBackend
+from turn_queue import TurnScheduler
+
+
+def _fmt_us(seconds):
+    return f"{seconds * 1e6:9.1f} µs"
+
+
+def _sample_turn(i):
+    return [
+        {"role": "user", "content": f"how is plumbing going {i}"},
+        {"role": "assistant", "content": "🏗️ Project Update — Ramesh\nElectrical and Plumbing: 20% done."},
+    ]
+
+
+# ---------------- MEMORY ----------------
+def bench_memory(sizes=(100, 1000, 10000), samples=50):
+    """Per-turn write cost: whole-file memory.json rewrite vs. segmented append."""
+    tmp = tempfile.mkdtemp(prefix="riverdale_bench_")
+    try:
+        print(f"{'history':>8} | {'rewrite memory.json':>20} | {'append log':>14}")
+        for size in sizes:
+            history = [e for i in range(size // 2) for e in _sample_turn(i)]
+
+            legacy_path = os.path.join(tmp, "memory.json")
+            legacy = []
+            for i in range(samples):
+                history.extend(_sample_turn(size + i))
+                t0 = time.perf_counter()
+                with open(legacy_path, "w", encoding="utf-8") as f:
+                    json.dump(history, f, indent=2, ensure_ascii=False)
+                legacy.append(time.perf_counter() - t0)
+
+            store = MemoryStore(os.path.join(tmp, f"log_{size}"))
+            store.append(history)
+            appended = []
+            for i in range(samples):
+                turn = _sample_turn(size + samples + i)
+                t0 = time.perf_counter()
+                store.append(turn)
+                appended.append(time.perf_counter() - t0)
+            store.close()
+
+            print(f"{size:>8} | {_fmt_us(statistics.median(legacy)):>20} | {_fmt_us(statistics.median(appended)):>14}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+# ---------------- TURN PIPELINE ----------------
+def stress_turns(senders=50, per_sender=10, sessions=5):
+    """
+    Fire senders*per_sender concurrent sends across a few sessions through the real
+    chat_with_ai (model stubbed, files in a temp dir) and check, per session, that the
+    log holds its turns in send order with every question answered, that the in-RAM
+    history matches the log, and that the session ended on the last project it named.
+    """
+    import ai_core
+    from replay import _stub_engines
+    from session import SessionManager
+
+    tmp = tempfile.mkdtemp(prefix="riverdale_stress_")
+    cwd = os.getcwd()
+    os.chdir(tmp)  # memory_log/, history.db and session.json land in the temp dir
+    try:
+        _stub_engines(ai_core, None)
+        ai_core.SESSIONS = SessionManager(os.path.join(tmp, "session.json"))
+        ai_core.memory_store()
+        histories = {f"user{s}": [] for s in range(sessions)}
+        sent = {sid: [] for sid in histories}
+        sent_lock = threading.Lock()
+        spoken = []
+        texts = ["RW00123 update", "RW00124 ka status", "RW00125", "roofing kaisa hai", "hello",
+                 "what is curing of concrete", "plumbing update", "tell me a joke"]
+
+        def handler(session_id, text):
+            reply, histories[session_id] = ai_core.chat_with_ai(
+                text, histories[session_id], ai_core.SESSIONS.get(session_id))
+            return reply
+
+        turns = TurnScheduler(handler, on_speak=spoken.append, workers=4, max_pending=10_000)
+
+        def sender(n):
+            rng = random.Random(n)
+            for i in range(per_sender):
+                sid = f"user{rng.randrange(sessions)}"
+                with sent_lock:  # record order == queue order for the same session
+                    text = f"{rng.choice(texts)} #{n}-{i}"  # unique, so nothing is coalesced
+                    assert turns.submit(sid, text)
+                    sent[sid].append(text)
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=sender, args=(n,)) for n in range(senders)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        turns.join()
+        ai_core.flush_memory()
+        elapsed = time.perf_counter() - t0
+
+        ok = True
+        logged = list(ai_core.memory_store().iter_all())
+        for sid, memory in histories.items():
+            mine = [e for e in logged if e.get("user") == sid]
+            in_order = [e["content"] for e in mine if e["role"] == "user"] == sent[sid]
+            answered = all(e["role"] == ("user" if i % 2 == 0 else "assistant") and e.get("content")
+                           for i, e in enumerate(mine))
+            chat = [e for e in memory if e.get("user") == sid]
+            matches_log = [e["content"] for e in chat] == [e["content"] for e in mine[-len(chat):]] if chat else not mine
+            named = [ai_core.PROJECTS.find_project(text) for text in sent[sid]]
+            named = [pid for pid in named if pid]
+            project_ok = not named or ai_core.SESSIONS.get(sid).project_id == named[-1]
+            consistent = in_order and answered and matches_log and project_ok
+            ok &= consistent
+            print(f"{sid}: {len(sent[sid]):4d} turns  {'ok' if consistent else 'MISMATCH'}"
+                  + ("" if consistent else f"  order={in_order} answered={answered} ram={matches_log} "
+                                           f"project={project_ok}"))
+        total = senders * per_sender
+        print(f"{total} sends in {elapsed:.2f}s ({total / elapsed:.0f} turns/s), "
+              f"spoken {len(spoken)}, stats {dict(turns.stats)}")
+        turns.close()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+    if not ok:
+        raise SystemExit("history inconsistent")
+
+
+# ---------------- TTS PLAYBACK ----------------
+_REPLY_PHRASES = [
+    "🏗️ Project Update — Ramesh", "Overall progress: 55%", "Structural Framing (70% done)",
+    "Completed: Foundation", "Pending: Painting, Flooring", "Status: On Schedule",
+]
+
+
+def bench_tts(synth_latency=0.25, clip_seconds=0.4):
+    """Stub synthesizer/player: strictly sequential loop vs. the prefetching engine."""
+    def synth(phrase, lang):
+        time.sleep(synth_latency)  # stands in for the gTTS round trip
+        return phrase.encode("utf-8")
+
+    def play(audio, cancel):
+        cancel.wait(clip_seconds)
+
+    # Old speak(): synthesize, play, repeat
+    t0 = time.perf_counter()
+    first, gaps, last_end = None, [], None
+    for phrase in _REPLY_PHRASES:
+        audio = synth(phrase, "en")
+        now = time.perf_counter()
+        if first is None:
+            first = now - t0
+        else:
+            gaps.append(now - last_end)
+        play(audio, threading.Event())
+        last_end = time.perf_counter()
+    sequential_total = time.perf_counter() - t0
+
+    engine = PlaybackEngine(synth, play)
+    t0 = time.perf_counter()
+    metrics = engine.speak(_REPLY_PHRASES)
+    pipelined_total = time.perf_counter() - t0
+    engine.close()
+
+    print(f"{'':12} | {'first audio':>12} | {'mean gap':>10} | {'total':>8}")
+    print(f"{'sequential':12} | {first * 1000:9.0f} ms | {statistics.mean(gaps) * 1000:7.0f} ms | {sequential_total:6.2f} s")
+    print(f"{'pipelined':12} | {metrics.time_to_first_audio * 1000:9.0f} ms | {metrics.mean_gap * 1000:7.0f} ms | {pipelined_total:6.2f} s")
+
+
+# ---------------- CLASSIFIER ----------------
+def _legacy_classify(text):
+    """The per-turn scans ai_core did before classifier.py (kept here as the baseline)."""
+    hindi = any("\u0900" <= ch <= "\u097F" for ch in (text or ""))
+    hinglish_words = ["kya", "hai", "nahi", "kaise", "batao", "bolo", "kar", "mera", "tum", "aap",
+                      "hain", "tha", "abhi", "ek", "achha", "thoda", "ha", "haan", "bhi"]
+    hinglish = not hindi and any(re.search(rf"\b{w}\b", text.lower()) for w in hinglish_words)
+    lang_mode = "hindi" if hindi else "hinglish" if hinglish else "english"
+
+    lowered = (text or "").lower()
+    construction = ["cement", "plumbing", "floor", "paint", "construction", "update", "project",
+                    "roof", "site", "status", "work", "tiles", "foundation", "brick", "sand"]
+    fun = ["joke", "funny", "hello", "hi", "how are you", "namaste", "thanks", "thank you"]
+    restricted = ["gaza", "war", "politics", "religion", "israel", "palestine", "biden",
+                  "modi", "trump", "attack", "terror", "violence"]
+    intent = "general"
+    if any(w in lowered for w in restricted):
+        intent = "restricted"
+    elif any(w in lowered for w in construction):
+        intent = "construction"
+    elif any(w in lowered for w in fun):
+        intent = "fun"
+    return lang_mode, intent
+
+
+def corpus_user_turns(path="memory.json"):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [m["content"] for m in json.load(f) if m.get("role") == "user" and m.get("content")]
+    except Exception:
+        return ["hi", "how is plumbing", "tum kaise ho", "RW00124", "नमस्ते, प्रोजेक्ट अपडेट"]
+
+
+def bench_classify(rounds=2000):
+    """Legacy multi-scan detection vs. the single-pass classifier on the recorded user turns."""
+    turns = corpus_user_turns()
+    # chat_with_ai used to classify twice (once more inside local_response)
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for text in turns:
+            _legacy_classify(text)
+            _legacy_classify(text)
+    legacy = (time.perf_counter() - t0) / (rounds * len(turns))
+
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for text in turns:
+            classify(text)
+    single = (time.perf_counter() - t0) / (rounds * len(turns))
+
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        classify_batch(turns)
+    batch = (time.perf_counter() - t0) / (rounds * len(turns))
+
+    print(f"legacy (per turn)   {_fmt_us(legacy)}")
+    print(f"classify            {_fmt_us(single)}  ({legacy / single:.1f}x)")
+    print(f"classify_batch      {_fmt_us(batch)}")
+    changed = [(t, _legacy_classify(t), tuple(classify(t)[:2])) for t in turns
+               if _legacy_classify(t) != tuple(classify(t)[:2])]
+    for text, old, new in changed:
+        print(f"  {text!r}: {old} -> {new}")
+
+
+# ---------------- PROJECT STORE ----------------
+_TASKS = ["Foundation", "Walls", "Structural Framing", "Roofing", "Electrical and Plumbing",
+          "Flooring", "Painting", "Fixtures", "Plastering", "Waterproofing", "Tiling", "Windows",
+          "Doors", "False Ceiling", "Boundary Wall", "Landscaping", "Septic Tank", "Staircase",
+          "Balcony Railing", "Kitchen Platform", "Solar Panels", "Lift Installation"]
+_OWNERS = ["Ramesh", "Priya", "Amit", "Sunita", "Vikram", "Neha", "Arjun", "Kavita", "Rohit", "Meera"]
+
+
+def synthetic_projects(count=10_000, seed=7):
+    """CONSTRUCTION_DATA-shaped records: RW00001.. with ~20 tasks each."""
+    rng = random.Random(seed)
+    projects = {}
+    for i in range(1, count + 1):
+        tasks = rng.sample(_TASKS, len(_TASKS) - rng.randrange(4))
+        done, doing = rng.randrange(len(tasks) - 3), rng.randrange(1, 4)
+        projects[f"RW{i:05d}"] = {
+            "name": f"{rng.choice(_OWNERS)} {i}",
+            "progress": rng.randrange(101),
+            "in_progress": {t: rng.randrange(100) for t in tasks[done:done + doing]},
+            "completed": tasks[:done],
+            "pending": tasks[done + doing:],
+            "status": rng.choice(["On Schedule", "Slight Delay"]),
+        }
+    return projects
+
+
+def _legacy_find_task(project, text):
+    lowered = text.lower()
+    for state in ("in_progress", "completed", "pending"):
+        for task in project.get(state, []):
+            if task.lower() in lowered:
+                return task
+    return None
+
+
+def bench_projects(count=10_000, lookups=20_000):
+    """Index build time and per-lookup latency at `count` projects vs. the old linear scans."""
+    data = synthetic_projects(count)
+    t0 = time.perf_counter()
+    store = ProjectStore(data)
+    build = time.perf_counter() - t0
+
+    rng = random.Random(1)
+    pids = list(data)
+    queries = [(rng.choice(pids), rng.choice(["how is plumbing", "cementing kaisa hai", "roofing update",
+                                              "painting kab hoga", "tiles", "hello"])) for _ in range(lookups)]
+    mentions = [f"update for {rng.choice(pids)} please" for _ in range(lookups)]
+
+    t0 = time.perf_counter()
+    for text in mentions:
+        text.strip() in data  # old chat_with_ai: only an exact match selects a project
+    legacy_id = (time.perf_counter() - t0) / lookups
+    t0 = time.perf_counter()
+    hits = sum(1 for text in mentions if store.find_project(text))
+    find_id = (time.perf_counter() - t0) / lookups
+
+    t0 = time.perf_counter()
+    for pid, text in queries:
+        _legacy_find_task(data[pid], text)
+    legacy_task = (time.perf_counter() - t0) / lookups
+    t0 = time.perf_counter()
+    for pid, text in queries:
+        store.find_task(pid, text)
+    find_task = (time.perf_counter() - t0) / lookups
+
+    t0 = time.perf_counter()
+    store.projects_with_task("plumbing")
+    across = time.perf_counter() - t0
+
+    print(f"{count} projects indexed in {build:.2f}s")
+    print(f"find_project (ID in text)  {_fmt_us(find_id)}  resolved {hits}/{lookups} (exact-match only: {_fmt_us(legacy_id)})")
+    print(f"find_task                  {_fmt_us(find_task)}  (substring scan: {_fmt_us(legacy_task)})")
+    print(f"projects_with_task         {_fmt_us(across)}")
+
+
+# ---------------- REPLY TEMPLATES ----------------
+def _legacy_summary(project, lang_mode):
+    """construction_reply's summary before replies.py: all three languages, then a regex."""
+    in_prog = project.get("in_progress", {})
+    current_task, current_progress = next(iter(in_prog.items())) if in_prog else ("N/A", 0)
+    return re.sub(r"[*]", "", {
+        "hindi": f"🏗️ {project['name']} का प्रोजेक्ट {project['progress']}% पूरा हुआ है.\n"
+                 f"वर्तमान काम: {current_task} ({current_progress}%)\n"
+                 f"✅ पूरा हुआ: {', '.join(project['completed'])}\n"
+                 f"⏳ लंबित: {', '.join(project['pending'])}\n"
+                 f"📊 स्थिति: {project['status']}",
+        "hinglish": f"🏗️ {project['name']} ka project {project['progress']}% complete hai.\n"
+                    f"Current work: {current_task} ({current_progress}%)\n"
+                    f"✅ Completed: {', '.join(project['completed'])}\n"
+                    f"⏳ Pending: {', '.join(project['pending'])}\n"
+                    f"📊 Status: {project['status']}",
+        "english": f"🏗️ Project Update — {project['name']}\n"
+                   f"Overall progress: {project['progress']}%\n"
+                   f"🔧 {current_task} ({current_progress}% done)\n"
+                   f"✅ Completed: {', '.join(project['completed'])}\n"
+                   f"⏳ Pending: {', '.join(project['pending'])}\n"
+                   f"📊 Status: {project['status']}"
+    }[lang_mode])
+
+
+def _legacy_task(project, task, progress, lang_mode):
+    return re.sub(r"[*]", "", {
+        "hindi": f"🏗️ {project['name']} — {task} {progress}% पूरा हुआ है।",
+        "hinglish": f"🏗️ {project['name']} — {task} {progress}% complete hai.",
+        "english": f"🏗️ Project Update — {project['name']}\n{task}: {progress}% done."
+    }[lang_mode])
+
+
+def bench_replies(count=1_000, turns=50_000):
+    """Per-turn reply rendering: build-all-languages + regex vs. compiled, cached templates."""
+    from replies import ProjectReplies
+
+    data = synthetic_projects(count)
+    store = ProjectStore(data)
+    replies = ProjectReplies(store)
+    rng = random.Random(5)
+    pids = list(data)
+    picks = [(rng.choice(pids), rng.choice(("hindi", "hinglish", "english"))) for _ in range(turns)]
+    tasks = [(pid, next(iter(data[pid]["in_progress"].items())), lang) for pid, lang in picks]
+
+    def timed(fn, items):
+        t0 = time.perf_counter()
+        for item in items:
+            fn(*item)
+        return (time.perf_counter() - t0) / len(items)
+
+    legacy_summary = timed(lambda pid, lang: _legacy_summary(data[pid], lang), picks)
+    cold = timed(replies.summary, picks[:count])
+    warm = timed(replies.summary, picks)
+    legacy_task = timed(lambda pid, tp, lang: _legacy_task(data[pid], tp[0], tp[1], lang), tasks)
+    task = timed(lambda pid, tp, lang: replies.task(pid, tp[0], "in_progress", tp[1], lang), tasks)
+    mismatched = sum(_legacy_summary(data[pid], lang) != replies.summary(pid, lang) for pid, lang in picks[:count])
+
+    print(f"{'':16} | {'before':>12} | {'templates':>12}")
+    print(f"{'summary (warm)':16} | {_fmt_us(legacy_summary):>12} | {_fmt_us(warm):>12}  ({legacy_summary / warm:.1f}x)")
+    print(f"{'summary (cold)':16} | {'':>12} | {_fmt_us(cold):>12}")
+    print(f"{'task line':16} | {_fmt_us(legacy_task):>12} | {_fmt_us(task):>12}  ({legacy_task / task:.1f}x)")
+    print(f"{mismatched} mismatched summaries, cache {replies.info()}")
+
+
+# ---------------- STREAMING LLM ----------------
+_LLM_REPLY = ("Concrete curing usually takes about seven days. During that time keep the slab moist. "
+              "Avoid heavy loads until it reaches full strength. Aur kuch poochna hai?")
+
+
+def bench_llm(first_token_delay=0.4, token_delay=0.03, synth_latency=0.15):
+    """Time to first token / first audio: wait-for-full-reply vs. sentence streaming into TTS."""
+    def synth(phrase, lang):
+        time.sleep(synth_latency)
+        return phrase.encode("utf-8")
+
+    def play(audio, cancel):
+        cancel.wait(0.02 * len(audio.split()))
+
+    messages = [{"role": "user", "content": "how long does concrete take to cure?"}]
+
+    # Before: complete the reply, then speak it
+    client = StubLLMClient(_LLM_REPLY, first_token_delay, token_delay)
+    engine = PlaybackEngine(synth, play)
+    t0 = time.perf_counter()
+    reply = client.chat.completions.create(messages=messages).choices[0].message.content
+    blocking = engine.speak(re.split(r"(?<=[.?!])\s+", reply))
+    blocking_ttfa = blocking.first_audio - t0
+
+    # After: stream tokens, speak each sentence as soon as it closes
+    client = StubLLMClient(_LLM_REPLY, first_token_delay, token_delay)
+    sentences = SentenceStream()
+    done = {}
+    speaker = threading.Thread(target=lambda: done.setdefault("m", engine.speak(sentences)))
+    metrics = StreamMetrics()
+    t0 = metrics.started
+    speaker.start()
+    try:
+        stream_completion(client, messages, on_sentence=sentences.put, metrics=metrics)
+    finally:
+        sentences.close()
+    speaker.join()
+    streaming_ttfa = done["m"].first_audio - t0
+    engine.close()
+
+    print(f"{'':10} | {'first token':>11} | {'first audio':>11}")
+    print(f"{'blocking':10} | {'—':>11} | {blocking_ttfa * 1000:8.0f} ms")
+    print(f"{'streaming':10} | {metrics.time_to_first_token * 1000:8.0f} ms | {streaming_ttfa * 1000:8.0f} ms")
+
+
+# ---------------- CONTEXT WINDOW ----------------
+def bench_context(turns=10_000, checkpoints=(10, 100, 1_000, 10_000), growth=1.25):
+    """
+    Prompt size and window memory over a long simulated session. False (with FAIL
+    lines) if the prompt ever exceeds TOKEN_BUDGET, or prompt tokens or window memory
+    at the last checkpoint exceed `growth` times their value at the second one.
+    """
+    from context_window import TOKEN_BUDGET
+
+    corpus = corpus_user_turns()
+    system = "You are Miss Riverdale — a warm, bilingual assistant for Riverwood Projects LLP. " * 3
+    window = ContextWindow(system)
+    naive_tokens = estimate_tokens(system)
+    peak = 0
+    seen = {}
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    print(f"{'turn':>7} | {'prompt tokens':>13} | {'unbounded':>10} | {'window memory':>13}")
+    for turn in range(1, turns + 1):
+        question = corpus[turn % len(corpus)]
+        answer = f"Here is the update you asked for on turn {turn}. Sab theek chal raha hai."
+        window.add("user", question, f"RW{turn % 3 + 123:05d}")
+        window.messages()
+        window.add("assistant", answer)
+        naive_tokens += estimate_tokens(question) + estimate_tokens(answer)
+        peak = max(peak, window.prompt_tokens())
+        if turn in checkpoints:
+            used = tracemalloc.get_traced_memory()[0] - base
+            seen[turn] = (window.prompt_tokens(), used)
+            print(f"{turn:>7} | {window.prompt_tokens():>13} | {naive_tokens:>10} | {used / 1024:10.1f} KiB")
+    tracemalloc.stop()
+
+    ok = peak <= TOKEN_BUDGET
+    print(f"{'ok  ' if ok else 'FAIL'}  peak prompt {peak} tokens (budget {TOKEN_BUDGET})")
+    early, late = seen[checkpoints[1]], seen[checkpoints[-1]]
+    for name, i in (("prompt tokens", 0), ("window memory", 1)):
+        flat = late[i] <= early[i] * growth
+        ok &= flat
+        print(f"{'ok  ' if flat else 'FAIL'}  {name} flat: {late[i]} at turn {checkpoints[-1]} vs {early[i]} "
+              f"at turn {checkpoints[1]} (allowed x{growth})")
+    return ok
+
+
+# ---------------- SPEECH RECOGNITION ----------------
+_UTTERANCES = {
+    "english": {"en-IN": ("how is plumbing going", 0.92), "hi-IN": ("हाउ इज़ प्लंबिंग", 0.41)},
+    "hindi": {"en-IN": ("kam kaisa chal raha", 0.48), "hi-IN": ("काम कैसा चल रहा है", 0.94)},
+    "mixed": {"en-IN": ("plumbing kaisa hai", 0.71), "hi-IN": ("प्लंबिंग कैसा है", 0.66)},
+}
+
+
+def bench_stt(latency=0.35, rounds=5):
+    """Sequential en-IN→hi-IN fallback vs. parallel recognition (stub backend, no network)."""
+    # The old listen(): hi-IN only runs when en-IN finds nothing
+    def sequential(backend, key):
+        return backend.recognize(key, "en-IN") or backend.recognize(key, "hi-IN")
+
+    print(f"{'utterance':10} | {'sequential':>10} | {'parallel':>10} | result")
+    for key in _UTTERANCES:
+        # Hindi speech often gets no English transcript at all; model that for the baseline
+        transcripts = {key: dict(_UTTERANCES[key])}
+        if key == "hindi":
+            transcripts[key].pop("en-IN")
+        backend = StubBackend(transcripts, latency={"en-IN": latency, "hi-IN": latency * 1.2})
+        pipeline = RecognitionPipeline(backend)
+
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            sequential(backend, key)
+        seq = (time.perf_counter() - t0) / rounds
+
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            best = pipeline.transcribe(key)
+        par = (time.perf_counter() - t0) / rounds
+        print(f"{key:10} | {seq * 1000:7.0f} ms | {par * 1000:7.0f} ms | {best.text} ({best.language})")
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# fixture -> (transcripts per language, expected winning language)
+_STT_FIXTURES = {
+    "plumbing.wav": (_UTTERANCES["english"], "en-IN"),
+    "kaam_kaisa.wav": (_UTTERANCES["hindi"], "hi-IN"),
+    "namaste.wav": ({"hi-IN": ("नमस्ते", 0.93), "en-IN": ("namaste", 0.61)}, "hi-IN"),
+}
+
+
+def check_stt_fixtures(latency=0.05):
+    """
+    Recorded WAV fixtures through StubBackend.from_fixtures and the real pipeline:
+    the right transcript wins, a confident answer doesn't wait for the slow language,
+    and a failing language falls back to the other. False (with FAIL lines) otherwise.
+    """
+    from stt import load_wav
+
+    paths = {name: os.path.join(FIXTURES_DIR, name) for name in _STT_FIXTURES}
+    fixtures = {paths[name]: results for name, (results, _) in _STT_FIXTURES.items()}
+    audio = {name: load_wav(path) for name, path in paths.items()}
+    ok = True
+
+    def check(label, passed):
+        nonlocal ok
+        ok &= passed
+        print(f"{'ok  ' if passed else 'FAIL'}  {label}")
+
+    pipeline = RecognitionPipeline(StubBackend.from_fixtures(fixtures))
+    for name, (results, language) in _STT_FIXTURES.items():
+        best = pipeline.transcribe(audio[name])
+        check(f"{name}: {best.text if best else None!r} ({best.language if best else None})",
+              best is not None and best.language == language and best.text == results[language][0])
+
+    slow = RecognitionPipeline(StubBackend.from_fixtures(fixtures, latency={"hi-IN": latency * 10}))
+    t0 = time.perf_counter()
+    best = slow.transcribe(audio["plumbing.wav"])
+    elapsed = time.perf_counter() - t0
+    check(f"early accept: en-IN in {elapsed * 1000:.0f} ms without waiting for hi-IN ({latency * 10000:.0f} ms)",
+          best is not None and best.language == "en-IN" and elapsed < latency * 5)
+
+    failing = RecognitionPipeline(StubBackend.from_fixtures(fixtures, fail=("en-IN",)))
+    best = failing.transcribe(audio["plumbing.wav"])
+    check(f"en-IN down: falls back to {best.text if best else None!r}",
+          best is not None and best.language == "hi-IN" and failing.last_error is None)
+    return ok
+
+
+# ---------------- CIRCUIT BREAKER ----------------
+def bench_breaker(turns=20, timeout=0.5, reset_timeout=1.0, probe_interval=0.2):
+    """
+    Per-turn latency against fake_backend.py while it is healthy, timing out, and
+    recovered: every call waiting out the timeout vs. the breaker routing offline.
+    """
+    import urllib.request
+    import fake_backend
+    from backends import CLOSED, Backends, http_probe
+
+    server, faults = fake_backend.serve(port=0)
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/models"
+
+    def request():
+        urllib.request.urlopen(url, timeout=timeout).read()
+
+    def run(call):
+        times, offline = [], 0
+        for _ in range(turns):
+            t0 = time.perf_counter()
+            try:
+                call(request)
+            except Exception:
+                offline += 1  # the turn would answer from local_response
+            times.append(time.perf_counter() - t0)
+        return statistics.mean(times), max(times), offline
+
+    backends = Backends(interval=probe_interval)
+    breaker = backends.register("llm", probe=lambda: http_probe(url, timeout), reset_timeout=reset_timeout)
+    backends.start_prober()
+    print(f"{'phase':10} | {'direct mean':>11} | {'max':>8} | {'breaker mean':>12} | {'max':>8} | offline")
+    try:
+        for phase, change in (("healthy", {}), ("timing out", {"latency": timeout * 2}),
+                              ("recovered", {"latency": 0.0})):
+            faults.update(**change)
+            if phase == "recovered":
+                t0 = time.perf_counter()
+                while breaker.state != CLOSED:
+                    time.sleep(0.01)
+                print(f"breaker closed {time.perf_counter() - t0:.2f}s after the backend recovered")
+            d_mean, d_max, d_off = run(lambda fn: fn())
+            b_mean, b_max, b_off = run(breaker.call)
+            print(f"{phase:10} | {d_mean * 1000:8.1f} ms | {d_max * 1000:5.0f} ms | "
+                  f"{b_mean * 1000:9.1f} ms | {b_max * 1000:5.0f} ms | {d_off}/{b_off}")
+    finally:
+        backends.stop_prober()
+        server.shutdown()
+
+
+# ---------------- HISTORY INDEX ----------------
+_HISTORY_QUESTIONS = ["how is plumbing going", "cementing kaisa hai", "roofing update please", "tell me a joke",
+                      "painting kab hoga", "flooring status", "wiring ka kaam", "प्रोजेक्ट अपडेट बताइए",
+                      "what about the tiles", "electrical and plumbing progress", "hello", "waterproofing done?"]
+
+
+def bench_history(turns=1_000_000, queries=200, batch=20_000):
+    """Build an FTS history index of `turns` synthetic messages, then time filtered, paginated queries."""
+    from history_index import HistoryIndex
+
+    tmp = tempfile.mkdtemp(prefix="riverdale_history_")
+    try:
+        index = HistoryIndex(os.path.join(tmp, "history.db"))
+        rng = random.Random(11)
+        start = time.time() - 60 * 86400  # two months of traffic
+        step = 60 * 86400 / turns
+        users = [f"tablet-{i}" for i in range(40)]
+        t0 = time.perf_counter()
+        for first in range(0, turns, batch):
+            entries = []
+            for i in range(first, min(first + batch, turns)):
+                question = rng.choice(_HISTORY_QUESTIONS)
+                entries.append({"role": "user" if i % 2 == 0 else "assistant",
+                                "content": question if i % 2 == 0 else f"Update on {question}: {rng.randrange(100)}% done.",
+                                "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(start + i * step)),
+                                "user": rng.choice(users), "project_id": f"RW{rng.randrange(1, 2001):05d}",
+                                "intent": rng.choice(["construction", "construction", "general", "fun"])})
+            index.add(entries)
+        build = time.perf_counter() - t0
+        print(f"indexed {turns} turns in {build:.1f}s ({turns / build:.0f}/s), "
+              f"{os.path.getsize(os.path.join(tmp, 'history.db')) / 2**20:.0f} MiB")
+
+        cases = {
+            "keyword": lambda: index.search("plumbing"),
+            "keyword+project+week": lambda: index.search("plumbing", since="7d", project=f"RW{rng.randrange(1, 2001):05d}"),
+            "prefix+intent": lambda: index.search("roof*", intent="construction"),
+            "project only": lambda: index.search(project=f"RW{rng.randrange(1, 2001):05d}"),
+            "user+range": lambda: index.search(user=rng.choice(users), since="30d", until="20d"),
+            "rare keyword": lambda: index.search("waterproofing done", intent="fun", user=rng.choice(users)),
+            "page 10": None,
+        }
+        print(f"{'query':22} | {'p50':>8} | {'p99':>8} | rows")
+        for name, query in cases.items():
+            times, rows = [], 0
+            for _ in range(queries):
+                q0 = time.perf_counter()
+                if query is None:
+                    page = index.search("plumbing")
+                    for _ in range(9):
+                        page = index.search("plumbing", cursor=page.next_cursor)
+                else:
+                    page = query()
+                times.append(time.perf_counter() - q0)
+                rows += len(page.turns)
+            times.sort()
+            print(f"{name:22} | {times[len(times) // 2] * 1000:5.1f} ms | {times[int(len(times) * 0.99)] * 1000:5.1f} ms"
+                  f" | {rows / queries:.0f}")
+        index.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+# ---------------- LIVE PROJECT FEED ----------------
+def _feed_patches(rng, pids, count):
+    patches = {}
+    for _ in range(count):
+        task = rng.choice(_TASKS)
+        patches[rng.choice(pids)] = {"tasks": {task: rng.choice((rng.randrange(100), 100, "pending"))},
+                                     "progress": rng.randrange(101)}
+    return patches
+
+
+def _write_feed_file(path, name, patches):
+    tmp = os.path.join(path, f".{name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(patches, f)
+    os.replace(tmp, os.path.join(path, name))
+
+
+FEED_INGEST_MIN = 10_000     # backlog patches/s
+FEED_P99_BUDGET_US = 2_000   # reader p99 while the feed is applying updates
+FEED_KEEP_UP = 0.8           # applied/written while the feed runs (repeat patches to one project merge)
+
+
+def bench_feed(count=10_000, backlog=100_000, file_size=1_000, seconds=5.0, readers=8, rate=2_000, think=0.001):
+    """
+    Ingest rate of a backlog of feed files, then turn-path lookup latency with no
+    updates vs. while the feed applies `rate` updates/s. Each reader does a lookup every
+    `think` seconds, like turns arriving, and checks for torn reads: find_task naming an
+    in-progress task that its own record has no progress for.
+    False (and FAIL lines) on any torn read or a missed budget above.
+    """
+    from project_feed import ProjectFeed
+    from replies import ProjectReplies, change_notice
+
+    data = synthetic_projects(count)
+    store = ProjectStore(data)
+    replies = ProjectReplies(store)
+    pids = list(data)
+    watched = set(pids[::100])  # ~1% of projects have a session on them
+    notices = []
+    store.subscribe(lambda pid, new, old: pid in watched and notices.append(change_notice(old, new, "english")))
+    rng = random.Random(13)
+    tmp = tempfile.mkdtemp(prefix="riverdale_feed_")
+    try:
+        for n in range(0, backlog, file_size):
+            _write_feed_file(tmp, f"{n:08d}.json", _feed_patches(rng, pids, file_size))
+        feed = ProjectFeed(store, tmp, interval=0.02)
+        t0 = time.perf_counter()
+        applied = feed.poll()
+        ingest = time.perf_counter() - t0
+        print(f"backlog: {backlog} patches in {backlog // file_size} files -> {applied} projects updated in "
+              f"{ingest:.2f}s ({backlog / ingest:.0f} patches/s, swap {feed.stats['last_apply_ms']} ms), "
+              f"{len(notices)} notices")
+        ok = backlog / ingest >= FEED_INGEST_MIN
+
+        stop = threading.Event()
+
+        def reader(times, torn, seed):
+            r = random.Random(seed)
+            while not stop.is_set():
+                pid = r.choice(pids)
+                q0 = time.perf_counter()
+                match = store.find_task(pid, r.choice(("roofing update", "plumbing kaisa hai", "painting")))
+                replies.summary(pid, "english")
+                times.append(time.perf_counter() - q0)
+                if match and match[1] == "in_progress" and match[2] is None:
+                    torn.append(pid)
+                time.sleep(think)
+
+        def run(updating):
+            times, torn = [], []
+            threads = [threading.Thread(target=reader, args=(times, torn, i)) for i in range(readers)]
+            before = feed.stats["applied"]
+            if updating:
+                feed.start()
+            for t in threads:
+                t.start()
+            t0 = time.perf_counter()
+            written = 0
+            while time.perf_counter() - t0 < seconds:
+                due = int(rate * (time.perf_counter() - t0)) - written
+                if updating and due > 0:
+                    patches = _feed_patches(rng, pids, due)
+                    _write_feed_file(tmp, f"live{written:08d}.json", patches)
+                    written += due
+                time.sleep(0.02)
+            elapsed = time.perf_counter() - t0
+            time.sleep(0.1)  # let the feed pick up the last file
+            stop.set()
+            for t in threads:
+                t.join()
+            stop.clear()
+            times.sort()
+            return times, torn, written / elapsed, (feed.stats["applied"] - before) / elapsed
+
+        print(f"{'readers':10} | {'lookups':>8} | {'p50':>12} | {'p99':>12} | {'max':>12} | torn | written/s | applied/s")
+        for name, updating in (("idle", False), ("feed", True)):
+            times, torn, written, applied = run(updating)
+            p99 = times[int(len(times) * 0.99)]
+            print(f"{name:10} | {len(times):8} | {_fmt_us(times[len(times) // 2])} | "
+                  f"{_fmt_us(p99)} | {_fmt_us(times[-1])} | {len(torn):4} | "
+                  f"{written:9.0f} | {applied:9.0f}")
+            if torn:
+                ok = False
+                print(f"FAIL  {len(torn)} torn reads ({name}), e.g. {torn[0]}")
+            if updating:
+                ok &= p99 * 1e6 <= FEED_P99_BUDGET_US and applied >= written * FEED_KEEP_UP
+        feed.stop()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    print(f"{'ok  ' if ok else 'FAIL'}  budgets: ingest >= {FEED_INGEST_MIN}/s, p99 under feed <= "
+          f"{FEED_P99_BUDGET_US} µs, applied >= {FEED_KEEP_UP:.0%} of written")
+    return ok
+
+
+# ---------------- TRANSCRIPT VIEW ----------------
+def bench_transcript(messages=50_000, tokens_per_reply=12, rate=2000, heartbeat_ms=10):
+    """
+    Simulated long kiosk session: a worker thread posts `messages` messages (replies
+    streamed token by token) at `rate` per second while the main loop stays live.
+    Reports main-loop lag (how late a 10 ms heartbeat fires) and insert cost, for the
+    old unbounded widget fed with after(0) per update vs. TranscriptView.
+    """
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        print("skip  transcript: no display")
+        return
+    import tkinter as tk
+    from tkinter import scrolledtext
+    from transcript import TranscriptView
+
+    def session(post, begin, token, end):
+        for i in range(messages // 2):
+            post("You", f"how is plumbing going {i}")
+            begin()
+            for t in range(tokens_per_reply):
+                token(f"word{t} ")
+            end()
+            time.sleep(2 / rate)
+
+    def run(bounded):
+        root = tk.Tk()
+        root.withdraw()
+        box = scrolledtext.ScrolledText(root, wrap=tk.WORD, width=82, height=20)
+        box.pack()
+        lags, inserts, done = [], [], threading.Event()
+
+        if bounded:
+            view = TranscriptView(root, box)
+            feeder = threading.Thread(target=session, args=(view.post, view.begin_stream,
+                                                            view.stream_token, view.end_stream), daemon=True)
+        else:
+            def insert(chunk, scroll=True):
+                t0 = time.perf_counter()
+                box.insert(tk.END, chunk)
+                if scroll:
+                    box.yview(tk.END)
+                inserts.append(time.perf_counter() - t0)
+            feeder = threading.Thread(target=session, args=(
+                lambda sender, text: root.after(0, insert, f"{sender}: {text}\n\n"),
+                lambda: root.after(0, insert, "Miss Riverdale: ", False),
+                lambda t: root.after(0, insert, t),
+                lambda: root.after(0, insert, "\n\n")), daemon=True)
+
+        expected = [time.perf_counter() + heartbeat_ms / 1000]
+
+        def heartbeat():
+            lags.append(max(0.0, time.perf_counter() - expected[0]))
+            if done.is_set():
+                root.quit()
+                return
+            expected[0] = time.perf_counter() + heartbeat_ms / 1000
+            root.after(heartbeat_ms, heartbeat)
+
+        def watch():
+            feeder.join()
+            time.sleep(0.5)  # let the last frames drain
+            done.set()
+
+        feeder.start()
+        threading.Thread(target=watch, daemon=True).start()
+        root.after(heartbeat_ms, heartbeat)
+        t0 = time.perf_counter()
+        root.mainloop()
+        elapsed = time.perf_counter() - t0
+        lines = int(box.index("end-1c").split(".")[0])
+        if bounded:
+            inserts = list(view.frame_times)
+        root.destroy()
+        lags.sort()
+        return elapsed, lags, inserts, lines
+
+    print(f"{'':14} | {'lag p50':>9} | {'lag p99':>9} | {'lag max':>9} | {'last 1k applies':>15} | lines | total")
+    for name, bounded in (("unbounded", False), ("TranscriptView", True)):
+        elapsed, lags, inserts, lines = run(bounded)
+        tail = statistics.mean(inserts[-1000:]) if inserts else 0.0
+        print(f"{name:14} | {lags[len(lags) // 2] * 1000:6.1f} ms | {lags[int(len(lags) * 0.99)] * 1000:6.1f} ms | "
+              f"{lags[-1] * 1000:6.1f} ms | {_fmt_us(tail):>15} | {lines:5d} | {elapsed:.1f}s")
+
+
+# ---------------- INSTRUMENTATION ----------------
+def bench_metrics(calls=200_000):
+    """Per-span cost with instrumentation off (the default) and on."""
+    import metrics
+
+    def loop():
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            with metrics.span("bench"):
+                pass
+            metrics.inc("bench_total")
+        return (time.perf_counter() - t0) / calls
+
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        pass
+    bare = (time.perf_counter() - t0) / calls
+    off = loop()
+    metrics.enable()
+    on = loop()
+    metrics.disable()
+    metrics.reset()
+    print(f"{'':9} | {'span + counter':>14}")
+    print(f"{'disabled':9} | {_fmt_us(off - bare)}")
+    print(f"{'enabled':9} | {_fmt_us(on - bare)}")
+
+
+# ---------------- STARTUP ----------------
+IMPORT_BUDGET_MS = 350       # `import main`, cumulative
+FIRST_PAINT_BUDGET_MS = 1200  # process start -> window drawn
+# Must never be imported before the window is up; voice_utils/ai_core load them on first use
+DEFERRED_MODULES = ("pyttsx3", "pygame", "gtts", "openai", "speech_recognition")
+
+
+def _import_times(module):
+    """Run `python -X importtime -c "import <module>"` -> {name: (self_us, cumulative_us)}."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def _first_paint_seconds(timeout=30):
+    """Wall clock from launching main.py to the window being drawn (RIVERDALE_STARTUP_PROBE)."""
+    env = dict(os.environ, RIVERDALE_STARTUP_PROBE="1")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "main.py"], stdout=subprocess.PIPE, stdin=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, text=True, env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    try:
+        for line in proc.stdout:
+            if line.strip() == "first_paint":
+                return time.perf_counter() - t0
+        return None
+    finally:
+        proc.kill()
+        proc.wait(timeout)
+
+
+def bench_startup(module="main", runs=5, import_budget_ms=IMPORT_BUDGET_MS,
+                  paint_budget_ms=FIRST_PAINT_BUDGET_MS, top=12):
+    """
+    Cold-start report: slowest imports of `module`, median time to first paint,
+    and a budget check. Returns False (exit status 1) when startup regressed.
+    """
+    ok = True
+    try:
+        samples = [_import_times(module) for _ in range(runs)]
+    except RuntimeError as e:
+        print(f"import {module} failed: {e}")
+        return False
+    total_ms = statistics.median(s[module][1] for s in samples) / 1000
+    times = samples[-1]
+    print(f"{'module':40} | {'self':>9} | {'cumulative':>10}")
+    for name, (self_us, cumulative_us) in sorted(times.items(), key=lambda kv: -kv[1][0])[:top]:
+        print(f"{name:40} | {self_us / 1000:6.1f} ms | {cumulative_us / 1000:7.1f} ms")
+
+    eager = [name for name in DEFERRED_MODULES if name in times]
+    if eager:
+        ok = False
+        print(f"FAIL  imported before first paint: {', '.join(eager)}")
+    verdict = "ok  " if total_ms <= import_budget_ms else "FAIL"
+    ok &= total_ms <= import_budget_ms
+    print(f"{verdict}  import {module}: {total_ms:.1f} ms (budget {import_budget_ms} ms, median of {runs})")
+
+    if module != "main":
+        return ok
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        print("skip  first paint: no display")
+        return ok
+    paints = [p for p in (_first_paint_seconds() for _ in range(runs)) if p is not None]
+    if not paints:
+        print("FAIL  first paint: main.py never drew its window")
+        return False
+    paint_ms = statistics.median(paints) * 1000
+    verdict = "ok  " if paint_ms <= paint_budget_ms else "FAIL"
+    ok &= paint_ms <= paint_budget_ms
+    print(f"{verdict}  first paint: {paint_ms:.0f} ms (budget {paint_budget_ms} ms, median of {len(paints)})")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Miss Riverdale benchmarks")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("memory", help="memory.json rewrite vs. append-only log")
+    sub.add_parser("stress", help="hundreds of concurrent chat_with_ai turns through the turn scheduler")
+    sub.add_parser("tts", help="sequential vs. prefetching playback with a stub synthesizer")
+    sub.add_parser("classify", help="legacy keyword scans vs. the single-pass classifier")
+    sub.add_parser("projects", help="ProjectStore lookups at 10k synthetic projects")
+    sub.add_parser("replies", help="per-turn reply rendering: all-language f-strings vs. compiled templates")
+    sub.add_parser("llm", help="streaming vs. blocking model replies with a stub client")
+    sub.add_parser("context", help="prompt size and memory over a 10k-turn session")
+    sub.add_parser("stt", help="sequential vs. parallel dual-language recognition, then the WAV fixtures (fails on a wrong transcript)")
+    sub.add_parser("breaker", help="turn latency through an outage of fake_backend.py, with and without the breaker")
+    history = sub.add_parser("history", help="FTS history index build rate and query latency at 1M turns")
+    history.add_argument("--turns", type=int, default=1_000_000)
+    sub.add_parser("feed", help="project feed ingest rate and lookup latency under continuous updates (fails on torn reads)")
+    sub.add_parser("transcript", help="main-loop lag over a simulated 50k-message chat session (needs a display)")
+    sub.add_parser("metrics", help="span/counter overhead with instrumentation off and on")
+    startup = sub.add_parser("startup", help="import-time report and time to first paint, checked against a budget")
+    startup.add_argument("--module", default="main")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    startup.add_argument("--paint-budget-ms", type=float, default=FIRST_PAINT_BUDGET_MS)
+    args = parser.parse_args()
+
+    if args.cmd == "memory":
+        bench_memory()
+    elif args.cmd == "stress":
+        stress_turns()
+    elif args.cmd == "tts":
+        bench_tts()
+    elif args.cmd == "classify":
+        bench_classify()
+    elif args.cmd == "projects":
+        bench_projects()
+    elif args.cmd == "replies":
+        bench_replies()
+    elif args.cmd == "llm":
+        bench_llm()
+    elif args.cmd == "context":
+        if not bench_context():
+            raise SystemExit(1)
+    elif args.cmd == "stt":
+        bench_stt()
+        if not check_stt_fixtures():
+            raise SystemExit(1)
+    elif args.cmd == "breaker":
+        bench_breaker()
+    elif args.cmd == "history":
+        bench_history(args.turns)
+    elif args.cmd == "feed":
+        if not bench_feed():
+            raise SystemExit(1)
+    elif args.cmd == "transcript":
+        bench_transcript()
+    elif args.cmd == "metrics":
+        bench_metrics()
+    elif args.cmd == "startup":
+        if not bench_startup(args.module, args.runs, args.import_budget_ms, args.paint_budget_ms):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# classifier.py — Miss Riverdale: single-pass language + intent classifier
+import re
+from collections import namedtuple
+
+# The keywords of the old substring scans. A trailing "*" matches any word starting
+# with the keyword, as the substring did ("cementing", "updates"); short words that
+# occur inside unrelated ones stay whole words, so "hi" no longer fires inside "this"
+# and "war" not inside "software".
+RESTRICTED_KEYWORDS = [
+    "gaza*", "war", "wars", "politics*", "religion*", "israel*", "palestine*", "biden*",
+    "modi", "trump*", "attack*", "terror*", "violence*",
+]
+CONSTRUCTION_KEYWORDS = [
+    "cement*", "plumbing*", "floor*", "paint*", "construction*", "update*", "project*",
+    "roof*", "site", "sites", "status*", "work*", "tiles*", "foundation*", "brick*", "sand", "sands",
+]
+FUN_KEYWORDS = [
+    "joke*", "funny*", "hello*", "hi", "how are you", "namaste*", "thanks*", "thank you",
+]
+HINGLISH_WORDS = [
+    "kya", "hai", "nahi", "kaise", "batao", "bolo", "kar", "mera", "tum", "aap",
+    "hain", "tha", "abhi", "ek", "achha", "thoda", "ha", "haan", "bhi",
+]
+
+# Checked in this order; the first category with a match wins
+INTENT_PRIORITY = ("restricted", "construction", "fun")
+
+Classification = namedtuple("Classification", "lang_mode intent keywords wants_joke")
+
+# One pass over the text: Devanagari runs or latin words
+_TOKEN_RE = re.compile(r"[\u0900-\u097F]+|[a-z0-9']+")
+
+
+class Classifier:
+    """
+    Tokenizes the input once and answers language mode, intent and matched
+    keywords together. Tables are compiled at construction time.
+    """
+
+    def __init__(self, restricted=RESTRICTED_KEYWORDS, construction=CONSTRUCTION_KEYWORDS,
+                 fun=FUN_KEYWORDS, hinglish=HINGLISH_WORDS):
+        self._exact = {}      # word -> category
+        self._prefix = {}     # stem -> category
+        self._phrases = {}    # "how are you" -> category (matched on token n-grams)
+        for category, words in (("restricted", restricted), ("construction", construction), ("fun", fun)):
+            for word in words:
+                if word.endswith("*"):
+                    self._prefix.setdefault(word[:-1], category)
+                elif " " in word:
+                    self._phrases.setdefault(word, category)
+                else:
+                    self._exact.setdefault(word, category)
+        self._prefix_lengths = sorted({len(stem) for stem in self._prefix})
+        self._phrase_sizes = sorted({len(p.split()) for p in self._phrases})
+        self._hinglish = frozenset(hinglish)
+
+    def _match(self, token):
+        category = self._exact.get(token)
+        if category:
+            return category
+        for n in self._prefix_lengths:
+            if n > len(token):
+                break
+            category = self._prefix.get(token[:n])
+            if category:
+                return category
+        return None
+
+    def classify(self, text):
+        text = (text or "").lower()
+        hindi = hinglish = wants_joke = False
+        found = {}
+        recent = []
+        for m in _TOKEN_RE.finditer(text):
+            token = m.group()
+            if "\u0900" <= token[0] <= "\u097F":
+                hindi = True
+            elif token in self._hinglish:
+                hinglish = True
+            if token == "batao" or token.startswith("joke"):
+                wants_joke = True
+
+            category = self._match(token)
+            if category:
+                found.setdefault(category, []).append(token)
+            if self._phrases:
+                recent.append(token)
+                del recent[:-self._phrase_sizes[-1]]
+                for size in self._phrase_sizes:
+                    phrase = " ".join(recent[-size:])
+                    category = self._phrases.get(phrase)
+                    if category and len(recent) >= size:
+                        found.setdefault(category, []).append(phrase)
+
+        lang_mode = "hindi" if hindi else "hinglish" if hinglish else "english"
+        intent = next((c for c in INTENT_PRIORITY if c in found), "general")
+        keywords = tuple(found.get(intent, ()))
+        return Classification(lang_mode, intent, keywords, wants_joke)
+
+    def classify_batch(self, texts):
+        classify = self.classify
+        return [classify(t) for t in texts]
+
+
+CLASSIFIER = Classifier()
+classify = CLASSIFIER.classify
+classify_batch = CLASSIFIER.classify_batch
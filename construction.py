@@ -3,6 +3,7 @@
 CONSTRUCTION_DATA = {
     "RW00123": {
         "name": "Ramesh",
+        "lang": "hindi",  # preferred language for digests
         "progress": 55,
         "in_progress": {"Structural Framing": 70, "Roofing": 30, "Electrical and Plumbing": 20},
         "completed": ["Foundation"],
@@ -11,6 +12,7 @@ CONSTRUCTION_DATA = {
     },
     "RW00124": {
         "name": "Priya",
+        "lang": "hinglish",
         "progress": 60,
         "in_progress": {"Flooring": 15},
         "completed": ["Foundation", "Walls"],
@@ -19,6 +21,7 @@ CONSTRUCTION_DATA = {
     },
     "RW00125": {
         "name": "Amit",
+        "lang": "english",
         "progress": 80,
         "in_progress": {"Painting": 10},
         "completed": ["Foundation", "Walls", "Roof", "Plumbing"],
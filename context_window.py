@@ -0,0 +1,109 @@
+# context_window.py — Miss Riverdale: bounded prompt context with a rolling summary
+import collections
+
+from classifier import classify
+
+RECENT_MESSAGES = 8      # user/assistant messages kept verbatim
+TOKEN_BUDGET = 1500      # whole prompt, system message included
+SUMMARY_TOKENS = 250     # ceiling for the rolling summary of older turns
+MAX_NOTES = 6            # older questions quoted in the summary
+NOTE_CHARS = 80
+
+
+def estimate_tokens(text):
+    """
+    Cheap local estimate: ~4 Latin characters per token, Devanagari and other
+    non-ASCII text roughly one token per 2 characters, plus per-message overhead.
+    """
+    text = text or ""
+    ascii_chars = sum(1 for ch in text if ch < "\x80")
+    return 4 + ascii_chars // 4 + (len(text) - ascii_chars + 1) // 2
+
+
+class ContextWindow:
+    """
+    Builds the message list for the model:
+        [system prompt + summary of older turns] + last N messages verbatim
+    Messages that fall out of the window are folded into the summary (topics,
+    projects, a few recent questions) and dropped, so prompt size and memory stay
+    flat however long the conversation runs. The full text is already in the
+    conversation log and the history index.
+    """
+
+    def __init__(self, system_prompt, recent_messages=RECENT_MESSAGES, token_budget=TOKEN_BUDGET,
+                 summary_tokens=SUMMARY_TOKENS):
+        self.system_prompt = system_prompt
+        self.recent_messages = recent_messages
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self._recent = collections.deque()   # (message, tokens)
+        self._recent_tokens = 0
+        self._system_tokens = estimate_tokens(system_prompt)
+        self._summarized = 0
+        self._topics = collections.Counter()
+        self._projects = collections.OrderedDict()
+        self._notes = collections.deque(maxlen=MAX_NOTES)
+        self._summary = ""
+        self._summary_tokens = 0
+
+    def add(self, role, content, project_id=None):
+        if role not in ("user", "assistant") or not content:
+            return
+        message = {"role": role, "content": content}
+        tokens = estimate_tokens(content)
+        self._recent.append((message, tokens))
+        self._recent_tokens += tokens
+        if project_id:
+            self._projects.pop(project_id, None)
+            self._projects[project_id] = True
+            while len(self._projects) > 5:
+                self._projects.popitem(last=False)
+        self._evict()
+
+    def _evict(self):
+        while self._recent and (
+                len(self._recent) > self.recent_messages
+                or self._system_tokens + self._summary_tokens + self._recent_tokens > self.token_budget):
+            if len(self._recent) == 1:
+                break  # never drop the question being asked
+            message, tokens = self._recent.popleft()
+            self._recent_tokens -= tokens
+            self._fold(message)
+            self._rebuild_summary()
+
+    def _fold(self, message):
+        self._summarized += 1
+        if message["role"] != "user":
+            return
+        result = classify(message["content"])
+        for keyword in result.keywords:
+            self._topics[keyword] += 1
+        if len(self._topics) > 50:
+            self._topics = collections.Counter(dict(self._topics.most_common(20)))
+        note = " ".join(message["content"].split())
+        self._notes.append(note[:NOTE_CHARS] + ("…" if len(note) > NOTE_CHARS else ""))
+
+    def _rebuild_summary(self):
+        parts = [f"Earlier in this conversation ({self._summarized} messages):"]
+        if self._topics:
+            parts.append("topics — " + ", ".join(t for t, _ in self._topics.most_common(6)) + ".")
+        if self._projects:
+            parts.append("projects discussed — " + ", ".join(self._projects) + ".")
+        notes = list(self._notes)
+        while notes:
+            candidate = " ".join(parts + ["recent questions — " + " | ".join(notes)])
+            if estimate_tokens(candidate) <= self.summary_tokens:
+                parts.append("recent questions — " + " | ".join(notes))
+                break
+            notes.pop(0)
+        self._summary = " ".join(parts)
+        self._summary_tokens = estimate_tokens(self._summary)
+
+    def messages(self):
+        system = self.system_prompt
+        if self._summary:
+            system = f"{system}\n\n{self._summary}"
+        return [{"role": "system", "content": system}] + [m for m, _ in self._recent]
+
+    def prompt_tokens(self):
+        return self._system_tokens + self._summary_tokens + self._recent_tokens
@@ -0,0 +1,201 @@
+# digest.py — Miss Riverdale: morning status digests for every homeowner (text + voice note)
+import argparse, functools, hashlib, importlib, json, os, sys, time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from replies import LANG_MODES, render_summary
+
+OUT_DIR = "digests"
+CHECKPOINT = "checkpoint.jsonl"
+DEFAULT_LANG = "hinglish"  # for projects without a "lang" field
+# Same voice as the live speak(): romanized Hinglish is read by the English voice
+TTS_LANG = {"hindi": "hi", "hinglish": "en", "english": "en"}
+
+
+# ---------------- TTS ENGINES ----------------
+# Each engine is synthesize(text, lang) -> audio bytes, resolved by name in the parent
+# and pickled by reference into the workers.
+def stub_synthesize(text, lang, latency=0.0):
+    """Offline stand-in: deterministic bytes, optionally taking `latency` seconds like a real engine."""
+    if latency:
+        time.sleep(latency)
+    digest = hashlib.sha256(f"{lang}:{text}".encode("utf-8")).digest()
+    return b"RIVERDALE-STUB\n" + digest + text.encode("utf-8")
+
+
+def gtts_synthesize(text, lang):
+    import io
+    from gtts import gTTS
+    buf = io.BytesIO()
+    gTTS(text=text, lang=lang, slow=False).write_to_fp(buf)
+    return buf.getvalue()
+
+
+def pyttsx3_synthesize(text, lang):
+    import tempfile
+    import pyttsx3
+    engine = pyttsx3.init()
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        engine.save_to_file(text, path)
+        engine.runAndWait()
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+ENGINES = {
+    "stub": (stub_synthesize, ".bin"),
+    "gtts": (gtts_synthesize, ".mp3"),
+    "pyttsx3": (pyttsx3_synthesize, ".wav"),
+}
+
+
+def resolve_engine(spec, stub_latency=0.0):
+    """'stub', 'gtts', 'pyttsx3' or 'package.module:function' -> (synthesize, file extension)."""
+    if spec == "stub":
+        return functools.partial(stub_synthesize, latency=stub_latency), ".bin"
+    if spec in ENGINES:
+        return ENGINES[spec]
+    module, _, name = spec.partition(":")
+    if not name:
+        raise ValueError(f"unknown TTS engine {spec!r} (use {', '.join(ENGINES)} or module:function)")
+    return getattr(importlib.import_module(module), name), ".audio"
+
+
+# ---------------- WORKER ----------------
+def _write_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def render_digest(pid, project, lang_mode, out_dir, synthesize, ext):
+    """Render one project's summary and voice note to out_dir; returns (pid, audio bytes)."""
+    text = render_summary(project, lang_mode)
+    audio = synthesize(text, TTS_LANG[lang_mode])
+    _write_atomic(os.path.join(out_dir, f"{pid}.txt"), text.encode("utf-8"))
+    _write_atomic(os.path.join(out_dir, pid + ext), audio)
+    return pid, len(audio)
+
+
+# ---------------- BATCH ----------------
+def load_checkpoint(path):
+    """Project IDs already delivered by an earlier (possibly interrupted) run."""
+    done = set()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["project_id"])
+                except (ValueError, KeyError):
+                    pass  # torn last line from a crash
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def run(projects, out_dir=OUT_DIR, engine="stub", workers=None, default_lang=DEFAULT_LANG,
+        stub_latency=0.0, window=None, progress_every=1000):
+    """
+    Stream over `projects` (a ProjectStore or (pid, data) iterable), rendering each
+    digest in a process pool with at most `window` jobs in flight. Finished projects
+    are appended to the checkpoint as they complete, so a rerun skips them.
+    Returns a summary dict with throughput.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    synthesize, ext = resolve_engine(engine, stub_latency)
+    checkpoint_path = os.path.join(out_dir, CHECKPOINT)
+    done = load_checkpoint(checkpoint_path)
+    workers = workers or os.cpu_count() or 2
+    window = window or workers * 4
+    items = projects.items() if hasattr(projects, "items") else projects
+    stats = {"rendered": 0, "skipped": 0, "failed": 0, "audio_bytes": 0}
+    t0 = time.perf_counter()
+
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        def collect(finished):
+            for future in finished:
+                pid = pending.pop(future)
+                try:
+                    _, size = future.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"⚠️ Digest for {pid} failed:", e)
+                    continue
+                checkpoint.write(json.dumps({"project_id": pid, "ts": time.time()}) + "\n")
+                checkpoint.flush()
+                stats["rendered"] += 1
+                stats["audio_bytes"] += size
+                if progress_every and stats["rendered"] % progress_every == 0:
+                    rate = stats["rendered"] / (time.perf_counter() - t0)
+                    print(f"  {stats['rendered']} digests ({rate:.0f}/s)")
+
+        try:
+            for pid, project in items:
+                if pid in done:
+                    stats["skipped"] += 1
+                    continue
+                lang_mode = project.get("lang") if project.get("lang") in LANG_MODES else default_lang
+                future = pool.submit(render_digest, pid, project, lang_mode, out_dir, synthesize, ext)
+                pending[future] = pid
+                if len(pending) >= window:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+        except KeyboardInterrupt:
+            for future in pending:
+                future.cancel()
+            stats["interrupted"] = True
+            print("Interrupted — rerun the same command to resume from the checkpoint.")
+
+    elapsed = time.perf_counter() - t0
+    stats["seconds"] = round(elapsed, 3)
+    stats["per_second"] = round(stats["rendered"] / elapsed, 1) if elapsed else None
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Miss Riverdale: render a status digest for every project")
+    parser.add_argument("--projects", default=os.getenv("RIVERDALE_PROJECTS"),
+                        help="project .json or SQLite file (default: CONSTRUCTION_DATA)")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="use N synthetic projects instead")
+    parser.add_argument("--out", default=OUT_DIR)
+    parser.add_argument("--engine", default="stub", help="stub, gtts, pyttsx3 or module:function")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="seconds per stub synthesis")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--lang", default=DEFAULT_LANG, choices=LANG_MODES,
+                        help="language for projects without a preference")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and render everything")
+    args = parser.parse_args()
+
+    from project_store import ProjectStore
+    if args.synthetic:
+        from bench import synthetic_projects
+        projects = ProjectStore(synthetic_projects(args.synthetic))
+    elif args.projects:
+        projects = ProjectStore.load(args.projects)
+    else:
+        from construction import CONSTRUCTION_DATA
+        projects = ProjectStore(CONSTRUCTION_DATA)
+
+    if args.restart:
+        try:
+            os.remove(os.path.join(args.out, CHECKPOINT))
+        except FileNotFoundError:
+            pass
+    stats = run(projects, args.out, args.engine, args.workers, args.lang, args.stub_latency)
+    print(json.dumps(stats, indent=2))
+    if stats.get("interrupted") or stats["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
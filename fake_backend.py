@@ -0,0 +1,159 @@
+# fake_backend.py — Miss Riverdale: local stand-in for the OpenAI / Google endpoints
+#
+#   python fake_backend.py --port 9100 --latency 0.2 --fail-rate 0.3
+#   OPENAI_BASE_URL=http://127.0.0.1:9100/v1 RIVERDALE_GTTS_HEALTH_URL=http://127.0.0.1:9100/health \
+#       RIVERDALE_STT_HEALTH_URL=http://127.0.0.1:9100/health python main.py
+#
+#   GET  /v1/models, POST /v1/chat/completions (stream or not), HEAD/GET /health
+#   POST /_control {"latency": 2.5, "fail_rate": 0.0, "down": true}   change faults while running
+# Every request first waits `latency` seconds; then "down" drops the connection and
+# `fail_rate` of the rest get a 503.
+import argparse, json, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HOST = "127.0.0.1"
+PORT = 9100
+REPLY = "Ji, main aapki madad ke liye yahan hoon. Kuch aur poochna hai?"
+
+
+class FaultState:
+    def __init__(self, latency=0.0, fail_rate=0.0, down=False, reply=REPLY):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.down = down
+        self.reply = reply
+        self.requests = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def update(self, **changes):
+        for name in ("latency", "fail_rate", "down", "reply"):
+            if name in changes:
+                setattr(self, name, changes[name])
+
+    def as_dict(self):
+        return {"latency": self.latency, "fail_rate": self.fail_rate, "down": self.down,
+                "requests": self.requests, "failed": self.failed}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    faults = None  # set per server class
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _inject(self):
+        """Apply latency and faults; False when the request was failed here."""
+        faults = self.faults
+        with faults._lock:
+            faults.requests += 1
+        if faults.latency:
+            time.sleep(faults.latency)
+        if faults.down:
+            with faults._lock:
+                faults.failed += 1
+            self.close_connection = True
+            self.connection.close()
+            return False
+        if random.random() < faults.fail_rate:
+            with faults._lock:
+                faults.failed += 1
+            self._json(503, {"error": {"message": "injected failure"}})
+            return False
+        return True
+
+    def do_HEAD(self):
+        if self._inject():
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/_control":
+            return self._json(200, self.faults.as_dict())
+        if not self._inject():
+            return
+        if self.path.startswith("/v1/models"):
+            self._json(200, {"object": "list", "data": [
+                {"id": "gpt-4o-mini", "object": "model", "created": 0, "owned_by": "fake"}]})
+        elif self.path.startswith("/health"):
+            self._json(200, {"status": "ok"})
+        else:
+            self._json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if self.path.rstrip("/") == "/_control":
+            self.faults.update(**self._body())
+            return self._json(200, self.faults.as_dict())
+        request = self._body()
+        if not self._inject():
+            return
+        if not self.path.startswith("/v1/chat/completions"):
+            return self._json(404, {"error": {"message": "not found"}})
+        model = request.get("model", "gpt-4o-mini")
+        if not request.get("stream"):
+            return self._json(200, {
+                "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": self.faults.reply}}],
+            })
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for word in self.faults.reply.split(" "):
+            chunk = {"id": "fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # clients that gave up on a slow reply (the point of the latency knob)
+
+
+def serve(host=HOST, port=PORT, **faults):
+    """Start the fake in a background thread; returns (server, FaultState). server.shutdown() stops it."""
+    state = FaultState(**faults)
+    handler = type("FakeHandler", (_Handler,), {"faults": state})
+    server = _Server((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI/Google backend with injectable faults")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--down", action="store_true")
+    args = parser.parse_args()
+    server, _ = serve(args.host, args.port, latency=args.latency, fail_rate=args.fail_rate, down=args.down)
+    print(f">>> Fake backend on http://{args.host}:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+# history_index.py — Miss Riverdale: full-text searchable conversation history (SQLite FTS5)
+#
+#   python history_index.py search plumbing --project RW00124 --since 7d
+#   python history_index.py search --intent restricted --user tablet-3 --limit 50 --cursor 81234
+#   python history_index.py import memory.json        one-time import of the legacy file
+#   python history_index.py import memory_log         backfill from the segmented log
+#
+# ai_core feeds every saved turn in from the memory writer thread, so the index
+# never sits on the turn path, and backfills the log once when the index is new
+# (memory.json reaches the index that way, through the log it was copied into).
+# Imports skip turns the index already holds. Results are newest first; pages
+# continue from `cursor`.
+import argparse, json, os, re, sqlite3, threading, time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+INDEX_FILE = "history.db"
+PAGE_SIZE = 20
+DEFAULT_USER = "default"
+
+Turn = namedtuple("Turn", "id ts user role project_id intent content")
+Page = namedtuple("Page", "turns next_cursor")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY, ts REAL, user TEXT, role TEXT, project_id TEXT, intent TEXT, content TEXT);
+CREATE INDEX IF NOT EXISTS turns_ts ON turns(ts);
+CREATE INDEX IF NOT EXISTS turns_project ON turns(project_id, id);
+CREATE INDEX IF NOT EXISTS turns_intent ON turns(intent, id);
+CREATE INDEX IF NOT EXISTS turns_user ON turns(user, id);
+CREATE VIRTUAL TABLE IF NOT EXISTS turns_fts USING fts5(
+    content, project_id, intent, user, content='turns', content_rowid='id',
+    tokenize="unicode61 categories 'L* N* Co M*'", prefix='2 3');
+CREATE TRIGGER IF NOT EXISTS turns_ai AFTER INSERT ON turns BEGIN
+    INSERT INTO turns_fts(rowid, content, project_id, intent, user)
+    VALUES (new.id, new.content, new.project_id, new.intent, new.user);
+END;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+_COLUMNS = "t.id, t.ts, t.user, t.role, t.project_id, t.intent, t.content"
+# Devanagari runs (with their vowel signs) or latin/digit words, optionally ending in * for a prefix
+_TERM_RE = re.compile(r"[\u0900-\u097F]+\*?|\w+\*?")
+_RELATIVE_RE = re.compile(r"^(\d+)([mhdw])$")
+_MAX_ID = 2 ** 62  # beyond any row id; backfilled turns may have negative ids
+
+
+def parse_time(value):
+    """Epoch seconds from an ISO timestamp, a date, an epoch number or '30m'/'12h'/'7d'/'2w' ago."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    value = value.strip()
+    m = _RELATIVE_RE.match(value)
+    if m:
+        unit = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}[m.group(2)]
+        return (datetime.now() - timedelta(**{unit: int(m.group(1))})).timestamp()
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def fts_query(text):
+    """Free text -> an FTS5 expression: every word must match; 'plumb*' matches as a prefix."""
+    terms = []
+    for term in _TERM_RE.findall(text or ""):
+        prefix = term.endswith("*")
+        word = term.rstrip("*")
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms)
+
+
+def _phrase(column, value):
+    return f'{column} : "{str(value).replace(chr(34), " ")}"'
+
+
+class HistoryIndex:
+    """
+    Turns (one row per user/assistant message) in SQLite with an FTS5 index over
+    content, project, intent and user. Row ids follow insertion order, which is time
+    order for live turns, so time ranges narrow to an id range and pages use the
+    last id as a cursor instead of OFFSET.
+    """
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    # ---------- writes ----------
+    @staticmethod
+    def _row(entry, user=None, project_id=None, intent=None):
+        ts = entry.get("ts")
+        try:
+            ts = datetime.fromisoformat(ts).timestamp() if isinstance(ts, str) else ts
+        except ValueError:
+            ts = None
+        return (ts, entry.get("user") or user or DEFAULT_USER, entry["role"],
+                entry.get("project_id") or project_id, entry.get("intent") or intent, entry["content"])
+
+    def _insert(self, rows, first_id=None):
+        """Append rows; with `first_id`, rows older than everything indexed take ids first_id, first_id+1, …"""
+        with self._lock:
+            newest = self._conn.execute("SELECT max(ts) FROM turns").fetchone()[0]
+            with self._conn:
+                if first_id is not None:
+                    self._conn.executemany(
+                        "INSERT INTO turns(id, ts, user, role, project_id, intent, content) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(first_id + i,) + row for i, row in enumerate(rows)])
+                    return len(rows)
+                self._conn.executemany(
+                    "INSERT INTO turns(ts, user, role, project_id, intent, content) VALUES (?, ?, ?, ?, ?, ?)", rows)
+                oldest = min((r[0] for r in rows if r[0] is not None), default=None)
+                if newest is not None and oldest is not None and oldest < newest:
+                    # Ids no longer follow time; stop using them to narrow time ranges
+                    self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('unordered', '1')")
+        return len(rows)
+
+    def _indexed(self, row):
+        return self._conn.execute(
+            "SELECT 1 FROM turns WHERE ts = ? AND user = ? AND role = ? AND content = ? LIMIT 1",
+            (row[0], row[1], row[2], row[5])).fetchone() is not None
+
+    def add(self, entries):
+        """Index freshly saved log entries (the memory writer's sink). Entries without text are skipped."""
+        rows = [self._row(e) for e in entries if e.get("role") in ("user", "assistant") and e.get("content")]
+        return self._insert(rows) if rows else 0
+
+    def import_entries(self, entries, source, force=False, batch=10_000):
+        """
+        One-time import of older history. Project and intent are carried forward the way
+        the assistant tracked them then: system entries set the project, user messages
+        are classified, and replies inherit their question's intent.
+        Turns already in the index (the live sink saw them) are skipped. Turns older
+        than everything indexed get ids below the existing rows, so ids keep following
+        time and time ranges still narrow to id ranges.
+        """
+        from classifier import classify
+
+        key = f"imported:{os.path.abspath(source)}"
+        with self._lock:
+            if not force and self._conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                raise RuntimeError(f"{source} was already imported (use --force to import it again)")
+            oldest, newest, first_id = self._conn.execute("SELECT min(ts), max(ts), min(id) FROM turns").fetchone()
+        project_id = intent = None
+        older, rest, total = [], [], 0
+        for entry in entries:
+            project_id = entry.get("project_id") or entry.get("last_project") or project_id
+            if entry.get("role") not in ("user", "assistant") or not entry.get("content"):
+                continue
+            if entry["role"] == "user":
+                intent = entry.get("intent") or classify(entry["content"]).intent
+            row = self._row(entry, project_id=project_id, intent=intent)
+            if first_id is None or row[0] is None or row[0] < oldest:
+                older.append(row)
+                continue
+            if row[0] <= newest:
+                with self._lock:
+                    if self._indexed(row):
+                        continue
+            rest.append(row)
+            if len(rest) >= batch:
+                total += self._insert(rest)
+                rest = []
+        if rest:
+            total += self._insert(rest)
+        # Older turns go in below the lowest id (ids may be negative), in batches in time order
+        start = None if first_id is None else first_id - len(older)
+        for i in range(0, len(older), batch):
+            total += self._insert(older[i:i + batch], None if start is None else start + i)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(time.time())))
+        return total
+
+    def import_json(self, path, force=False):
+        with open(path, "r", encoding="utf-8") as f:
+            return self.import_entries(json.load(f), path, force)
+
+    def import_log(self, directory, force=False):
+        from memory_store import MemoryStore
+        store = MemoryStore(directory)
+        try:
+            return self.import_entries(store.iter_all(), directory, force)
+        finally:
+            store.close()
+
+    def backfill(self, store):
+        """Index what a MemoryStore held before this index existed; once per log, 0 after that."""
+        try:
+            return self.import_entries(store.iter_all(), store.directory)
+        except RuntimeError:
+            return 0
+
+    # ---------- queries ----------
+    def _id_range(self, since, until):
+        """Row ids bounding a time range, or None when ids can't be trusted to follow time."""
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = 'unordered'").fetchone():
+            return None, None
+        lo = hi = None
+        if since is not None:
+            row = self._conn.execute("SELECT id FROM turns WHERE ts >= ? ORDER BY ts LIMIT 1", (since,)).fetchone()
+            lo = row[0] if row else _MAX_ID  # nothing that recent: an empty range
+        if until is not None:
+            row = self._conn.execute("SELECT id FROM turns WHERE ts <= ? ORDER BY ts DESC LIMIT 1",
+                                     (until,)).fetchone()
+            hi = row[0] if row else -_MAX_ID
+        return lo, hi
+
+    def search(self, text=None, since=None, until=None, project=None, intent=None, user=None, role=None,
+               limit=PAGE_SIZE, cursor=None):
+        """
+        Newest-first page of turns matching every given filter. `text` is keywords
+        (all must match, 'word*' for a prefix); `since`/`until` accept anything
+        parse_time() does. Pass the returned next_cursor to get the following page.
+        """
+        since, until = parse_time(since), parse_time(until)
+        where, args = [], []
+        for column, value in (("project_id", project), ("intent", intent), ("user", user), ("role", role)):
+            if value:
+                where.append(f"t.{column} = ?")
+                args.append(value)
+        if since is not None:
+            where.append("t.ts >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("t.ts <= ?")
+            args.append(until)
+
+        with self._lock:
+            lo, hi = self._id_range(since, until)
+            if cursor is not None:
+                hi = min(hi, int(cursor) - 1) if hi is not None else int(cursor) - 1
+            match = fts_query(text)
+            if match:
+                # Column filters go into the MATCH too, so FTS intersects the posting lists
+                match = " AND ".join([match] + [_phrase(c, v) for c, v in
+                                                (("project_id", project), ("intent", intent), ("user", user)) if v])
+                id_col, source = "turns_fts.rowid", "turns_fts JOIN turns t ON t.id = turns_fts.rowid"
+                where.insert(0, "turns_fts MATCH ?")
+                args.insert(0, match)
+            else:
+                id_col, source = "t.id", "turns t"
+            if lo is not None:
+                where.append(f"{id_col} >= ?")
+                args.append(lo)
+            if hi is not None:
+                where.append(f"{id_col} <= ?")
+                args.append(hi)
+            sql = (f"SELECT {_COLUMNS} FROM {source}" + (" WHERE " + " AND ".join(where) if where else "")
+                   + f" ORDER BY {id_col} DESC LIMIT ?")
+            rows = self._conn.execute(sql, args + [limit + 1]).fetchall()
+        turns = [Turn(*row) for row in rows[:limit]]
+        return Page(turns, turns[-1].id if len(rows) > limit else None)
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM turns").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _print_page(page, as_json=False):
+    for turn in page.turns:
+        if as_json:
+            print(json.dumps(turn._asdict(), ensure_ascii=False))
+            continue
+        when = datetime.fromtimestamp(turn.ts).strftime("%Y-%m-%d %H:%M") if turn.ts else "—"
+        print(f"{when}  {turn.user:<12} {turn.project_id or '-':<8} {turn.intent or '-':<12} "
+              f"{turn.role:<9} {turn.content.replace(chr(10), ' ')[:100]}")
+    if page.next_cursor is not None and not as_json:
+        print(f"… more: --cursor {page.next_cursor}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Miss Riverdale conversation history search")
+    parser.add_argument("--index", default=os.getenv("RIVERDALE_HISTORY_INDEX") or INDEX_FILE)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    search = sub.add_parser("search", help="keyword / time / project / intent / user filters, newest first")
+    search.add_argument("text", nargs="*")
+    search.add_argument("--since", help="ISO time, date, or 30m / 12h / 7d / 2w ago")
+    search.add_argument("--until")
+    search.add_argument("--project")
+    search.add_argument("--intent", choices=["construction", "fun", "general", "restricted"])
+    search.add_argument("--user")
+    search.add_argument("--role", choices=["user", "assistant"])
+    search.add_argument("--limit", type=int, default=PAGE_SIZE)
+    search.add_argument("--cursor", type=int)
+    search.add_argument("--json", action="store_true", help="one JSON object per line")
+    imp = sub.add_parser("import", help="one-time import of memory.json or a memory_log directory")
+    imp.add_argument("source")
+    imp.add_argument("--force", action="store_true")
+    sub.add_parser("stats")
+    args = parser.parse_args()
+
+    index = HistoryIndex(args.index)
+    try:
+        if args.cmd == "search":
+            t0 = time.perf_counter()
+            page = index.search(" ".join(args.text), args.since, args.until, args.project, args.intent,
+                                args.user, args.role, args.limit, args.cursor)
+            _print_page(page, args.json)
+            if not args.json:
+                print(f"{len(page.turns)} turns in {(time.perf_counter() - t0) * 1000:.1f} ms")
+        elif args.cmd == "import":
+            t0 = time.perf_counter()
+            try:
+                if os.path.isdir(args.source):
+                    n = index.import_log(args.source, args.force)
+                else:
+                    n = index.import_json(args.source, args.force)
+            except RuntimeError as e:
+                raise SystemExit(str(e))
+            print(f"Imported {n} turns from {args.source} in {time.perf_counter() - t0:.1f}s")
+        elif args.cmd == "stats":
+            print(json.dumps({"turns": index.count(), "path": index.path}))
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# llm.py — Miss Riverdale: streaming chat completions, split into speakable sentences
+import queue, re, threading, time
+from types import SimpleNamespace
+
+MODEL = "gpt-4o-mini"
+MAX_TOKENS = 200
+
+# A sentence ends at . ! ? । (Devanagari danda) or a newline, followed by whitespace
+_SENTENCE_END_RE = re.compile(r"(.+?(?:[.!?।]+|\n))(?=\s|$)", re.S)
+
+
+class SentenceBuffer:
+    """Accumulates streamed tokens and releases whole sentences as soon as they close."""
+
+    def __init__(self):
+        self._text = ""
+
+    def feed(self, token):
+        self._text += token
+        sentences = []
+        while True:
+            m = _SENTENCE_END_RE.match(self._text)
+            # Hold back a terminator at the very end: "2." may still become "2.5"
+            if not m or m.end() == len(self._text):
+                break
+            sentence = m.group(1).strip()
+            if sentence:
+                sentences.append(sentence)
+            self._text = self._text[m.end():]
+        return sentences
+
+    def flush(self):
+        rest, self._text = self._text.strip(), ""
+        return [rest] if rest else []
+
+
+class SentenceStream:
+    """Thread-safe iterable of sentences; the TTS engine consumes it while the LLM fills it."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self.count = 0
+
+    def put(self, sentence):
+        self.count += 1
+        self._queue.put(sentence)
+
+    def close(self):
+        self._queue.put(None)
+
+    def __iter__(self):
+        while True:
+            sentence = self._queue.get()
+            if sentence is None:
+                return
+            yield sentence
+
+
+class StreamMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.first_sentence = None
+        self.finished = None
+        self.tokens = 0
+
+    @property
+    def time_to_first_token(self):
+        return None if self.first_token is None else self.first_token - self.started
+
+    @property
+    def time_to_first_sentence(self):
+        return None if self.first_sentence is None else self.first_sentence - self.started
+
+    def as_dict(self):
+        return {
+            "time_to_first_token": self.time_to_first_token,
+            "time_to_first_sentence": self.time_to_first_sentence,
+            "total": None if self.finished is None else self.finished - self.started,
+            "tokens": self.tokens,
+        }
+
+
+def stream_completion(client, messages, on_token=None, on_sentence=None, model=MODEL, metrics=None):
+    """
+    Stream one chat completion. Tokens go to on_token as they arrive, complete
+    sentences to on_sentence. Returns the full reply text.
+    """
+    metrics = metrics or StreamMetrics()
+    buffer = SentenceBuffer()
+    parts = []
+
+    def emit(sentences):
+        for sentence in sentences:
+            if metrics.first_sentence is None:
+                metrics.first_sentence = time.perf_counter()
+            if on_sentence:
+                on_sentence(sentence)
+
+    stream = client.chat.completions.create(model=model, messages=messages,
+                                            max_tokens=MAX_TOKENS, stream=True)
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        token = chunk.choices[0].delta.content
+        if not token:
+            continue
+        if metrics.first_token is None:
+            metrics.first_token = time.perf_counter()
+        metrics.tokens += 1
+        parts.append(token)
+        if on_token:
+            on_token(token)
+        emit(buffer.feed(token))
+    emit(buffer.flush())
+    metrics.finished = time.perf_counter()
+    return "".join(parts)
+
+
+# ---------------- STUB CLIENT ----------------
+class StubLLMClient:
+    """
+    Offline stand-in for OpenAI(): client.chat.completions.create(stream=True)
+    yields `reply` word by word after `first_token_delay`, `token_delay` apart.
+    """
+
+    def __init__(self, reply="Namaste! Main Miss Riverdale hoon. Aapki kya madad karun?",
+                 first_token_delay=0.3, token_delay=0.03, fail=None):
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.fail = fail  # exception to raise instead of answering
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.models = SimpleNamespace(list=lambda: [])
+
+    def _create(self, model=None, messages=None, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if self.fail:
+            raise self.fail
+        tokens = re.findall(r"\S+\s*", self.reply)
+        if not stream:
+            time.sleep(self.first_token_delay + self.token_delay * len(tokens))
+            message = SimpleNamespace(content=self.reply, role="assistant")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+        def chunks():
+            time.sleep(self.first_token_delay)
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(self.token_delay)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+        return chunks()
@@ -0,0 +1,85 @@
+# loadtest.py — Miss Riverdale: concurrent client simulation against server.py
+#
+#   python server.py --no-audio &
+#   python loadtest.py --clients 200 --turns 20
+import argparse, asyncio, json, random, statistics, time
+
+from bench import corpus_user_turns
+
+
+async def _post(reader, writer, host, path, payload):
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    return status, await reader.readexactly(length)
+
+
+async def client(n, host, port, turns, corpus, latencies, errors, think):
+    """One site tablet: keep-alive connection, `turns` questions from the recorded corpus."""
+    reader, writer = await asyncio.open_connection(host, port)
+    user = f"loadtest-{n}"
+    try:
+        for _ in range(turns):
+            t0 = time.perf_counter()
+            try:
+                status, _ = await _post(reader, writer, host, "/chat", {"user": user, "text": random.choice(corpus)})
+                if status != 200:
+                    errors.append(status)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                errors.append(repr(e))
+                break
+            latencies.append(time.perf_counter() - t0)
+            if think:
+                await asyncio.sleep(random.uniform(0, think))
+    finally:
+        writer.close()
+
+
+def _pct(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run(host, port, clients, turns, think):
+    corpus = corpus_user_turns()
+    latencies, errors = [], []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(n, host, port, turns, corpus, latencies, errors, think)
+                           for n in range(clients)))
+    elapsed = time.perf_counter() - t0
+    result = {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(_pct(latencies, 0.50) * 1000, 1) if latencies else None,
+        "p99_ms": round(_pct(latencies, 0.99) * 1000, 1) if latencies else None,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else None,
+    }
+    print(json.dumps(result, indent=2))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Miss Riverdale server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--think", type=float, default=0.0, help="max random pause between turns (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.clients, args.turns, args.think))
+
+
+if __name__ == "__main__":
+    main()
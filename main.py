@@ -2,10 +2,19 @@ import tkinter as tk
 from tkinter import scrolledtext
 from PIL import Image, ImageTk
 import threading, os
-import speech_recognition as sr
-from ai_core import chat_with_ai, load_memory, OPENAI_API_KEY
-from voice_utils import speak
-from openai import OpenAI
+from ai_core import (attach_user, chat_with_ai, clean_output, flush_memory, load_memory, memory_store, start_feed,
+                     subscribe_notices, OPENAI_API_KEY, SESSIONS)
+from voice_utils import speak, speak_stream, cancel_speech, warm_up
+from llm import SentenceStream
+from turn_queue import TurnScheduler
+from backends import BACKENDS, CLOSED, HALF_OPEN
+from transcript import TranscriptView, older_messages
+import metrics
+
+# RIVERDALE_STARTUP_PROBE=1: print "first_paint" once the window is drawn and exit (bench.py startup)
+STARTUP_PROBE = os.getenv("RIVERDALE_STARTUP_PROBE") == "1"
+WARM_UP_DELAY_MS = 300  # let the first frame paint before loading engines
+SHUTDOWN_GRACE = 10.0   # seconds a turn still running at close gets to finish
 
 # ---- THEME COLORS ----
 BG = "#F9F9F6"
@@ -21,6 +30,8 @@ class RiverdaleApp:
         self.root.resizable(False, False)
 
         self.memory = load_memory()
+        self.turns = TurnScheduler(self._reply, on_reply=self._on_reply, on_speak=self._speak)
+        self._streamed_reply = None  # reply already shown/spoken token by token
         self.online_status = tk.StringVar(value="Checking...")
         self._recording = False
         self.record_seconds = 0
@@ -52,9 +63,11 @@ class RiverdaleApp:
                                                   bg="#FFFFFF", fg="#333",
                                                   relief="flat", bd=1)
         self.chat_box.pack(padx=15, pady=(15, 10))
-        self.chat_box.insert(tk.END,
-            "Miss Riverdale: Namaste ji! Main Riverdale bol rahi hoon — chai pee li? ☕\n\n")
         self.chat_box.config(state=tk.DISABLED)
+        # Every widget update goes through this queue; older turns page in from the log
+        self.transcript = TranscriptView(root, self.chat_box, history=self._older_history)
+        self.transcript.post("Miss Riverdale", "Namaste ji! Main Riverdale bol rahi hoon — chai pee li? ☕",
+                             logged=False)
 
         # ----- INPUT AREA -----
         inp = tk.Frame(root, bg=BG)
@@ -90,29 +103,60 @@ class RiverdaleApp:
                  text="© Riverwood Projects LLP | ‘We don’t just build homes, we build stories.’",
                  bg=BG, fg="#555", font=("Segoe UI", 9, "italic")).pack()
 
-        threading.Thread(target=self.check_online_status, daemon=True).start()
+        self.root.after(WARM_UP_DELAY_MS, self._start_warm_up)
+
+    def _start_warm_up(self):
+        """Load the API client and speech engines in the background once the window is up."""
+        threading.Thread(target=self._warm_up, daemon=True).start()
+
+    def _warm_up(self):
+        # The header follows the breakers; the prober keeps them current
+        BACKENDS.subscribe(lambda name, state: self.transcript.call(self.check_online_status))
+        BACKENDS.probe_all()
+        BACKENDS.start_prober()
+        self.transcript.call(self.check_online_status)
+        # Field updates to the project being discussed show up in the chat as they land
+        subscribe_notices(self._on_notice)
+        attach_user("default")
+        start_feed()
+        warm_up()
+
+    def _on_notice(self, user, project_id, text):
+        if user == "default":
+            self.transcript.post("Miss Riverdale", text, logged=False)
+
+    def shutdown(self, grace=SHUTDOWN_GRACE):
+        """After the window closes: let running turns finish, then write the log and sessions."""
+        self.turns.join(grace)
+        flush_memory()
+        SESSIONS.flush()
 
     # ---- STATUS CHECK ----
     def check_online_status(self):
+        """Show the live breaker state of the model backend (and whether the voice is offline)."""
         if not OPENAI_API_KEY:
-            self.online_status.set("⚪ Offline (no API key)")
-            self.status_label.config(fg="lightgray")
-            return
-        try:
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            client.models.list()
-            self.online_status.set("🟢 Online")
-            self.status_label.config(fg="#7CFC00")
-        except Exception:
-            self.online_status.set("⚪ Offline")
-            self.status_label.config(fg="lightgray")
+            text, color = "⚪ Offline (no API key)", "lightgray"
+        else:
+            state = BACKENDS["llm"].state
+            if state == CLOSED:
+                text, color = "🟢 Online", "#7CFC00"
+            elif state == HALF_OPEN:
+                text, color = "🟡 Reconnecting…", "#FFD700"
+            else:
+                text, color = "⚪ Offline", "lightgray"
+        if BACKENDS["gtts"].state != CLOSED:
+            text += " · offline voice"
+        self.online_status.set(text)
+        self.status_label.config(fg=color)
 
     # ---- CHAT SYSTEM ----
-    def append_message(self, sender, message):
-        self.chat_box.config(state=tk.NORMAL)
-        self.chat_box.insert(tk.END, f"{sender}: {message}\n\n")
-        self.chat_box.config(state=tk.DISABLED)
-        self.chat_box.yview(tk.END)
+    def append_message(self, sender, message, logged=True):
+        """Safe from any thread; shown with the next frame."""
+        self.transcript.post(sender, message, logged)
+
+    def _older_history(self, skip, limit):
+        flush_memory()  # so the log holds everything already on screen
+        return older_messages(memory_store(), skip, limit)
 
     def on_send(self):
         text = self.entry.get().strip()
@@ -120,7 +164,9 @@ class RiverdaleApp:
             return
         self.entry.delete(0, tk.END)
         self.append_message("You", text)
-        threading.Thread(target=self._reply, args=(text,), daemon=True).start()
+        if not self.turns.submit("default", text):
+            self.append_message("Miss Riverdale", "Ek second ji, pichhle sawaal ka jawab de rahi hoon…",
+                                logged=False)
 
     # ---- VOICE CONTROL ----
     def toggle_voice_record(self):
@@ -128,19 +174,59 @@ class RiverdaleApp:
         ...
 
     # ---- AI RESPONSE ----
-    def _reply(self, user_input):
-        reply, self.memory = chat_with_ai(user_input, self.memory)
+    def _reply(self, session_id, user_input):
+        # Runs on a scheduler worker; turns for one session never overlap.
+        # Model replies stream in: tokens to the chat box, sentences to the voice.
+        sentences = SentenceStream()
+        tokens = []
+
+        def on_token(token):
+            if not tokens:
+                cancel_speech()
+                self.transcript.begin_stream()
+                threading.Thread(target=speak_stream, args=(sentences,), daemon=True).start()
+            tokens.append(token)
+            self.transcript.stream_token(token)
+
+        try:
+            reply, self.memory = chat_with_ai(user_input, self.memory, SESSIONS.get(session_id),
+                                              on_token=on_token, on_sentence=sentences.put)
+        finally:
+            sentences.close()
+        if tokens:
+            if reply == clean_output("".join(tokens).strip()):
+                self._streamed_reply = reply
+            else:
+                # The model failed mid-reply: close the partial text, the fallback follows as its own message
+                self.transcript.end_stream()
+        return reply
+
+    def _on_reply(self, session_id, user_input, reply):
+        if reply is self._streamed_reply:
+            self.transcript.end_stream()
+            return
+        cancel_speech()  # a fresh reply interrupts the one still being spoken
         self.append_message("Miss Riverdale", reply)
-        speak(reply)
+
+    def _speak(self, reply):
+        if reply is not self._streamed_reply:
+            speak(reply)
 
 
 # ---- SAFE ENTRY POINT ----
 if __name__ == "__main__":
     try:
         print(">>> Launching Miss Riverdale GUI...")
+        metrics.configure_from_env()
         root = tk.Tk()
         app = RiverdaleApp(root)
-        root.mainloop()
+        if STARTUP_PROBE:
+            root.update()  # map and draw the window once
+            print("first_paint", flush=True)
+            root.destroy()
+        else:
+            root.mainloop()
+            app.shutdown()  # the log and session writers are daemon threads
     except Exception as e:
         import traceback
         traceback.print_exc()
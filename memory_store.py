@@ -0,0 +1,306 @@
+# memory_store.py — Miss Riverdale: append-only, segmented conversation log
+import glob, json, os, queue, re, threading
+from datetime import datetime
+
+MEMORY_DIR = "memory_log"
+LEGACY_MEMORY_FILE = "memory.json"
+SEGMENT_MAX_BYTES = 256 * 1024      # roll the active segment past this size
+COMPACT_MIN_SEGMENTS = 8            # sealed segments before a background merge
+COMPACT_MAX_BYTES = 8 * 1024 * 1024  # upper bound for one merged segment
+TAIL_TURNS = 200                    # entries loaded into the GUI at startup
+
+# seg-00000012.jsonl (live/sealed) or seg-00000003-00000011.jsonl (compacted)
+_SEGMENT_RE = re.compile(r"seg-(\d{8})(?:-(\d{8}))?\.jsonl$")
+
+
+def _segment_name(first, last=None):
+    if last is None or last == first:
+        return f"seg-{first:08d}.jsonl"
+    return f"seg-{first:08d}-{last:08d}.jsonl"
+
+
+def _parse_lines(lines):
+    """Decode JSON lines, skipping anything torn or corrupt."""
+    entries = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
+
+
+def _read_tail_lines(path, limit, block=64 * 1024):
+    """Return up to `limit` complete lines from the end of a file without reading all of it."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") <= limit:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.split(b"\n")
+    if pos > 0:
+        lines = lines[1:]  # first piece may be a partial line
+    return [l.decode("utf-8", "replace") for l in lines if l.strip()][-limit:]
+
+
+class MemoryStore:
+    """
+    Conversation history as JSON lines spread over size-bounded segments.
+    - Appends touch only the active segment, so a turn costs O(1)
+    - Sealed segments are merged in the background
+    - A torn trailing line from a crash is truncated on open
+    """
+
+    def __init__(self, directory=MEMORY_DIR, segment_max_bytes=SEGMENT_MAX_BYTES,
+                 compact_min_segments=COMPACT_MIN_SEGMENTS, fsync=False):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.compact_min_segments = compact_min_segments
+        self.fsync = fsync
+        self.synced = 0  # entries of the caller's list already on disk
+        self._lock = threading.RLock()
+        self._readers = 0  # iter_all() calls in progress; compaction won't delete segments under them
+        self._swapping = False  # a merge is waiting for them; new readers wait for it instead
+        self._readers_changed = threading.Condition(self._lock)
+        self._compactor = None
+        self._active = None
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+        self._open_active()
+
+    # ---------- segment bookkeeping ----------
+    def _segments(self):
+        """[(first, last, path)] sorted oldest first."""
+        found = []
+        for path in glob.glob(os.path.join(self.directory, "seg-*.jsonl")):
+            m = _SEGMENT_RE.search(os.path.basename(path))
+            if m:
+                first = int(m.group(1))
+                last = int(m.group(2) or m.group(1))
+                found.append((first, last, path))
+        return sorted(found)
+
+    def _recover(self):
+        # Unfinished compaction output is discarded; its inputs are still intact
+        for tmp in glob.glob(os.path.join(self.directory, "*.tmp")):
+            os.remove(tmp)
+
+        # A compaction that renamed its output but crashed before deleting inputs:
+        # any segment inside another one's range (seg-9-16 inside seg-1-16) is one of them
+        segments = self._segments()
+        for first, last, path in segments:
+            if any(a <= first and last <= b and (a, b) != (first, last) for a, b, _ in segments):
+                os.remove(path)
+
+        # Torn write at the end of the live segment
+        segments = self._segments()
+        if segments:
+            path = segments[-1][2]
+            with open(path, "rb+") as f:
+                data = f.read()
+                if data and not data.endswith(b"\n"):
+                    f.truncate(data.rfind(b"\n") + 1)
+
+    def _open_active(self):
+        segments = self._segments()
+        if segments and segments[-1][0] == segments[-1][1]:
+            path = segments[-1][2]
+        else:
+            seq = segments[-1][1] + 1 if segments else 1
+            path = os.path.join(self.directory, _segment_name(seq))
+        self._active_path = path
+        self._active = open(path, "a", encoding="utf-8")
+        self._active_size = self._active.tell()
+
+    def _roll(self):
+        self._active.close()
+        seq = self._segments()[-1][1] + 1
+        self._active_path = os.path.join(self.directory, _segment_name(seq))
+        self._active = open(self._active_path, "a", encoding="utf-8")
+        self._active_size = 0
+        self._maybe_compact()
+
+    # ---------- writes ----------
+    def append(self, entries):
+        """Append entries to the live segment (one JSON object per line); returns them as written."""
+        written = []
+        with self._lock:
+            for entry in entries:
+                if "ts" not in entry:
+                    entry = {**entry, "ts": datetime.now().isoformat()}
+                written.append(entry)
+                line = json.dumps(entry, ensure_ascii=False) + "\n"
+                self._active.write(line)
+                self._active_size += len(line.encode("utf-8"))
+            self._active.flush()
+            if self.fsync:
+                os.fsync(self._active.fileno())
+            if self._active_size >= self.segment_max_bytes:
+                self._roll()
+        return written
+
+    def sync(self, memory):
+        """Persist whatever the caller appended to `memory` since the last sync."""
+        if len(memory) < self.synced:
+            self.synced = len(memory)
+        new = memory[self.synced:]
+        if new:
+            self.append(new)
+        self.synced = len(memory)
+
+    # ---------- reads ----------
+    def tail(self, limit=TAIL_TURNS):
+        """Most recent `limit` entries, oldest first."""
+        with self._lock:
+            collected = []
+            for _, _, path in reversed(self._segments()):
+                need = limit - len(collected)
+                if need <= 0:
+                    break
+                collected = _parse_lines(_read_tail_lines(path, need)) + collected
+            return collected[-limit:] if limit else []
+
+    def iter_all(self):
+        """
+        Every entry, oldest first (for exports, the history backfill and offline tooling).
+        Compaction waits to swap segments until the iteration finishes or is closed.
+        """
+        with self._lock:
+            while self._swapping:
+                self._readers_changed.wait()
+            segments = self._segments()
+            self._readers += 1
+        try:
+            for _, _, path in segments:
+                with open(path, "r", encoding="utf-8") as f:
+                    yield from _parse_lines(f)
+        finally:
+            with self._lock:
+                self._readers -= 1
+                self._readers_changed.notify_all()
+
+    # ---------- compaction ----------
+    def _maybe_compact(self):
+        sealed = self._segments()[:-1]
+        if len(sealed) < self.compact_min_segments:
+            return
+        if self._compactor and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+
+    def compact(self):
+        """Merge runs of sealed segments into larger ones, dropping corrupt lines."""
+        with self._lock:
+            sealed = self._segments()[:-1]
+        run, size = [], 0
+        for seg in sealed + [None]:
+            seg_size = os.path.getsize(seg[2]) if seg else 0
+            if seg is None or (run and size + seg_size > COMPACT_MAX_BYTES):
+                if len(run) > 1:
+                    self._merge(run)
+                run, size = [], 0
+            if seg is not None:
+                run.append(seg)
+                size += seg_size
+
+    def _merge(self, run):
+        first, last = run[0][0], run[-1][1]
+        tmp = os.path.join(self.directory, _segment_name(first, last) + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as out:
+            for _, _, path in run:
+                with open(path, "r", encoding="utf-8") as f:
+                    for entry in _parse_lines(f):
+                        out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+        with self._lock:
+            self._swapping = True
+            try:
+                while self._readers:
+                    self._readers_changed.wait()
+                os.replace(tmp, os.path.join(self.directory, _segment_name(first, last)))
+                for _, _, path in run:
+                    os.remove(path)
+            finally:
+                self._swapping = False
+                self._readers_changed.notify_all()
+
+    # ---------- migration ----------
+    def import_legacy(self, path=LEGACY_MEMORY_FILE):
+        """One-time import of the old whole-file memory.json into an empty log."""
+        if any(os.path.getsize(p) for _, _, p in self._segments()):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except Exception:
+            return 0
+        self.append(entries)
+        return len(entries)
+
+    def close(self):
+        with self._lock:
+            if self._active:
+                self._active.close()
+                self._active = None
+
+
+class AsyncWriter:
+    """
+    Single background writer in front of a MemoryStore.
+    Callers hand off entries and return immediately; one thread owns the disk.
+    Each sink(entries) is then called on the same thread with the entries as written
+    (timestamps included), e.g. to keep a search index current.
+    """
+
+    def __init__(self, store, sinks=()):
+        self.store = store
+        self.sinks = list(sinks)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            entries = self._queue.get()
+            try:
+                if entries is None:
+                    return
+                if callable(entries):
+                    entries()
+                    continue
+                written = self.store.append(entries)
+            except Exception as e:
+                print("⚠️ Error saving memory:", e)
+            else:
+                for sink in self.sinks:
+                    try:
+                        sink(written)
+                    except Exception as e:
+                        print("⚠️ Memory sink error:", e)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, entries):
+        if entries:
+            self._queue.put(list(entries))
+
+    def call(self, fn):
+        """Run fn() on the writer thread, after everything submitted before it."""
+        self._queue.put(fn)
+
+    def flush(self):
+        """Block until everything submitted so far is on disk."""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
@@ -0,0 +1,220 @@
+# metrics.py — Miss Riverdale: stage spans, counters and latency histograms
+#
+#   RIVERDALE_METRICS=1             turn instrumentation on
+#   RIVERDALE_METRICS_PORT=9464     Prometheus text endpoint (GET /metrics) when on
+#   RIVERDALE_TRACE=trace.jsonl     also write one JSON line per finished span (implies on)
+#
+#   with metrics.span("classify"):
+#       ...
+#   metrics.inc("tts_fallbacks_total")
+#
+# Disabled (the default), span() hands back one shared no-op object and inc()/observe()
+# return on the first line, so the instrumented code pays a function call and a flag check.
+import json, os, threading, time
+from collections import defaultdict
+
+# Seconds; spans range from µs lookups to multi-second gTTS round trips
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PORT = 9464
+
+_enabled = False
+_lock = threading.Lock()
+_counters = defaultdict(float)      # (name, labels) -> value
+_histograms = {}                    # (name, labels) -> [bucket counts..., sum, count]
+_trace = None                       # open JSONL file
+_local = threading.local()
+
+
+def enabled():
+    return _enabled
+
+
+def enable(trace_path=None):
+    """Start collecting; with `trace_path`, append every finished span to that JSONL file."""
+    global _enabled, _trace
+    with _lock:
+        if trace_path and _trace is None:
+            _trace = open(trace_path, "a", encoding="utf-8", buffering=1)
+        _enabled = True
+
+
+def disable():
+    global _enabled, _trace
+    with _lock:
+        _enabled = False
+        if _trace is not None:
+            _trace.close()
+            _trace = None
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def inc(name, value=1, **labels):
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] += value
+
+
+def observe(name, seconds, **labels):
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[i] += 1
+        h[-2] += seconds
+        h[-1] += 1
+
+
+# ---------------- SPANS ----------------
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **labels):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """One timed stage. Nested spans on the same thread record their parent in the trace."""
+
+    __slots__ = ("name", "labels", "parent", "started", "seconds")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.parent = None
+        self.started = 0.0
+        self.seconds = None
+
+    def set(self, **labels):
+        """Attach labels learned inside the span (e.g. which reply path was taken)."""
+        self.labels.update(labels)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.started
+        _local.stack.pop()
+        if exc_type is not None:
+            self.labels["error"] = exc_type.__name__
+        observe("riverdale_stage_seconds", self.seconds, stage=self.name)
+        if _trace is not None:
+            record = {"ts": round(time.time(), 6), "span": self.name, "ms": round(self.seconds * 1000, 3),
+                      "parent": self.parent, "thread": threading.current_thread().name}
+            if self.labels:
+                record.update(self.labels)
+            line = json.dumps(record, ensure_ascii=False)
+            with _lock:
+                if _trace is not None:
+                    _trace.write(line + "\n")
+        return False
+
+
+def span(name, **labels):
+    """Time a stage: `with span("tts.synthesize", lang="hi"):`."""
+    if not _enabled:
+        return _NOOP
+    return Span(name, labels)
+
+
+# ---------------- EXPORT ----------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def render():
+    """Everything collected so far in the Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((k, list(v)) for k, v in _histograms.items())
+    lines, typed = [], set()
+    for (name, labels), value in counters:
+        if name not in typed:
+            lines.append(f"# TYPE {name} counter")
+            typed.add(name)
+        lines.append(f"{name}{_labels(labels)} {value:g}")
+    for (name, labels), h in histograms:
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        for bound, count in zip(BUCKETS, h):
+            lines.append(f"{name}_bucket{_labels(labels, ('le', f'{bound:g}'))} {count}")
+        lines.append(f"{name}_bucket{_labels(labels, ('le', '+Inf'))} {h[-1]}")
+        lines.append(f"{name}_sum{_labels(labels)} {h[-2]:.6f}")
+        lines.append(f"{name}_count{_labels(labels)} {h[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def serve(port=PORT, host="127.0.0.1"):
+    """GET /metrics on a daemon thread; returns the HTTPServer (call .shutdown() to stop)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=httpd.serve_forever, name="metrics", daemon=True).start()
+    return httpd
+
+
+def configure_from_env():
+    """Apply RIVERDALE_METRICS / RIVERDALE_TRACE / RIVERDALE_METRICS_PORT; returns the HTTP server or None."""
+    trace_path = os.getenv("RIVERDALE_TRACE")
+    if os.getenv("RIVERDALE_METRICS") != "1" and not trace_path:
+        return None
+    enable(trace_path)
+    port = os.getenv("RIVERDALE_METRICS_PORT")
+    try:
+        return serve(int(port) if port else PORT)
+    except OSError as e:
+        print("⚠️ Metrics endpoint unavailable:", e)
+        return None
@@ -0,0 +1,143 @@
+# playback.py — Miss Riverdale: pipelined phrase synthesis and playback
+import queue, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+PREFETCH = 2  # phrases synthesized ahead of the one playing
+
+
+class PlaybackMetrics:
+    """Timings for one utterance (seconds, measured from the speak() call)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_audio = None
+        self.gaps = []          # silence between phrases, excluding intentional pauses
+        self.synth_times = []
+        self.phrases = 0
+        self.fallback = False
+        self.cancelled = False
+
+    @property
+    def time_to_first_audio(self):
+        return None if self.first_audio is None else self.first_audio - self.started
+
+    @property
+    def mean_gap(self):
+        return sum(self.gaps) / len(self.gaps) if self.gaps else 0.0
+
+    def as_dict(self):
+        return {
+            "time_to_first_audio": self.time_to_first_audio,
+            "mean_gap": self.mean_gap,
+            "max_gap": max(self.gaps, default=0.0),
+            "phrases": self.phrases,
+            "fallback": self.fallback,
+            "cancelled": self.cancelled,
+        }
+
+
+class PlaybackEngine:
+    """
+    Producer/consumer speech pipeline.
+    - synthesize(phrase, lang) -> audio bytes, run on a worker pool up to PREFETCH phrases ahead
+    - play(audio, cancel_event) blocks until the clip ends or the event is set
+    - fallback(phrase) speaks a phrase some other way once synthesis has failed
+    - pause(phrase) -> seconds of deliberate silence after a phrase
+    `phrases` may be any iterable, including one that yields sentences as an LLM streams them;
+    items are strings, or (phrase, lang) pairs when the language varies phrase to phrase.
+    A new speak() or cancel() interrupts whatever is currently playing.
+    """
+
+    def __init__(self, synthesize, play, fallback=None, pause=None, prefetch=PREFETCH):
+        self.synthesize = synthesize
+        self.play = play
+        self.fallback = fallback
+        self.pause = pause or (lambda phrase: 0.0)
+        self.prefetch = prefetch
+        self.last_metrics = None
+        self._pool = ThreadPoolExecutor(max_workers=prefetch + 1, thread_name_prefix="tts")
+        self._cancel = threading.Event()
+        self._speaking = threading.Lock()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _timed_synth(self, phrase, lang):
+        t0 = time.perf_counter()
+        audio = self.synthesize(phrase, lang)
+        return audio, time.perf_counter() - t0
+
+    def _feed(self, phrases, lang, items, slots, cancel, degraded):
+        try:
+            for phrase in phrases:
+                phrase_lang = lang
+                if isinstance(phrase, tuple):
+                    phrase, phrase_lang = phrase
+                phrase = phrase.strip()
+                if not phrase:
+                    continue
+                while not slots.acquire(timeout=0.05):
+                    if cancel.is_set():
+                        return
+                if cancel.is_set():
+                    return
+                future = None if degraded.is_set() else self._pool.submit(self._timed_synth, phrase, phrase_lang)
+                items.put((phrase, future))
+        finally:
+            items.put(None)
+
+    def speak(self, phrases, lang="en"):
+        """Speak phrases in order; blocks until done or interrupted. Returns PlaybackMetrics."""
+        self._cancel.set()               # interrupt the previous utterance
+        with self._speaking:
+            cancel = self._cancel = threading.Event()
+            metrics = self.last_metrics = PlaybackMetrics()
+            items = queue.Queue()
+            slots = threading.Semaphore(self.prefetch + 1)
+            degraded = threading.Event()
+            threading.Thread(target=self._feed, args=(phrases, lang, items, slots, cancel, degraded),
+                             daemon=True).start()
+
+            try:
+                last_end = None
+                while True:
+                    item = items.get()
+                    if item is None or cancel.is_set():
+                        break
+                    phrase, future = item
+                    audio = None
+                    if future is not None and not degraded.is_set():
+                        try:
+                            audio, synth_time = future.result()
+                            metrics.synth_times.append(synth_time)
+                        except Exception as e:
+                            if not self.fallback:
+                                raise
+                            print(f"⚠️ Synthesis failed ({e}) — switching to offline voice.")
+                            degraded.set()
+                            metrics.fallback = True
+
+                    now = time.perf_counter()
+                    if metrics.first_audio is None:
+                        metrics.first_audio = now
+                    elif last_end is not None:
+                        metrics.gaps.append(now - last_end)
+                    if audio is not None:
+                        self.play(audio, cancel)
+                    elif self.fallback:
+                        self.fallback(phrase)
+                    metrics.phrases += 1
+                    slots.release()
+                    if cancel.wait(self.pause(phrase)):
+                        break
+                    last_end = time.perf_counter()
+
+                metrics.cancelled = cancel.is_set()
+                return metrics
+            finally:
+                # Wake a feeder that may be parked on a full window
+                cancel.set()
+
+    def close(self):
+        self.cancel()
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,268 @@
+# project_feed.py — Miss Riverdale: live project updates from a feed directory or SQLite file
+#
+#   RIVERDALE_PROJECT_FEED=feed/            watch a directory of update files
+#   RIVERDALE_PROJECT_FEED=projects.db      watch a SQLite file (same tables as ProjectStore.from_sqlite)
+#
+# Feed files are applied in modification-time order, and again whenever they change.
+# Write them atomically (to a .tmp name, then rename); dotfiles and *.tmp are ignored.
+#   *.json   {"RW00123": {"tasks": {"Roofing": 50}, "progress": 62}}  or a list of
+#            {"project_id": "RW00123", ...} objects. Patch keys:
+#              name / progress / status / lang          replace the field
+#              in_progress / completed / pending        replace the whole list
+#              tasks {task: percent | "completed" | "pending" | "in_progress"}
+#                                                       move single tasks (100% is completed)
+#              deleted: true                            drop the project
+#   *.csv    header project_id,task,progress,state,status,name (any subset after project_id);
+#            progress is the task's when the row names a task, the project's otherwise
+import argparse, csv, json, os, threading, time
+
+import metrics
+from project_store import is_sqlite, read_sqlite
+
+FEED_INTERVAL = 1.0  # seconds between polls
+FEED_EXTENSIONS = (".json", ".csv")
+_FIELDS = ("name", "progress", "status", "lang")
+_STATES = ("in_progress", "completed", "pending")
+
+
+def _number(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+# ---------------- PATCHES ----------------
+def apply_patch(project, patch):
+    """
+    A new record with `patch` applied to `project` (None for a new project);
+    `project` itself is never modified. None when the patch deletes it.
+    """
+    if patch.get("deleted"):
+        return None
+    new = dict(project or {"name": "", "progress": 0, "in_progress": {}, "completed": [],
+                           "pending": [], "status": ""})
+    for field in _FIELDS:
+        if field in patch:
+            new[field] = patch[field]
+    for state in _STATES:
+        if state in patch:
+            value = patch[state]
+            new[state] = dict(value) if state == "in_progress" else list(value)
+    tasks = patch.get("tasks")
+    if tasks:
+        in_progress = dict(new.get("in_progress") or {})
+        completed = list(new.get("completed") or ())
+        pending = list(new.get("pending") or ())
+        for task, value in tasks.items():
+            progress = _number(value)
+            state = value if progress is None else ("completed" if progress >= 100 else "in_progress")
+            if state not in _STATES:
+                continue
+            if state != "in_progress":
+                in_progress.pop(task, None)
+            if state != "completed" and task in completed:
+                completed.remove(task)
+            if state != "pending" and task in pending:
+                pending.remove(task)
+            if state == "in_progress":
+                in_progress[task] = progress if progress is not None else in_progress.get(task, 0)
+            elif state == "completed" and task not in completed:
+                completed.append(task)
+            elif state == "pending" and task not in pending:
+                pending.append(task)
+        new["in_progress"], new["completed"], new["pending"] = in_progress, completed, pending
+    return new
+
+
+def read_patches(path):
+    """(project_id, patch) pairs from one feed file, in file order."""
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                pid = (row.get("project_id") or "").strip()
+                if not pid:
+                    continue
+                task = (row.get("task") or "").strip()
+                patch = {}
+                if task:
+                    value = (row.get("progress") or "").strip() or (row.get("state") or "").strip()
+                    if value:
+                        patch["tasks"] = {task: _number(value) if _number(value) is not None else value}
+                elif _number(row.get("progress")) is not None:
+                    patch["progress"] = _number(row.get("progress"))
+                for field in ("status", "name"):
+                    if (row.get(field) or "").strip():
+                        patch[field] = row[field].strip()
+                if patch:
+                    yield pid, patch
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        yield from data.items()
+    else:
+        for patch in data:
+            pid = patch.get("project_id") or patch.get("id")
+            if pid:
+                yield pid, patch
+
+
+# ---------------- SOURCES ----------------
+class DirectorySource:
+    """Feed files in one directory; each poll returns the patches from files that are new or changed."""
+
+    def __init__(self, path):
+        self.path = path
+        self._seen = {}  # name -> (mtime_ns, size)
+
+    def changed_files(self):
+        try:
+            entries = list(os.scandir(self.path))
+        except FileNotFoundError:
+            return []
+        changed = []
+        for entry in entries:
+            name = entry.name
+            if name.startswith(".") or not name.lower().endswith(FEED_EXTENSIONS) or not entry.is_file():
+                continue
+            stat = entry.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if self._seen.get(name) != signature:
+                changed.append((stat.st_mtime_ns, name, signature))
+        changed.sort()
+        return changed
+
+    def poll(self, store):
+        changes = {}
+        for _, name, signature in self.changed_files():
+            self._seen[name] = signature
+            try:
+                for pid, patch in read_patches(os.path.join(self.path, name)):
+                    base = changes[pid] if pid in changes else store.get(pid)
+                    if base is None and not patch.get("name"):
+                        continue  # update for a project we don't know
+                    changes[pid] = apply_patch(base, patch)
+            except (OSError, ValueError, AttributeError) as e:
+                print(f"⚠️ Bad feed file {name}:", e)
+        return changes
+
+
+class SqliteSource:
+    """
+    A SQLite project file; re-read only after another connection has committed
+    (PRAGMA data_version), then diffed against the store so only changed projects update.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._version = None
+        self._known = set()  # pids that came from this file, so removals can be told apart
+
+    def poll(self, store):
+        import sqlite3
+        if self._conn is None:
+            if not os.path.exists(self.path):
+                return {}
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._version:
+                return {}
+            projects = read_sqlite(self.path, self._conn)
+        except sqlite3.Error as e:
+            print("⚠️ Project feed read error:", e)
+            return {}
+        self._version = version
+        changes = {pid: data for pid, data in projects.items() if store.get(pid) != data}
+        for pid in self._known - projects.keys():
+            changes[pid] = None
+        self._known = set(projects)
+        return changes
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# ---------------- FEED ----------------
+class ProjectFeed:
+    """
+    Polls a source every `interval` seconds on a background thread and applies what
+    changed to a ProjectStore in one snapshot swap (ProjectStore.apply), so turns keep
+    reading the previous snapshot until the new one is complete. Subscribers of the
+    store hear about each changed project, as for any other update; `catching_up`
+    is True during the first poll, which replays files written before this launch.
+    """
+
+    def __init__(self, store, path, interval=FEED_INTERVAL):
+        self.store = store
+        self.path = path
+        self.interval = interval
+        self.source = SqliteSource(path) if is_sqlite(path) else DirectorySource(path)
+        self.stats = {"polls": 0, "applied": 0, "last_apply_ms": None}
+        self.catching_up = True
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def poll(self):
+        """Check the source once and apply what changed; returns the number of projects updated."""
+        with self._lock:
+            try:
+                self.stats["polls"] += 1
+                changes = self.source.poll(self.store)
+                if not changes:
+                    return 0
+                t0 = time.perf_counter()
+                with metrics.span("feed_apply"):
+                    applied = self.store.apply(changes)
+                self.stats["applied"] += applied
+                self.stats["last_apply_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+                metrics.inc("feed_projects_updated_total", applied)
+                return applied
+            finally:
+                self.catching_up = False
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="project-feed", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                print("⚠️ Project feed error:", e)
+            if self._stop.wait(self.interval):
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Miss Riverdale: check a project feed once and print the changes")
+    parser.add_argument("feed", help="feed directory or SQLite file")
+    parser.add_argument("--projects", default=os.getenv("RIVERDALE_PROJECTS"),
+                        help="project .json or SQLite file (default: CONSTRUCTION_DATA)")
+    parser.add_argument("--lang", default="english", choices=("hindi", "hinglish", "english"))
+    args = parser.parse_args()
+
+    from project_store import ProjectStore
+    from replies import change_notice
+    if args.projects:
+        store = ProjectStore.load(args.projects)
+    else:
+        from construction import CONSTRUCTION_DATA
+        store = ProjectStore(CONSTRUCTION_DATA)
+    store.subscribe(lambda pid, data, old: print(
+        pid, "removed" if data is None else change_notice(old, data, args.lang) or "added/unchanged"))
+    print(f"{ProjectFeed(store, args.feed).poll()} project(s) updated")
+
+
+if __name__ == "__main__":
+    main()
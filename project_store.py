@@ -0,0 +1,318 @@
+# project_store.py — Miss Riverdale: indexed project data with fuzzy task lookup
+import functools, json, os, re, threading
+
+# Field workers say "cement", "nal" or "bijli"; tasks are named "Foundation",
+# "Plumbing", "Electrical". Keys are words as spoken or their stems, values are
+# stems (see _stem); the spoken word is looked up first, so "fitting" still matches.
+SYNONYMS = {
+    "cement": "foundation", "concrete": "foundation", "neev": "foundation",
+    "pipe": "plumb", "nal": "plumb", "water": "plumb", "plumber": "plumb",
+    "bijli": "electrical", "wir": "electrical", "wire": "electrical", "electric": "electrical", "electrician": "electrical",
+    "rang": "paint", "colour": "paint", "color": "paint", "painter": "paint",
+    "chhat": "roof", "farsh": "floor", "tile": "floor",
+    "deewar": "wall", "diwar": "wall",
+    "frame": "fram", "structure": "structural", "fitting": "fixture",
+}
+STOPWORDS = {"and", "the", "of", "a", "an", "is", "how", "kaisa", "kaise", "hai", "ka", "ki", "ke", "please"}
+# Words that may surround an owner name without changing who is meant ("Priya ka project")
+OWNER_FILLER = STOPWORDS | {"project", "update", "status", "for", "my", "mera", "meri", "ji"}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_ID_RE = re.compile(r"\b[a-z]{2}\d{3,}\b", re.I)
+_STATE_ORDER = ("in_progress", "completed", "pending")
+# The cross-project term index is split by project so an update copies small buckets
+_TERM_SHARDS = 256
+
+
+def _stem(word):
+    if word in SYNONYMS:
+        return SYNONYMS[word]
+    for suffix in ("ing", "ed", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    return SYNONYMS.get(word, word)
+
+
+def terms(text):
+    """Normalized search terms for free text or a task name."""
+    return [_stem(w) for w in _WORD_RE.findall((text or "").lower()) if w not in STOPWORDS]
+
+
+@functools.lru_cache(maxsize=4096)
+def _task_name_terms(task):
+    """Distinct terms of a task name; the same few names recur across every project."""
+    return tuple(set(terms(task)))
+
+
+class _Snapshot:
+    """
+    One immutable generation of the store's data and indexes. Writers build the
+    next one from a shallow copy (copying only the index buckets they touch) and
+    publish it with a single reference swap, so a reader that holds a snapshot
+    never sees half of an update.
+    """
+    __slots__ = ("projects", "versions", "task_terms", "term_index", "term_shards", "owners", "_own")
+
+    def __init__(self, projects=None, versions=None, task_terms=None, term_index=None, term_shards=None,
+                 owners=None):
+        self.projects = projects if projects is not None else {}
+        self.versions = versions if versions is not None else {}
+        self.task_terms = task_terms if task_terms is not None else {}   # pid -> {term: [(rank, task, state)]}
+        self.term_index = term_index if term_index is not None else {}   # (term, shard) -> {(pid, task)}
+        self.term_shards = term_shards if term_shards is not None else {}  # term -> {shard} with entries
+        self.owners = owners if owners is not None else {}               # "priya" -> [pid]
+        self._own = None  # while building: ids of buckets this snapshot already copied
+
+    def next(self):
+        """A writable copy sharing every bucket with this one until it is written."""
+        snap = _Snapshot(dict(self.projects), dict(self.versions), dict(self.task_terms),
+                         dict(self.term_index), dict(self.term_shards), dict(self.owners))
+        snap._own = set()
+        return snap
+
+    def _writable(self, table, key, empty):
+        bucket = table.get(key)
+        if bucket is None:
+            bucket = table[key] = empty()
+        elif self._own is not None and id(bucket) not in self._own:
+            bucket = table[key] = type(bucket)(bucket)
+        else:
+            return bucket
+        if self._own is not None:
+            self._own.add(id(bucket))
+        return bucket
+
+    def index(self, pid, data):
+        self.projects[pid] = data
+        self.versions[pid] = self.versions.get(pid, 0) + 1
+
+        by_term = {}
+        rank = 0
+        shard = hash(pid) % _TERM_SHARDS
+        for state in _STATE_ORDER:
+            tasks = data.get(state) or {}
+            for task in tasks:
+                for term in _task_name_terms(task):
+                    by_term.setdefault(term, []).append((rank, task, state))
+                    self._writable(self.term_index, (term, shard), set).add((pid, task))
+                    if shard not in self.term_shards.get(term, ()):
+                        self._writable(self.term_shards, term, set).add(shard)
+                rank += 1
+        self.task_terms[pid] = by_term
+
+        owner = (data.get("name") or "").strip().lower()
+        if owner:
+            self._writable(self.owners, owner, list).append(pid)
+
+    def unindex(self, pid):
+        data = self.projects.get(pid)
+        if data is None:
+            return
+        shard = hash(pid) % _TERM_SHARDS
+        for term, entries in self.task_terms.pop(pid, {}).items():
+            if self.term_index.get((term, shard)):
+                bucket = self._writable(self.term_index, (term, shard), set)
+                bucket.difference_update((pid, task) for _, task, _ in entries)
+                if not bucket:
+                    del self.term_index[(term, shard)]
+                    shards = self._writable(self.term_shards, term, set)
+                    shards.discard(shard)
+                    if not shards:
+                        del self.term_shards[term]
+        owner = (data.get("name") or "").strip().lower()
+        if pid in self.owners.get(owner, ()):
+            pids = self._writable(self.owners, owner, list)
+            pids.remove(pid)
+            if not pids:
+                del self.owners[owner]
+
+    def remove(self, pid):
+        self.unindex(pid)
+        self.projects.pop(pid, None)
+        self.versions[pid] = self.versions.get(pid, 0) + 1  # cached replies for it go stale
+
+    def freeze(self):
+        self._own = None
+        return self
+
+
+class ProjectStore:
+    """
+    Project records keyed by ID, same shape as CONSTRUCTION_DATA, plus indexes:
+    - term -> {(project_id, task)} across every project (sharded by project)
+    - per-project term -> tasks, used by find_task
+    - owner name -> project IDs
+    Each project carries a version number that changes whenever its data does;
+    subscribe() registers callbacks fired as callback(project_id, data, old) after
+    an update (data is None when the project was removed).
+
+    Reads take no lock: every lookup works on the current snapshot, and apply()
+    swaps in a new one, so updates never block a turn. Records are treated as
+    immutable; an update passes a new dict rather than editing the stored one.
+    """
+
+    def __init__(self, projects=None):
+        self._lock = threading.Lock()  # writers only
+        self._listeners = []
+        snap = _Snapshot()
+        for pid, data in (projects or {}).items():
+            snap.index(pid, data)
+        self._snap = snap
+
+    # ---------- loading ----------
+    @classmethod
+    def from_json(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_sqlite(cls, path):
+        return cls(read_sqlite(path))
+
+    @classmethod
+    def load(cls, path):
+        if is_sqlite(path):
+            return cls.from_sqlite(path)
+        return cls.from_json(path)
+
+    # ---------- updates ----------
+    def apply(self, changes):
+        """
+        Apply {project_id: new record, or None to remove it} as one snapshot swap,
+        then notify subscribers once per changed project. Returns the number applied.
+        """
+        with self._lock:
+            old_snap = self._snap
+            snap = old_snap.next()
+            applied = []
+            for pid, data in changes.items():
+                old = old_snap.projects.get(pid)
+                if data is None:
+                    if old is None:
+                        continue
+                    snap.remove(pid)
+                else:
+                    snap.unindex(pid)
+                    snap.index(pid, data)
+                applied.append((pid, data, old))
+            self._snap = snap.freeze()
+        for pid, data, old in applied:
+            for callback in list(self._listeners):
+                try:
+                    callback(pid, data, old)
+                except Exception as e:
+                    print("⚠️ Project listener error:", e)
+        return len(applied)
+
+    def update(self, pid, data):
+        """Replace one project's record, re-index it and notify subscribers."""
+        self.apply({pid: data})
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    # ---------- lookups ----------
+    def get(self, pid, default=None):
+        return self._snap.projects.get(pid, default)
+
+    def __contains__(self, pid):
+        return pid in self._snap.projects
+
+    def __len__(self):
+        return len(self._snap.projects)
+
+    def items(self):
+        return self._snap.projects.items()
+
+    def version(self, pid):
+        return self._snap.versions.get(pid, 0)
+
+    def find_project(self, text):
+        """
+        Project a message refers to: an ID anywhere in it ("update for RW00124 please"),
+        or an owner name on its own ("Priya", "Priya ka project"). None if unknown or ambiguous.
+        """
+        snap = self._snap
+        for match in _ID_RE.finditer(text or ""):
+            pid = match.group().upper()
+            if pid in snap.projects:
+                return pid
+        words = [w for w in _WORD_RE.findall((text or "").lower()) if w not in OWNER_FILLER]
+        if words:
+            pids = snap.owners.get(" ".join(words), [])
+            if len(pids) == 1:
+                return pids[0]
+        return None
+
+    def projects_for_owner(self, name):
+        return list(self._snap.owners.get((name or "").strip().lower(), []))
+
+    def find_task(self, pid, text):
+        """
+        Best matching task of one project for free text, as (task, state, progress) or None.
+        Most matching terms wins; ties go to in-progress, then completed, then pending.
+        """
+        snap = self._snap
+        by_term = snap.task_terms.get(pid)
+        if not by_term:
+            return None
+        scores = {}
+        for term in set(terms(text)):
+            for rank, task, state in by_term.get(term, ()):
+                score, _, _ = scores.get(task, (0, rank, state))
+                scores[task] = (score + 1, rank, state)
+        if not scores:
+            return None
+        task, (_, _, state) = min(scores.items(), key=lambda kv: (-kv[1][0], kv[1][1]))
+        progress = snap.projects[pid].get("in_progress", {}).get(task) if state == "in_progress" else None
+        return task, state, progress
+
+    def projects_with_task(self, text):
+        """(project_id, task) pairs across all projects whose task names match every term of `text`."""
+        snap = self._snap
+        wanted = set(terms(text))
+        found = set()
+        shard_sets = [snap.term_shards.get(term) for term in wanted]
+        if not shard_sets or not all(shard_sets):
+            return found
+        # Only shards where every term has entries can hold a match
+        for shard in set.intersection(*shard_sets):
+            found |= set.intersection(*[snap.term_index[(term, shard)] for term in wanted])
+        return found
+
+
+# ---------------- SQLITE ----------------
+def is_sqlite(path):
+    return os.path.splitext(path)[1].lower() in (".db", ".sqlite", ".sqlite3")
+
+
+def read_sqlite(path, conn=None):
+    """
+    Project records from a SQLite file with tables:
+      projects(id TEXT PRIMARY KEY, name TEXT, progress INTEGER, status TEXT)
+      tasks(project_id TEXT, task TEXT, state TEXT, progress INTEGER, position INTEGER)
+    with state one of in_progress / completed / pending. Pass `conn` to reuse a connection.
+    """
+    import sqlite3
+    own = conn is None
+    if own:
+        conn = sqlite3.connect(path)
+    try:
+        projects = {}
+        for pid, name, progress, status in conn.execute("SELECT id, name, progress, status FROM projects"):
+            projects[pid] = {"name": name, "progress": progress, "in_progress": {},
+                             "completed": [], "pending": [], "status": status}
+        rows = conn.execute("SELECT project_id, task, state, progress FROM tasks ORDER BY project_id, position")
+        for pid, task, state, progress in rows:
+            project = projects.get(pid)
+            if project is None:
+                continue
+            if state == "in_progress":
+                project["in_progress"][task] = progress or 0
+            elif state in ("completed", "pending"):
+                project[state].append(task)
+        return projects
+    finally:
+        if own:
+            conn.close()
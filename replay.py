@@ -0,0 +1,245 @@
+# replay.py — Miss Riverdale: end-to-end replay benchmark over the recorded conversation log
+#
+#   python replay.py run                               # memory.json corpus + 10k and 100k synthetic turns
+#   python replay.py run --scales corpus,1000000 --stages chat_with_ai,save_memory
+#   python replay.py compare bench_results/replay-a.json bench_results/replay-b.json
+#
+# Every stage runs in its own process (clean peak RSS) with the network stubbed:
+# the model is StubLLMClient, speech is a no-op synthesizer/player, files go to a temp dir.
+import argparse, json, multiprocessing, os, random, shutil, statistics, subprocess, sys, tempfile, time
+from datetime import datetime
+
+from bench import corpus_user_turns, synthetic_projects
+
+STAGES = ("classify_intent", "construction_reply", "chat_with_ai", "save_memory", "speak")
+DEFAULT_SCALES = ("corpus", "10000", "100000")
+SYNTHETIC_PROJECTS = 10_000
+RESULTS_DIR = "bench_results"
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_TASK_WORDS = ("plumbing", "roofing", "tiles", "painting", "electrical", "foundation", "plaster")
+
+
+# ---------------- CORPUS ----------------
+def build_turns(scale, projects, seed=11):
+    """
+    "corpus" -> the recorded user turns as they are; a number -> that many turns
+    drawn from the recording, a third of them pointed at a random synthetic
+    project/task so the construction paths see realistic traffic.
+    """
+    recorded = corpus_user_turns(os.path.join(_HERE, "memory.json"))
+    if scale == "corpus":
+        return recorded
+    rng = random.Random(seed)
+    ids = list(projects)
+    turns = []
+    for i in range(int(scale)):
+        text = recorded[i % len(recorded)]
+        roll = rng.random()
+        if roll < 0.2:
+            text = f"{rng.choice(ids)} {text}"
+        elif roll < 0.33:
+            text = f"{rng.choice(_TASK_WORDS)} kaisa chal raha hai"
+        turns.append(text)
+    return turns
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _summarize(latencies, elapsed):
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1e6, 1)
+
+    return {
+        "calls": len(ordered),
+        "seconds": round(elapsed, 3),
+        "throughput_per_s": round(len(ordered) / elapsed, 1) if elapsed else None,
+        "p50_us": pct(0.50),
+        "p90_us": pct(0.90),
+        "p99_us": pct(0.99),
+        "max_us": round(ordered[-1] * 1e6, 1),
+        "mean_us": round(statistics.mean(ordered) * 1e6, 1),
+    }
+
+
+# ---------------- STAGES (run inside the child process) ----------------
+def _stub_engines(ai_core, projects):
+    from llm import StubLLMClient
+    from project_store import ProjectStore
+    from replies import ProjectReplies
+    ai_core.client = StubLLMClient("Ji, main aapki madad ke liye yahan hoon. Kuch aur poochna hai?",
+                                   first_token_delay=0, token_delay=0)
+    ai_core._client_checked = True
+    if projects is not None:
+        ai_core.PROJECTS = ProjectStore(projects)
+        ai_core.REPLIES = ProjectReplies(ai_core.PROJECTS)
+
+
+def _stub_voice():
+    import voice_utils
+    from playback import PlaybackEngine
+    voice_utils.playback = PlaybackEngine(
+        synthesize=lambda phrase, lang: phrase.encode("utf-8"),
+        play=lambda audio, cancel: None,
+        fallback=lambda phrase: None,
+        pause=lambda phrase: 0.0,
+    )
+    return voice_utils
+
+
+def run_stage(stage, scale, workdir):
+    """One stage over one scale; returns its summary. Meant for a fresh process."""
+    if _HERE not in sys.path:
+        sys.path.insert(0, _HERE)  # the child's path may be relative to the old working directory
+    os.chdir(workdir)  # memory_log/, session.json and the audio cache land in the temp dir
+    import ai_core
+
+    projects = synthetic_projects(SYNTHETIC_PROJECTS) if scale != "corpus" else None
+    _stub_engines(ai_core, projects)
+    turns = build_turns(scale, projects or {})
+    latencies = []
+    clock = time.perf_counter
+
+    if stage == "classify_intent":
+        for text in turns:
+            t0 = clock()
+            ai_core.classify_intent(text)
+            latencies.append(clock() - t0)
+    elif stage == "construction_reply":
+        ids = [pid for pid, _ in ai_core.PROJECTS.items()]
+        rng = random.Random(3)
+        for text in turns:
+            pid = rng.choice(ids)
+            t0 = clock()
+            ai_core.construction_reply(pid, text, "english")
+            latencies.append(clock() - t0)
+    elif stage == "chat_with_ai":
+        memory, session = [], ai_core.SESSIONS.get("replay")
+        for text in turns:
+            t0 = clock()
+            _, memory = ai_core.chat_with_ai(text, memory, session)
+            latencies.append(clock() - t0)
+    elif stage == "save_memory":
+        memory = []
+        for text in turns:
+            start = len(memory)
+            memory.append({"role": "user", "content": text})
+            memory.append({"role": "assistant", "content": "🏗️ Project Update — replay"})
+            t0 = clock()
+            ai_core.save_memory(memory, memory[start:])
+            latencies.append(clock() - t0)
+            ai_core.trim_memory(memory)
+    elif stage == "speak":
+        voice_utils = _stub_voice()
+        replies = [ai_core.construction_reply(pid, "update", "english") for pid, _ in ai_core.PROJECTS.items()][:50]
+        for i in range(len(turns)):
+            t0 = clock()
+            voice_utils.speak(replies[i % len(replies)])
+            latencies.append(clock() - t0)
+    else:
+        raise ValueError(f"unknown stage {stage!r}")
+
+    elapsed = sum(latencies)
+    if stage in ("chat_with_ai", "save_memory"):
+        t0 = clock()
+        ai_core.flush_memory()  # writes queued behind the turns are part of the cost
+        elapsed += clock() - t0
+    result = _summarize(latencies, elapsed)
+    result["turns"] = len(turns)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+# ---------------- DRIVER ----------------
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=_HERE).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(scales=DEFAULT_SCALES, stages=STAGES, out_dir=RESULTS_DIR):
+    results = {
+        "commit": _commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "scales": {},
+    }
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'scale':>8} | {'stage':18} | {'turns/s':>10} | {'p50':>9} | {'p99':>9} | {'peak RSS':>8}")
+    for scale in scales:
+        results["scales"][scale] = {}
+        for stage in stages:
+            workdir = tempfile.mkdtemp(prefix="riverdale_replay_")
+            try:
+                with ctx.Pool(1) as pool:
+                    r = pool.apply(run_stage, (stage, scale, workdir))
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            results["scales"][scale][stage] = r
+            rss = f"{r['peak_rss_mb']:.0f} MB" if r["peak_rss_mb"] is not None else "—"
+            print(f"{scale:>8} | {stage:18} | {r['throughput_per_s']:>10,.0f} | {r['p50_us']:>6.0f} µs | "
+                  f"{r['p99_us']:>6.0f} µs | {rss:>8}", flush=True)
+
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"replay-{results['commit'] or 'nogit'}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"saved {path}")
+    return path
+
+
+def compare(old_path, new_path, threshold=0.10):
+    """Per-stage p50/p99/throughput change from `old` to `new`; returns False if anything got slower than threshold."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    print(f"{'scale':>8} | {'stage':18} | {'p50':>8} | {'p99':>8} | {'turns/s':>8}")
+    ok = True
+    for scale, stages in new["scales"].items():
+        for stage, r in stages.items():
+            before = old["scales"].get(scale, {}).get(stage)
+            if not before:
+                continue
+            changes = [r[k] / before[k] - 1 if before[k] else 0.0 for k in ("p50_us", "p99_us", "throughput_per_s")]
+            regressed = changes[0] > threshold or changes[1] > threshold or changes[2] < -threshold
+            ok &= not regressed
+            print(f"{scale:>8} | {stage:18} | {changes[0]:+7.1%} | {changes[1]:+7.1%} | {changes[2]:+7.1%}"
+                  + ("  ← slower" if regressed else ""))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the recorded conversation through every stage")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    run_p = sub.add_parser("run", help="replay and save results as JSON")
+    run_p.add_argument("--scales", default=",".join(DEFAULT_SCALES),
+                       help="comma-separated: 'corpus' and/or turn counts (e.g. corpus,10000,1000000)")
+    run_p.add_argument("--stages", default=",".join(STAGES))
+    run_p.add_argument("--out", default=RESULTS_DIR)
+    cmp_p = sub.add_parser("compare", help="compare two saved runs")
+    cmp_p.add_argument("old")
+    cmp_p.add_argument("new")
+    cmp_p.add_argument("--threshold", type=float, default=0.10, help="fail above this relative slowdown")
+    args = parser.parse_args()
+
+    if args.cmd == "run":
+        run(args.scales.split(","), args.stages.split(","), args.out)
+    elif not compare(args.old, args.new, args.threshold):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
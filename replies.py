@@ -0,0 +1,198 @@
+# replies.py — Miss Riverdale: compiled reply templates, rendered one language at a time
+import re, threading
+
+LANG_MODES = ("hindi", "hinglish", "english")
+
+# Characters the TTS engine would read out loud ("asterisk")
+_UNSAFE_RE = re.compile(r"[*]")
+
+
+def tts_safe(text):
+    return _UNSAFE_RE.sub("", text)
+
+
+class Template:
+    """
+    One reply in every language mode. The format strings are made TTS-safe once,
+    here; render() formats only the requested language.
+    """
+    __slots__ = ("_formats",)
+
+    def __init__(self, **formats):
+        self._formats = {lang: tts_safe(fmt) for lang, fmt in formats.items()}
+
+    def render(self, lang_mode, **values):
+        return self._formats[lang_mode].format(**values)
+
+
+def compile_fixed(replies):
+    """{key: {lang: text}} (or {lang: [texts]}) with the unsafe characters already stripped."""
+    compiled = {}
+    for key, value in replies.items():
+        if isinstance(value, dict):
+            compiled[key] = {lang: tts_safe(text) for lang, text in value.items()}
+        else:
+            compiled[key] = [tts_safe(text) for text in value]
+    return compiled
+
+
+TASK_IN_PROGRESS = Template(
+    hindi="🏗️ {name} — {task} {progress}% पूरा हुआ है।",
+    hinglish="🏗️ {name} — {task} {progress}% complete hai.",
+    english="🏗️ Project Update — {name}\n{task}: {progress}% done.",
+)
+TASK_COMPLETED = Template(
+    hindi="🏗️ {name} — {task} काम पूरा हो चुका है।",
+    hinglish="🏗️ {name} — {task} kaam complete ho chuka hai.",
+    english="🏗️ Project Update — {name}\n{task}: Completed.",
+)
+TASK_PENDING = Template(
+    hindi="🏗️ {name} — {task} अभी लंबित है।",
+    hinglish="🏗️ {name} — {task} abhi pending hai.",
+    english="🏗️ Project Update — {name}\n{task}: Pending.",
+)
+TASK_TEMPLATES = {"in_progress": TASK_IN_PROGRESS, "completed": TASK_COMPLETED, "pending": TASK_PENDING}
+
+SUMMARY = Template(
+    hindi="🏗️ {name} का प्रोजेक्ट {progress}% पूरा हुआ है.\n"
+          "वर्तमान काम: {current_task} ({current_progress}%)\n"
+          "✅ पूरा हुआ: {completed}\n"
+          "⏳ लंबित: {pending}\n"
+          "📊 स्थिति: {status}",
+    hinglish="🏗️ {name} ka project {progress}% complete hai.\n"
+             "Current work: {current_task} ({current_progress}%)\n"
+             "✅ Completed: {completed}\n"
+             "⏳ Pending: {pending}\n"
+             "📊 Status: {status}",
+    english="🏗️ Project Update — {name}\n"
+            "Overall progress: {progress}%\n"
+            "🔧 {current_task} ({current_progress}% done)\n"
+            "✅ Completed: {completed}\n"
+            "⏳ Pending: {pending}\n"
+            "📊 Status: {status}",
+)
+
+
+def summary_fields(project):
+    """A project record's template values: TTS-safe, task lists joined."""
+    in_prog = project.get("in_progress", {})
+    if in_prog:
+        current_task, current_progress = next(iter(in_prog.items()))
+    else:
+        current_task, current_progress = "N/A", 0
+    return {
+        "name": tts_safe(str(project["name"])),
+        "progress": project["progress"],
+        "current_task": tts_safe(str(current_task)),
+        "current_progress": current_progress,
+        "completed": tts_safe(", ".join(project["completed"])),
+        "pending": tts_safe(", ".join(project["pending"])),
+        "status": tts_safe(str(project["status"])),
+        "tasks": {task: tts_safe(task) for state in ("in_progress", "completed", "pending")
+                  for task in project.get(state) or ()},
+    }
+
+
+def render_summary(project, lang_mode):
+    """One project's summary without a store or cache (batch jobs, worker processes)."""
+    return SUMMARY.render(lang_mode, **summary_fields(project))
+
+
+# Pushed to a session when the feed changes its current project (see change_notice)
+TASK_MOVED = Template(
+    hindi="{task} अब {progress}% पर है।",
+    hinglish="{task} ab {progress}% par hai.",
+    english="{task} just moved to {progress}%.",
+)
+TASK_DONE = Template(
+    hindi="{task} का काम पूरा हो गया।",
+    hinglish="{task} ka kaam complete ho gaya.",
+    english="{task} is now complete.",
+)
+OVERALL_MOVED = Template(
+    hindi="कुल प्रगति अब {progress}% है।",
+    hinglish="Overall progress ab {progress}% hai.",
+    english="Overall progress is now {progress}%.",
+)
+STATUS_CHANGED = Template(
+    hindi="स्थिति: {status}",
+    hinglish="Status: {status}",
+    english="Status: {status}",
+)
+
+
+def change_notice(old, new, lang_mode):
+    """
+    One line telling a homeowner what changed between two versions of their
+    project ("Roofing just moved to 50%."), or None if nothing they'd notice did.
+    """
+    if not old or not new:
+        return None
+    changes = []
+    old_progress = old.get("in_progress") or {}
+    old_done = set(old.get("completed") or ())
+    for task, progress in (new.get("in_progress") or {}).items():
+        if old_progress.get(task) != progress:
+            changes.append(TASK_MOVED.render(lang_mode, task=tts_safe(task), progress=progress))
+    for task in new.get("completed") or ():
+        if task not in old_done:
+            changes.append(TASK_DONE.render(lang_mode, task=tts_safe(task)))
+    if new.get("progress") != old.get("progress"):
+        changes.append(OVERALL_MOVED.render(lang_mode, progress=new.get("progress")))
+    if new.get("status") != old.get("status"):
+        changes.append(STATUS_CHANGED.render(lang_mode, status=tts_safe(str(new.get("status")))))
+    if not changes:
+        return None
+    return f"🔔 {tts_safe(str(new.get('name')))} — {' '.join(changes)}"
+
+
+class ProjectReplies:
+    """
+    construction_reply text for one ProjectStore. Each project's fields are made
+    TTS-safe (and its task lists joined) once per data version; rendered summaries
+    are cached per (project, lang). Entries carry the version they were built from,
+    so a reply never outlives an update, and subscribe() drops them eagerly.
+    """
+
+    def __init__(self, projects):
+        self.projects = projects
+        self._lock = threading.Lock()
+        self._fields = {}     # pid -> (version, fields)
+        self._summaries = {}  # (pid, lang) -> (version, text)
+        projects.subscribe(self.invalidate)
+
+    def invalidate(self, pid, *_):
+        with self._lock:
+            self._fields.pop(pid, None)
+            for lang in LANG_MODES:
+                self._summaries.pop((pid, lang), None)
+
+    def _project_fields(self, pid, version):
+        cached = self._fields.get(pid)
+        if cached and cached[0] == version:
+            return cached[1]
+        fields = summary_fields(self.projects.get(pid))
+        with self._lock:
+            self._fields[pid] = (version, fields)
+        return fields
+
+    def summary(self, pid, lang_mode):
+        """Full project summary in one language, rendered once per data version."""
+        version = self.projects.version(pid)
+        cached = self._summaries.get((pid, lang_mode))
+        if cached and cached[0] == version:
+            return cached[1]
+        text = SUMMARY.render(lang_mode, **self._project_fields(pid, version))
+        with self._lock:
+            self._summaries[(pid, lang_mode)] = (version, text)
+        return text
+
+    def task(self, pid, task, state, progress, lang_mode):
+        """Status line for one task, as returned by ProjectStore.find_task."""
+        fields = self._project_fields(pid, self.projects.version(pid))
+        return TASK_TEMPLATES.get(state, TASK_PENDING).render(
+            lang_mode, name=fields["name"], task=fields["tasks"].get(task) or tts_safe(task), progress=progress)
+
+    def info(self):
+        with self._lock:
+            return {"projects": len(self._fields), "summaries": len(self._summaries)}
@@ -0,0 +1,95 @@
+# response_cache.py — Miss Riverdale: TTL + LRU cache for model-generated replies
+import collections, re, threading, time
+
+import metrics
+
+MAX_ENTRIES = 512
+TTL_SECONDS = 6 * 60 * 60
+
+_WORD_RE = re.compile(r"[\w']+")
+
+
+def normalize(text):
+    """'How is  Plumbing?' and 'how is plumbing' share one cache entry."""
+    return " ".join(_WORD_RE.findall((text or "").lower()))
+
+
+class ResponseCache:
+    """
+    Replies keyed by (normalized text, lang_mode, project_id, project data version).
+    Entries expire after `ttl` seconds and the least recently used is dropped past
+    `max_entries`. invalidate_project() removes everything tied to one project.
+    Lookups are counted in response_cache_requests_total{result} and the generation
+    time saved by hits in response_cache_saved_seconds_total.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = collections.Counter()
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key -> (reply, expires_at, cost_seconds)
+        self._by_project = {}                      # project_id -> {keys}
+
+    @staticmethod
+    def key(text, lang_mode, project_id=None, version=0):
+        return normalize(text), lang_mode, project_id, version
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.clock() >= entry[1]:
+                self._drop(key)
+                self.stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+            else:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                self.saved_seconds += entry[2]
+        if entry is None:
+            metrics.inc("response_cache_requests_total", result="miss")
+            return None
+        metrics.inc("response_cache_requests_total", result="hit")
+        metrics.inc("response_cache_saved_seconds_total", entry[2])
+        return entry[0]
+
+    def put(self, key, reply, cost_seconds=0.0):
+        """Store a reply along with how long it took to generate (credited on every hit)."""
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (reply, self.clock() + self.ttl, cost_seconds)
+            project_id = key[2]
+            if project_id:
+                self._by_project.setdefault(project_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        keys = self._by_project.get(key[2])
+        if keys:
+            keys.discard(key)
+            if not keys:
+                del self._by_project[key[2]]
+
+    def invalidate_project(self, project_id, *_):
+        with self._lock:
+            for key in list(self._by_project.get(project_id, ())):
+                self._drop(key)
+                self.stats["invalidated"] += 1
+
+    def info(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                **self.stats,
+            }
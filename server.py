@@ -0,0 +1,383 @@
+# server.py — Miss Riverdale: headless asyncio HTTP + WebSocket server
+#
+#   POST /chat   {"user": "tablet-3", "text": "RW00124 update"}  -> {"reply": ..., "project_id": ...}
+#   GET  /ws?user=tablet-3   WebSocket; send {"text": ..., "audio": true}, receive
+#        {"type": "token"}... {"type": "reply"}, then one binary mp3 frame per phrase and {"type": "audio_end"}
+#        {"type": "notice", "project_id": ..., "text": ...} arrives unprompted when the feed changes the user's project
+#        {"type": "error"} when a turn fails; the connection stays open (POST /chat answers 500)
+#   GET  /health
+#   GET  /metrics  Prometheus text (with --metrics)
+import argparse, asyncio, base64, collections, hashlib, json, signal, struct, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import ai_core
+import metrics
+from backends import BACKENDS
+
+HOST = "127.0.0.1"
+PORT = 8765
+WORKERS = 32
+MAX_BODY = 64 * 1024
+SHUTDOWN_GRACE = 10.0
+MAX_IDLE_USERS = 1000  # users whose history and prompt context stay in RAM between turns
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+# ---------------- WEBSOCKET FRAMING ----------------
+async def ws_read(reader):
+    """Read one client frame -> (opcode, payload). Client frames are always masked."""
+    head = await reader.readexactly(2)
+    opcode = head[0] & 0x0F
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > MAX_BODY:
+        raise ValueError("frame too large")
+    mask = await reader.readexactly(4) if head[1] & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+def ws_frame(opcode, payload=b""):
+    """Unmasked server frame (FIN set)."""
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+# ---------------- SERVER ----------------
+class RiverdaleServer:
+    """
+    Wraps chat_with_ai for many concurrent clients.
+    - Turns run on a thread pool; one asyncio.Lock per user keeps each user's turns in order
+    - Each user has their own Session and in-RAM history; the log is written by ai_core's single writer.
+      The least recently active users past max_idle_users drop their in-RAM state (the log and
+      session.json keep it); anonymous WebSocket users are forgotten, session included, on disconnect
+    - Speech is synthesized (through the audio cache) off the event loop and streamed as binary frames
+    """
+
+    def __init__(self, host=HOST, port=PORT, workers=WORKERS, synthesize=None, max_idle_users=MAX_IDLE_USERS):
+        self.host = host
+        self.port = port
+        self.synthesize = synthesize
+        self.max_idle_users = max_idle_users
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="turn")
+        self._server = None
+        self._memories = collections.OrderedDict()  # user -> history list, least recently active first
+        self._user_locks = {}   # user -> asyncio.Lock
+        self._connections = set()
+        self._sockets = {}      # user -> {send_json} of open WebSockets, for project notices
+        self._loop = None
+        self._inflight = set()
+        self._stopping = asyncio.Event()
+
+    # ---------- turn handling ----------
+    def _lock_for(self, user):
+        lock = self._user_locks.get(user)
+        if lock is None:
+            lock = self._user_locks[user] = asyncio.Lock()
+        return lock
+
+    def _memory_for(self, user):
+        memory = self._memories.get(user)
+        if memory is None:
+            memory = self._memories[user] = []
+            self._evict_idle()
+        else:
+            self._memories.move_to_end(user)
+        return memory
+
+    def _evict_idle(self):
+        """Forget the least recently active users past max_idle_users, skipping connected or busy ones."""
+        excess = len(self._memories) - self.max_idle_users
+        for user in list(self._memories):
+            if excess <= 0:
+                break
+            lock = self._user_locks.get(user)
+            if user in self._sockets or (lock and lock.locked()):
+                continue
+            self.forget(user)
+            excess -= 1
+
+    def forget(self, user, keep_session=True):
+        """Drop a user's in-RAM state; keep_session=False also drops their Session."""
+        self._memories.pop(user, None)
+        self._user_locks.pop(user, None)
+        ai_core.forget_user(user, keep_session)
+
+    async def run_turn(self, user, text, on_token=None):
+        loop = asyncio.get_running_loop()
+        token_cb = None
+        if on_token:
+            def token_cb(token):
+                loop.call_soon_threadsafe(on_token, token)
+
+        memory = self._memory_for(user)
+
+        def turn():
+            session = ai_core.SESSIONS.get(user)
+            reply, _ = ai_core.chat_with_ai(text, memory, session, on_token=token_cb)
+            return reply, session.project_id
+
+        async with self._lock_for(user):
+            task = loop.run_in_executor(self._pool, turn)
+            self._inflight.add(task)
+            try:
+                return await task
+            finally:
+                self._inflight.discard(task)
+
+    def push_notice(self, user, project_id, text):
+        """ai_core notice listener (feed thread): forward to the user's open WebSockets."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(
+                self._send_notice, user, {"type": "notice", "project_id": project_id, "text": text})
+
+    def _send_notice(self, user, payload):
+        for send_json in self._sockets.get(user, ()):
+            send_json(payload)
+
+    async def synthesize_reply(self, reply):
+        """Yield mp3 bytes phrase by phrase, synthesized on the pool; a phrase that fails is skipped."""
+        if self.synthesize is None:
+            return
+        from voice_utils import _is_hindi_text, _split_phrases
+        loop = asyncio.get_running_loop()
+        lang = "hi" if _is_hindi_text(reply) else "en"
+        pending = [loop.run_in_executor(self._pool, self.synthesize, p, lang) for p in _split_phrases(reply) if p]
+        for future in pending:  # started together, delivered in order
+            try:
+                audio = await future
+            except Exception as e:  # breaker open, gTTS network error: the text reply already went out
+                metrics.inc("server_tts_errors_total")
+                print("⚠️ Reply synthesis failed:", e)
+                continue
+            yield audio
+
+    # ---------- HTTP ----------
+    async def handle(self, reader, writer):
+        self._connections.add(writer)
+        try:
+            while not self._stopping.is_set():
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                url = urlsplit(target)
+                query = parse_qs(url.query)
+
+                if url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self.handle_websocket(reader, writer, headers, query)
+                    break
+
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    await self.respond(writer, 413, {"error": "body too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self.route(writer, method, url.path, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def respond(self, writer, status, payload, close=False):
+        """JSON for dicts; str payloads go out as text/plain (the metrics page)."""
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json"
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+                  500: "Internal Server Error", 503: "Service Unavailable"}.get(status, "OK")
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: {'close' if close else 'keep-alive'}\r\n\r\n"
+            .encode("latin-1") + body)
+        await writer.drain()
+
+    async def route(self, writer, method, path, body, keep_alive):
+        if path == "/health":
+            await self.respond(writer, 200, {"status": "ok", "users": len(self._memories),
+                                             "inflight": len(self._inflight),
+                                             "backends": BACKENDS.states(),
+                                             "response_cache": ai_core.RESPONSE_CACHE.info()}, close=not keep_alive)
+        elif path == "/metrics" and metrics.enabled():
+            await self.respond(writer, 200, metrics.render(), close=not keep_alive)
+        elif path == "/chat" and method == "POST":
+            if self._stopping.is_set():
+                await self.respond(writer, 503, {"error": "shutting down"}, close=True)
+                return
+            try:
+                request = json.loads(body or b"{}")
+                text = (request.get("text") or "").strip()
+                user = str(request.get("user") or "default")
+            except (ValueError, AttributeError):
+                text = ""
+            if not text:
+                await self.respond(writer, 400, {"error": "text required"}, close=not keep_alive)
+                return
+            started = time.perf_counter()
+            try:
+                reply, project_id = await self.run_turn(user, text)
+            except Exception as e:
+                metrics.inc("server_turn_errors_total")
+                print("⚠️ Turn failed:", e)
+                await self.respond(writer, 500, {"error": "turn failed"}, close=not keep_alive)
+                return
+            await self.respond(writer, 200, {"reply": reply, "project_id": project_id,
+                                             "ms": round((time.perf_counter() - started) * 1000, 1)},
+                               close=not keep_alive)
+        else:
+            await self.respond(writer, 404, {"error": "not found"}, close=not keep_alive)
+
+    # ---------- WebSocket ----------
+    async def handle_websocket(self, reader, writer, headers, query):
+        accept = base64.b64encode(hashlib.sha1((headers.get("sec-websocket-key", "") + _WS_GUID)
+                                               .encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+        anonymous = not query.get("user")
+        user = f"ws-{uuid.uuid4().hex[:8]}" if anonymous else query["user"][0]
+        if anonymous:
+            ai_core.SESSIONS.get(user, persist=False)  # never written to session.json
+
+        def send_json(payload):
+            writer.write(ws_frame(0x1, json.dumps(payload, ensure_ascii=False)))
+
+        send_json({"type": "hello", "user": user})
+        self._sockets.setdefault(user, set()).add(send_json)
+        ai_core.attach_user(user)
+        try:
+            await self._websocket_turns(reader, writer, user, send_json)
+        finally:
+            ai_core.detach_user(user)
+            sockets = self._sockets.get(user)
+            sockets.discard(send_json)
+            if not sockets:
+                self._sockets.pop(user, None)
+                if anonymous:
+                    self.forget(user, keep_session=False)
+
+    async def _websocket_turns(self, reader, writer, user, send_json):
+        while not self._stopping.is_set():
+            opcode, payload = await ws_read(reader)
+            if opcode == 0x8:
+                break
+            if opcode == 0x9:
+                writer.write(ws_frame(0xA, payload))
+                continue
+            if opcode != 0x1:
+                continue
+            try:
+                request = json.loads(payload)
+                text = (request.get("text") or "").strip()
+            except (ValueError, AttributeError):
+                request, text = {}, ""
+            if not text:
+                send_json({"type": "error", "error": "text required"})
+                continue
+
+            try:
+                reply, project_id = await self.run_turn(
+                    user, text, on_token=lambda t: send_json({"type": "token", "text": t}))
+            except Exception as e:
+                metrics.inc("server_turn_errors_total")
+                print("⚠️ Turn failed:", e)
+                send_json({"type": "error", "error": "turn failed"})
+                await writer.drain()
+                continue
+            send_json({"type": "reply", "text": reply, "project_id": project_id})
+            await writer.drain()
+            if request.get("audio"):
+                async for audio in self.synthesize_reply(reply):
+                    writer.write(ws_frame(0x2, audio))
+                    await writer.drain()
+                send_json({"type": "audio_end"})
+            await writer.drain()
+        writer.write(ws_frame(0x8, struct.pack("!H", 1001 if self._stopping.is_set() else 1000)))
+        await writer.drain()
+
+    # ---------- lifecycle ----------
+    async def serve(self):
+        self._server = await asyncio.start_server(self.handle, self.host, self.port)
+        loop = self._loop = asyncio.get_running_loop()
+        ai_core.subscribe_notices(self.push_notice)
+        ai_core.start_feed()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stopping.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C arrives as KeyboardInterrupt instead
+        print(f">>> Miss Riverdale server on http://{self.host}:{self.port}")
+        async with self._server:
+            await self._stopping.wait()
+            await self.shutdown()
+
+    async def shutdown(self):
+        """Stop accepting, let in-flight turns finish, then flush the log and sessions."""
+        print(">>> Shutting down…")
+        self._stopping.set()
+        self._server.close()
+        if self._inflight:
+            await asyncio.wait(list(self._inflight), timeout=SHUTDOWN_GRACE)
+        for writer in list(self._connections):
+            writer.close()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, ai_core.flush_memory)
+        await loop.run_in_executor(None, ai_core.SESSIONS.flush)
+        self._pool.shutdown(wait=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Miss Riverdale headless server")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--no-audio", action="store_true", help="don't synthesize speech for WebSocket clients")
+    parser.add_argument("--metrics", action="store_true", help="collect stage timings and serve GET /metrics")
+    parser.add_argument("--trace", metavar="FILE", help="append one JSON line per stage span to FILE")
+    args = parser.parse_args()
+
+    if args.metrics or args.trace:
+        metrics.enable(args.trace)
+
+    synthesize = None
+    if not args.no_audio:
+        try:
+            from voice_utils import synthesize
+        except Exception as e:
+            print("⚠️ TTS unavailable, serving text only:", e)
+    server = RiverdaleServer(args.host, args.port, args.workers, synthesize)
+    BACKENDS.start_prober()
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# session.py — Miss Riverdale: per-user conversation state kept in O(1)
+import json, os, threading, time
+from datetime import datetime
+
+SESSION_FILE = "session.json"
+DEFAULT_USER = "default"
+SAVE_INTERVAL = 0.5  # seconds between background writes of session.json
+
+
+class Session:
+    """What the next turn needs to know, so the history never has to be re-read."""
+
+    def __init__(self, user=DEFAULT_USER, project_id=None, lang_mode=None, last_intent=None, updated=None):
+        self.user = user
+        self.project_id = project_id
+        self.lang_mode = lang_mode
+        self.last_intent = last_intent
+        self.updated = updated
+
+    def record_turn(self, lang_mode, intent, project_id=None):
+        self.lang_mode = lang_mode
+        self.last_intent = intent
+        if project_id:
+            self.project_id = project_id
+        self.updated = datetime.now().isoformat()
+
+    def to_dict(self):
+        return {
+            "project_id": self.project_id,
+            "lang_mode": self.lang_mode,
+            "last_intent": self.last_intent,
+            "updated": self.updated,
+        }
+
+    @classmethod
+    def from_dict(cls, user, data):
+        return cls(user, data.get("project_id") or data.get("current_project_id"),
+                   data.get("lang_mode"), data.get("last_intent"), data.get("updated"))
+
+
+class SessionManager:
+    """
+    Sessions keyed by user, persisted together in session.json:
+        {"sessions": {"default": {"project_id": "RW00123", ...}, "tablet-2": {...}}}
+    The old single-user layout ({"project_id": ..., "current_project_id": ...})
+    is read as the default user's session.
+    """
+
+    def __init__(self, path=SESSION_FILE, save_interval=SAVE_INTERVAL):
+        self.path = path
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._transient = set()  # users whose sessions are never written (anonymous clients)
+        self._dirty = threading.Event()
+        self._writer = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        if "sessions" in data:
+            for user, state in data["sessions"].items():
+                self._sessions[user] = Session.from_dict(user, state)
+        elif data:
+            self._sessions[DEFAULT_USER] = Session.from_dict(DEFAULT_USER, data)
+
+    def get(self, user=DEFAULT_USER, persist=True):
+        """The user's session, created on first use; persist=False keeps a new one out of session.json."""
+        with self._lock:
+            session = self._sessions.get(user)
+            if session is None:
+                session = self._sessions[user] = Session(user)
+                if not persist:
+                    self._transient.add(user)
+            return session
+
+    def discard(self, user):
+        """Forget a user's session; a persisted one leaves session.json at the next write."""
+        with self._lock:
+            self._sessions.pop(user, None)
+            if user in self._transient:
+                self._transient.discard(user)
+                return
+        self.save()
+
+    def users(self):
+        with self._lock:
+            return list(self._sessions)
+
+    def find(self, user):
+        """The user's session if there is one (unlike get(), never creates it)."""
+        return self._sessions.get(user)
+
+    def save(self):
+        """
+        Mark sessions dirty; a background thread writes them at most every
+        `save_interval` seconds, so turns never wait on the file.
+        """
+        self._dirty.set()
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                    self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            self._dirty.wait()
+            time.sleep(self.save_interval)
+            self._dirty.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every session atomically now (cost grows with users, not with history)."""
+        with self._lock:
+            data = {"sessions": {user: s.to_dict() for user, s in self._sessions.items()
+                                 if user not in self._transient}}
+            tmp = f"{self.path}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                os.replace(tmp, self.path)
+            except Exception as e:
+                print("⚠️ Error saving session:", e)
@@ -0,0 +1,192 @@
+# stt.py — Miss Riverdale: parallel dual-language speech recognition
+import hashlib, threading, time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+from backends import BACKENDS
+
+LANGUAGES = {"en": ("en-IN",), "hi": ("hi-IN",), "auto": ("en-IN", "hi-IN")}
+EARLY_ACCEPT = 0.85        # a result this confident wins without waiting for the other language
+PHRASE_TIME_LIMIT = 8      # seconds, upper bound for one utterance
+PAUSE_THRESHOLD = 0.8      # seconds of silence that end an utterance (speech_recognition's default)
+CALIBRATION_TTL = 300      # seconds before the ambient-noise profile is re-measured
+CALIBRATION_SECONDS = 0.5
+
+Hypothesis = namedtuple("Hypothesis", "text confidence language")
+
+
+class BackendError(Exception):
+    """The recognizer could not be reached or refused the request."""
+
+
+# ---------------- BACKENDS ----------------
+class GoogleBackend:
+    """speech_recognition's free Google Web Speech endpoint, behind the "stt" breaker."""
+
+    name = "google"
+
+    def __init__(self, recognizer=None):
+        import speech_recognition as sr
+        self._sr = sr
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def recognize(self, audio, language):
+        breaker = BACKENDS["stt"]
+        if not breaker.allow():
+            raise BackendError("Google speech recognition is offline")
+        try:
+            result = self.recognizer.recognize_google(audio, language=language, show_all=True)
+        except self._sr.RequestError as e:
+            breaker.record_failure()
+            raise BackendError(str(e)) from e
+        except self._sr.UnknownValueError:
+            breaker.record_success()
+            return None
+        breaker.record_success()
+        alternatives = result.get("alternative") if isinstance(result, dict) else None
+        if not alternatives:
+            return None
+        best = alternatives[0]
+        # Google only scores the top alternative, and not always
+        return Hypothesis(best.get("transcript", ""), float(best.get("confidence", 0.5)), language)
+
+
+def _audio_key(audio):
+    if hasattr(audio, "get_raw_data"):
+        return hashlib.sha1(audio.get_raw_data()).hexdigest()
+    return audio
+
+
+class StubBackend:
+    """
+    Offline recognizer for tests and benchmarks.
+    `transcripts` maps an audio key (sha1 of the raw samples, or any plain key)
+    to {language: (text, confidence)}; `latency` is seconds per language.
+    """
+
+    name = "stub"
+
+    def __init__(self, transcripts, latency=None, fail=()):
+        self.transcripts = transcripts
+        self.latency = latency or {}
+        self.fail = set(fail)  # languages that raise BackendError
+        self.calls = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_fixtures(cls, fixtures, **kwargs):
+        """fixtures: {"fixtures/namaste.wav": {"hi-IN": ("नमस्ते", 0.93), "en-IN": ("namaste", 0.61)}}"""
+        return cls({_audio_key(load_wav(path)): results for path, results in fixtures.items()}, **kwargs)
+
+    def recognize(self, audio, language):
+        with self._lock:
+            self.calls.append(language)
+        time.sleep(self.latency.get(language, 0.0))
+        if language in self.fail:
+            raise BackendError(f"{language} unavailable")
+        result = self.transcripts.get(_audio_key(audio), {}).get(language)
+        return Hypothesis(result[0], result[1], language) if result else None
+
+
+def load_wav(path):
+    """Recorded WAV fixture -> AudioData, the same type the microphone produces."""
+    import speech_recognition as sr
+    with sr.AudioFile(path) as source:
+        return sr.Recognizer().record(source)
+
+
+# ---------------- PIPELINE ----------------
+class RecognitionPipeline:
+    """
+    Capture once, recognize in every candidate language at the same time and keep
+    the most confident transcript. A confident early result stops the wait for the
+    slower language. The ambient-noise calibration is reused for CALIBRATION_TTL.
+    """
+
+    def __init__(self, backend=None, early_accept=EARLY_ACCEPT, phrase_time_limit=PHRASE_TIME_LIMIT,
+                 calibration_ttl=CALIBRATION_TTL, pause_threshold=PAUSE_THRESHOLD):
+        self._backend = backend
+        self.early_accept = early_accept
+        self.phrase_time_limit = phrase_time_limit
+        self.pause_threshold = pause_threshold
+        self.calibration_ttl = calibration_ttl
+        self.last_error = None
+        self._recognizer = None
+        self._calibrated_at = None
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="stt")
+        self._capture_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mic")
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = GoogleBackend(self.recognizer)
+        return self._backend
+
+    @property
+    def recognizer(self):
+        if self._recognizer is None:
+            import speech_recognition as sr
+            self._recognizer = sr.Recognizer()
+            self._recognizer.pause_threshold = self.pause_threshold
+        return self._recognizer
+
+    def calibrate(self, source, force=False):
+        now = time.monotonic()
+        if force or self._calibrated_at is None or now - self._calibrated_at > self.calibration_ttl:
+            with metrics.span("listen.calibrate"):
+                self.recognizer.adjust_for_ambient_noise(source, duration=CALIBRATION_SECONDS)
+            self._calibrated_at = now
+
+    def capture(self):
+        import speech_recognition as sr
+        with sr.Microphone() as source:
+            self.calibrate(source)
+            print("🎤 Listening…")
+            with metrics.span("listen.capture"):
+                return self.recognizer.listen(source, phrase_time_limit=self.phrase_time_limit)
+
+    def transcribe(self, audio, language_mode="auto"):
+        """Best Hypothesis across the mode's languages, or None."""
+        with metrics.span("listen.transcribe", mode=language_mode) as stage:
+            best = self._transcribe(audio, language_mode)
+            stage.set(language=best.language if best else None)
+        if best is None:
+            metrics.inc("stt_failures_total", reason="error" if self.last_error else "no_match")
+        return best
+
+    def _transcribe(self, audio, language_mode):
+        futures = {self._pool.submit(self.backend.recognize, audio, lang)
+                   for lang in LANGUAGES.get(language_mode, LANGUAGES["auto"])}
+        best, errors = None, []
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    hypothesis = future.result()
+                except BackendError as e:
+                    errors.append(e)
+                    metrics.inc("stt_backend_errors_total")
+                    continue
+                if hypothesis and hypothesis.text and (best is None or hypothesis.confidence > best.confidence):
+                    best = hypothesis
+            if best and best.confidence >= self.early_accept:
+                # Only drops a request still queued behind the pool: a recognition that has
+                # started runs to completion on its worker (neither backend can abort a call
+                # in flight) and its result is discarded; we just stop waiting for it.
+                for future in futures:
+                    future.cancel()
+                break
+        self.last_error = errors[0] if errors and best is None else None
+        return best
+
+    def listen(self, language_mode="auto"):
+        with metrics.span("listen"):
+            hypothesis = self.transcribe(self.capture(), language_mode)
+        if hypothesis is None and self.last_error:
+            print("⚠️ STT error:", self.last_error)
+        return hypothesis.text if hypothesis else ""
+
+    def listen_async(self, language_mode="auto"):
+        """Capture and recognize off the caller's thread; returns a Future of the text."""
+        return self._capture_pool.submit(self.listen, language_mode)
@@ -0,0 +1,213 @@
+# transcript.py — Miss Riverdale: thread-safe, bounded chat transcript for the Tk window
+import collections, queue, threading, time
+
+MAX_MESSAGES = 300   # messages kept in the widget; older ones are dropped from the top
+PAGE_SIZE = 50       # older messages loaded each time the user scrolls to the top
+MAX_PAGED = 1000     # paged-in history on top of MAX_MESSAGES before paging stops
+FRAME_MS = 33        # queue drain interval (~30 fps)
+MAX_BATCH = 2000     # updates applied per frame; the rest wait for the next one
+CHAT_ROLES = {"user": "You", "assistant": "Miss Riverdale"}
+
+
+def older_messages(store, skip, limit):
+    """
+    Up to `limit` chat messages from the conversation log that precede the newest
+    `skip` ones, as (sender, text) oldest first. System entries don't count.
+    """
+    n = max(64, (skip + limit) * 2)
+    while True:
+        entries = store.tail(n)
+        chat = [(CHAT_ROLES[e["role"]], e["content"]) for e in entries
+                if e.get("role") in CHAT_ROLES and e.get("content")]
+        if len(chat) >= skip + limit or len(entries) < n:
+            break
+        n *= 2
+    end = max(0, len(chat) - skip)
+    return chat[max(0, end - limit):end]
+
+
+class TranscriptView:
+    """
+    Owns the chat ScrolledText. post()/begin_stream()/stream_token()/end_stream()/call()
+    may be used from any thread: they only queue an update, and the Tk main loop
+    applies everything queued every FRAME_MS in one batch (consecutive stream tokens
+    become one insert). The widget keeps at most MAX_MESSAGES messages; scrolling to
+    the top pages older ones in from `history(skip, limit)` on a background thread.
+    """
+
+    def __init__(self, root, text, history=None, max_messages=MAX_MESSAGES, page_size=PAGE_SIZE,
+                 frame_ms=FRAME_MS):
+        self.root = root
+        self.text = text
+        self.history = history
+        self.max_messages = max_messages
+        self.page_size = page_size
+        self.frame_ms = frame_ms
+        self.stats = collections.Counter()
+        self.frame_times = collections.deque(maxlen=10_000)  # seconds spent applying each batch
+        self._updates = queue.SimpleQueue()
+        self._messages = collections.deque()  # (mark, logged), oldest first
+        self._seq = 0
+        self._streaming = False
+        self._paging = False
+        self._paged = 0         # messages paged in on top of max_messages (the trim allowance)
+        self._history_done = history is None
+        self._user_scrolled = False
+
+        self._scrollbar_set = getattr(text, "vbar", None) and text.vbar.set
+        text.config(yscrollcommand=self._on_scroll)
+        for event in ("<MouseWheel>", "<Button-4>", "<Prior>"):
+            text.bind(event, self._on_user_scroll, add="+")
+        if getattr(text, "vbar", None):
+            text.vbar.bind("<ButtonPress-1>", self._on_user_scroll, add="+")
+        root.after(frame_ms, self._drain)
+
+    # ---------- any thread ----------
+    def post(self, sender, message, logged=True):
+        """Queue a whole message. logged=False for notices that are not in the conversation log."""
+        self._updates.put(("message", sender, message, logged))
+
+    def begin_stream(self, sender="Miss Riverdale"):
+        self._updates.put(("begin", sender))
+
+    def stream_token(self, token):
+        self._updates.put(("token", token))
+
+    def end_stream(self):
+        self._updates.put(("end",))
+
+    def call(self, fn, *args):
+        """Run fn(*args) on the Tk thread with the next batch (status label updates etc.)."""
+        self._updates.put(("call", fn, args))
+
+    # ---------- Tk thread ----------
+    def _drain(self):
+        try:
+            self._apply_batch()
+        finally:
+            self.root.after(self.frame_ms, self._drain)
+
+    def _apply_batch(self):
+        batch = []
+        try:
+            while len(batch) < MAX_BATCH:
+                batch.append(self._updates.get_nowait())
+        except queue.Empty:
+            pass
+        if not batch:
+            return
+        t0 = time.perf_counter()
+        follow = self.text.yview()[1] >= 0.999  # only auto-scroll when already at the bottom
+        self.text.config(state="normal")
+        try:
+            tokens = []
+            for update in batch:
+                kind = update[0]
+                if kind == "token":
+                    tokens.append(update[1])
+                    continue
+                if tokens:
+                    self._insert_end("".join(tokens))
+                    self.stats["token_inserts"] += 1
+                    tokens = []
+                if kind == "message":
+                    _, sender, message, logged = update
+                    self._new_message(f"{sender}: {message}\n\n", logged)
+                elif kind == "begin":
+                    self._new_message(f"{update[1]}: ", True)
+                    self._streaming = True
+                elif kind == "end":
+                    if self._streaming:
+                        self._insert_end("\n\n")
+                    self._streaming = False
+                elif kind == "older":
+                    self._prepend(update[1])
+                elif kind == "call":
+                    update[1](*update[2])
+            if tokens:
+                self._insert_end("".join(tokens))
+                self.stats["token_inserts"] += 1
+            self._trim()
+        finally:
+            self.text.config(state="disabled")
+        if follow:
+            self.text.yview("end")
+        self.stats["frames"] += 1
+        self.stats["updates"] += len(batch)
+        self.frame_times.append(time.perf_counter() - t0)
+
+    def _insert_end(self, chunk):
+        self.text.insert("end", chunk)
+
+    def _new_message(self, chunk, logged):
+        start = self.text.index("end-1c")
+        self.text.insert("end", chunk)
+        self._mark(start, logged, at_top=False)
+
+    def _mark(self, index, logged, at_top):
+        self._seq += 1
+        name = f"msg{self._seq}"
+        self.text.mark_set(name, index)
+        self.text.mark_gravity(name, "right")  # text prepended at "1.0" pushes it along
+        if at_top:
+            self._messages.appendleft((name, logged))
+        else:
+            self._messages.append((name, logged))
+
+    def _prepend(self, messages):
+        """Insert older (sender, text) pairs above everything shown, oldest first."""
+        for sender, message in reversed(messages):
+            self.text.insert("1.0", f"{sender}: {message}\n\n")
+            self._mark("1.0", True, at_top=True)
+        self._paged += len(messages)
+        self._paging = False
+        self.stats["paged"] += len(messages)
+
+    def _trim(self):
+        """
+        Drop messages from the top past max_messages plus the paged-in allowance.
+        Paged-in history sits on top, so new messages push it out one row each;
+        the allowance itself stays until more is paged in, so the rest of the page
+        is still there for the user reading it.
+        """
+        excess = len(self._messages) - (self.max_messages + self._paged)
+        if excess <= 0:
+            return
+        drop = [self._messages.popleft() for _ in range(min(excess, len(self._messages) - 1))]
+        self.text.delete("1.0", self._messages[0][0])
+        for name, _ in drop:
+            self.text.mark_unset(name)
+        self.stats["trimmed"] += len(drop)
+
+    # ---------- paging ----------
+    def _on_user_scroll(self, event=None):
+        self._user_scrolled = True
+
+    def _on_scroll(self, first, last):
+        if self._scrollbar_set:
+            self._scrollbar_set(first, last)
+        if self._user_scrolled and float(first) <= 0.0:
+            self._user_scrolled = False
+            self.load_older()
+
+    def load_older(self):
+        """Page the next PAGE_SIZE older messages in from the conversation log (Tk thread)."""
+        if self._paging or self._history_done or self._paged >= MAX_PAGED:
+            return
+        self._paging = True
+        # Everything logged that is still on screen is newer than what we want next
+        skip = sum(1 for _, logged in self._messages if logged) - (1 if self._streaming else 0)
+        threading.Thread(target=self._fetch_older, args=(skip,), daemon=True).start()
+
+    def _fetch_older(self, skip):
+        try:
+            messages = self.history(skip, self.page_size)
+        except Exception as e:
+            print("⚠️ History page error:", e)
+            messages = []
+        if len(messages) < self.page_size:
+            self._history_done = True
+        self._updates.put(("older", messages))
+
+    def __len__(self):
+        return len(self._messages)
@@ -0,0 +1,192 @@
+# tts_cache.py — Miss Riverdale: content-addressed, size-bounded TTS audio cache
+import argparse, collections, hashlib, json, os, threading
+
+import metrics
+
+CACHE_DIR = "tts_cache"
+MAX_BYTES = 64 * 1024 * 1024
+LANG_MODES = ("hindi", "hinglish", "english")
+
+
+def cache_key(phrase, lang, engine="gtts", settings=None):
+    """Stable key for one rendered phrase; any change to voice settings is a new entry."""
+    raw = json.dumps([phrase, lang, engine, settings or {}], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Rendered audio on disk, one file per key, evicted least-recently-used
+    once the directory grows past `max_bytes`. Recency survives restarts via mtime.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = collections.Counter()
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key -> size, oldest first
+        self._bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".mp3")
+
+    def _load_index(self):
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+            elif name.endswith(".mp3"):
+                st = os.stat(path)
+                found.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._bytes += size
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.stats["misses"] += 1
+                metrics.inc("tts_cache_requests_total", result="miss")
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+        metrics.inc("tts_cache_requests_total", result="hit")
+        try:
+            path = self._path(key)
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path)
+            return audio
+        except OSError:
+            with self._lock:
+                self._bytes -= self._entries.pop(key, 0)
+                self.stats["hits"] -= 1
+                self.stats["misses"] += 1
+            return None
+
+    def put(self, key, audio):
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(audio)
+        os.replace(tmp, path)
+        with self._lock:
+            self._bytes += len(audio) - self._entries.pop(key, 0)
+            self._entries[key] = len(audio)
+            self.stats["writes"] += 1
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                old, size = self._entries.popitem(last=False)
+                self._bytes -= size
+                self.stats["evictions"] += 1
+                try:
+                    os.remove(self._path(old))
+                except OSError:
+                    pass
+
+    def wrap(self, synthesize, engine="gtts", settings=None):
+        """Return synthesize(phrase, lang) that serves from and fills this cache."""
+        def cached(phrase, lang):
+            key = cache_key(phrase, lang, engine, settings)
+            audio = self.get(key)
+            if audio is None:
+                audio = synthesize(phrase, lang)
+                self.put(key, audio)
+            return audio
+        return cached
+
+    def info(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+                **self.stats,
+            }
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._bytes = 0
+
+
+# ---------------- WARM-UP ----------------
+def static_replies():
+    """Every fixed reply Miss Riverdale can give, as (text, lang_mode) pairs."""
+    from ai_core import JOKES, LOCAL_REPLIES, PROJECTS, construction_reply
+
+    for replies in LOCAL_REPLIES.values():
+        for lang_mode in LANG_MODES:
+            yield replies[lang_mode], lang_mode
+    for lang_mode in LANG_MODES:
+        for joke in JOKES[lang_mode]:
+            yield joke, lang_mode
+    # Project summaries and per-task status lines
+    for project_id, project in PROJECTS.items():
+        tasks = list(project.get("in_progress", {})) + project.get("completed", []) + project.get("pending", [])
+        for lang_mode in LANG_MODES:
+            yield construction_reply(project_id, "", lang_mode), lang_mode
+            for task in tasks:
+                yield construction_reply(project_id, task, lang_mode), lang_mode
+
+
+def warm():
+    """
+    Pre-render every static phrase so common replies play without synthesis (or network).
+    A phrase that fails is counted and skipped; once the gtts breaker opens the run stops,
+    since every remaining phrase would fail the same way. Returns (rendered, failed).
+    """
+    import voice_utils
+    from backends import BackendUnavailable
+
+    def phrases():
+        for text, _ in static_replies():
+            lang = "hi" if voice_utils._is_hindi_text(text) else "en"
+            for phrase in voice_utils._split_phrases(text.strip()):
+                if phrase.strip():
+                    yield phrase.strip(), lang
+
+    rendered = failed = 0
+    for phrase, lang in phrases():
+        try:
+            voice_utils.synthesize(phrase, lang)
+            rendered += 1
+        except BackendUnavailable as e:
+            failed += 1
+            print("⚠️ Stopping warm-up:", e)
+            break
+        except Exception as e:
+            failed += 1
+            print(f"⚠️ Could not render {phrase[:40]!r}:", e)
+    info = voice_utils.audio_cache().info()
+    print(f"Warmed {rendered} phrases, {failed} failed — {info['entries']} cached, "
+          f"{info.get('hits', 0)} already present, {info['bytes'] / 1024:.0f} KiB on disk")
+    return rendered, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Miss Riverdale TTS audio cache")
+    parser.add_argument("cmd", choices=["warm", "stats", "clear"])
+    args = parser.parse_args()
+
+    if args.cmd == "warm":
+        if warm()[1]:
+            raise SystemExit(1)
+    elif args.cmd == "stats":
+        print(json.dumps(AudioCache().info(), indent=2))
+    elif args.cmd == "clear":
+        AudioCache().clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# turn_queue.py — Miss Riverdale: serialized turn pipeline for chat and voice requests
+import collections, queue, threading
+
+MAX_PENDING_PER_SESSION = 8  # queued-but-unanswered messages before we push back
+WORKERS = 2
+
+
+class TurnScheduler:
+    """
+    Runs chat turns off the UI thread.
+    - One bounded FIFO per session; a session is handled by at most one worker at a time,
+      so turns for the same user run strictly in the order they were sent
+    - Repeated identical messages still waiting in the queue are coalesced
+    - Speech goes through a single "latest reply wins" slot so TTS never falls behind
+    `submit` never blocks; it returns False when the session is saturated.
+    """
+
+    def __init__(self, handler, on_reply=None, on_speak=None,
+                 workers=WORKERS, max_pending=MAX_PENDING_PER_SESSION):
+        self.handler = handler          # handler(session_id, text) -> reply
+        self.on_reply = on_reply        # on_reply(session_id, text, reply)
+        self.on_speak = on_speak        # on_speak(reply), blocking is fine
+        self.max_pending = max_pending
+        self.stats = collections.Counter()
+
+        self._lock = threading.Lock()
+        self._pending = {}              # session_id -> deque of texts
+        self._busy = set()              # sessions a worker currently owns
+        self._ready = queue.Queue()     # session ids with work and no owner
+        self._idle = threading.Condition(self._lock)
+        self._closed = False
+
+        self._speech = None
+        self._speech_cv = threading.Condition()
+
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for t in self._workers:
+            t.start()
+        if on_speak:
+            threading.Thread(target=self._speak_loop, daemon=True).start()
+
+    # ---------- producer side ----------
+    def submit(self, session_id, text):
+        with self._lock:
+            if self._closed:
+                return False
+            pending = self._pending.setdefault(session_id, collections.deque())
+            if pending and pending[-1] == text:
+                self.stats["coalesced"] += 1
+                return True
+            if len(pending) >= self.max_pending:
+                self.stats["rejected"] += 1
+                return False
+            pending.append(text)
+            self.stats["submitted"] += 1
+            if session_id not in self._busy:
+                self._busy.add(session_id)
+                self._ready.put(session_id)
+        return True
+
+    def pending(self, session_id):
+        with self._lock:
+            return len(self._pending.get(session_id, ()))
+
+    # ---------- worker side ----------
+    def _work(self):
+        while True:
+            session_id = self._ready.get()
+            if session_id is None:
+                return
+            with self._lock:
+                text = self._pending[session_id].popleft()
+            try:
+                reply = self.handler(session_id, text)
+                with self._lock:
+                    self.stats["completed"] += 1
+                if self.on_reply:
+                    self.on_reply(session_id, text, reply)
+                if self.on_speak and reply:
+                    self._queue_speech(reply)
+            except Exception as e:
+                with self._lock:
+                    self.stats["failed"] += 1
+                print("⚠️ Turn failed:", e)
+            with self._lock:
+                if self._pending[session_id]:
+                    self._ready.put(session_id)
+                else:
+                    self._busy.discard(session_id)
+                    del self._pending[session_id]
+                    self._idle.notify_all()
+
+    def _queue_speech(self, reply):
+        with self._speech_cv:
+            if self._speech is not None:
+                self.stats["speech_skipped"] += 1
+            self._speech = reply
+            self._speech_cv.notify()
+
+    def _speak_loop(self):
+        while True:
+            with self._speech_cv:
+                while self._speech is None:
+                    self._speech_cv.wait()
+                reply, self._speech = self._speech, None
+            try:
+                self.on_speak(reply)
+            except Exception as e:
+                print("⚠️ Speech failed:", e)
+
+    # ---------- lifecycle ----------
+    def join(self, timeout=None):
+        """Wait until every submitted turn has been handled."""
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._busy, timeout)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self.join()
+        for _ in self._workers:
+            self._ready.put(None)
@@ -1,18 +1,31 @@
 # voice_utils.py — Miss Riverdale: Expressive, Natural Bilingual Voice
-import speech_recognition as sr
-import pyttsx3
-from gtts import gTTS
-import tempfile, os, uuid, time, re, random
-import pygame
-
-# ---------- Initialize offline engine ----------
-_engine = pyttsx3.init()
-_engine.setProperty("rate", 300)
-voices = _engine.getProperty("voices")
-if len(voices) > 1:
-    _engine.setProperty("voice", voices[1].id)  # female if available
-else:
-    _engine.setProperty("voice", voices[0].id)
+# pyttsx3, gTTS and pygame are imported on first use so the GUI can paint first
+import io, threading, re, random
+from playback import PlaybackEngine
+from tts_cache import AudioCache
+from stt import RecognitionPipeline
+from backends import BACKENDS
+import metrics
+
+# ---------- Offline engine (created on first use) ----------
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def _offline_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            import pyttsx3
+            engine = pyttsx3.init()
+            engine.setProperty("rate", 300)
+            voices = engine.getProperty("voices")
+            if len(voices) > 1:
+                engine.setProperty("voice", voices[1].id)  # female if available
+            else:
+                engine.setProperty("voice", voices[0].id)
+            _engine = engine
+    return _engine
 
 
 def _is_hindi_text(text: str) -> bool:
@@ -51,87 +64,174 @@ def _pause_for_punctuation(punct):
     }.get(punct, random.uniform(0.3, 0.6))
 
 
+# ---------- Playback pipeline ----------
+_mixer_lock = threading.Lock()
+_mixer_ready = False
+_speech_rate = 1.0
+
+
+def _ensure_mixer():
+    """Import pygame and initialize its mixer once for the whole process."""
+    global _mixer_ready
+    import pygame
+    with _mixer_lock:
+        if not _mixer_ready:
+            with metrics.span("speak.mixer_init"):
+                pygame.mixer.init()
+            _mixer_ready = True
+    return pygame
+
+
+def _synthesize_gtts(phrase: str, lang: str) -> bytes:
+    """gTTS through the "gtts" breaker: while it is open this raises at once and
+    the playback engine switches to pyttsx3 without waiting on the network."""
+    from gtts import gTTS
+
+    def render():
+        buf = io.BytesIO()
+        with metrics.span("tts.gtts", lang=lang):
+            gTTS(text=phrase, lang=lang, slow=False).write_to_fp(buf)
+        return buf.getvalue()
+    return BACKENDS["gtts"].call(render)
+
+
+# Repeated phrases (templates, status lines) play straight from disk. The cache (and its
+# directory) is opened on the first synthesis, not when this module is imported.
+_audio_cache = None
+_cached_gtts = None
+_audio_cache_lock = threading.Lock()
+
+
+def audio_cache():
+    global _audio_cache, _cached_gtts
+    with _audio_cache_lock:
+        if _audio_cache is None:
+            _audio_cache = AudioCache()
+            _cached_gtts = _audio_cache.wrap(_synthesize_gtts, engine="gtts", settings={"slow": False})
+    return _audio_cache
+
+
+def synthesize(phrase: str, lang: str) -> bytes:
+    """gTTS audio for one phrase, from the audio cache when it was rendered before."""
+    if _cached_gtts is None:
+        audio_cache()
+    return _cached_gtts(phrase, lang)
+
+
+def _play_pygame(audio: bytes, cancel):
+    pygame = _ensure_mixer()
+    with metrics.span("speak.play"):
+        pygame.mixer.music.load(io.BytesIO(audio), "mp3")
+        pygame.mixer.music.set_volume(random.uniform(0.87, 1.0))
+        pygame.mixer.music.play()
+        while pygame.mixer.music.get_busy():
+            if cancel.wait(0.1 * _speech_rate):
+                pygame.mixer.music.stop()
+                break
+        pygame.mixer.music.unload()
+
+
+def _speak_offline(phrase: str):
+    metrics.inc("tts_fallbacks_total", engine="pyttsx3")
+    try:
+        engine = _offline_engine()
+        engine.say(phrase)
+        engine.runAndWait()
+    except Exception as e:
+        print("⚠️ pyttsx3 error:", e)
+
+
+def _pause(phrase):
+    seconds = _pause_for_punctuation(phrase[-1] if phrase else "")
+    metrics.inc("speech_pause_seconds_total", seconds)
+    return seconds
+
+
+playback = PlaybackEngine(
+    synthesize=synthesize,
+    play=_play_pygame,
+    fallback=_speak_offline,
+    pause=_pause,
+)
+
+
+def _record_playback(result):
+    if result is not None and metrics.enabled():
+        if result.time_to_first_audio is not None:
+            metrics.observe("speech_first_audio_seconds", result.time_to_first_audio)
+        for gap in result.gaps:
+            metrics.observe("speech_gap_seconds", gap)
+    return result
+
+
+def warm_up():
+    """
+    Create the speech engines ahead of the first reply (call from a background
+    thread once the window is up). Failures are left for first use to report.
+    """
+    for step in (_ensure_mixer, _offline_engine, lambda: __import__("gtts"), lambda: recognition.recognizer):
+        try:
+            step()
+        except Exception as e:
+            print("⚠️ Voice warm-up:", e)
+
+
+def cancel_speech():
+    """Interrupt whatever Miss Riverdale is currently saying."""
+    playback.cancel()
+
+
 def speak(text: str):
     """
     Speak text with natural pacing and emotion.
     - Slows down politely for greetings
     - Adds pauses for punctuation
     - Slight tone variation for realism
+    The next phrases are synthesized while the current one plays; returns PlaybackMetrics.
     """
+    global _speech_rate
     text = text.strip()
     if not text:
-        return
+        return None
 
     lang = "hi" if _is_hindi_text(text) else "en"
-    phrases = _split_phrases(text)
 
     # emotional rate adjustment
     if any(g in text.lower() for g in ["namaste", "hello", "good morning", "hi"]):
-        speech_rate = 0.95
+        _speech_rate = 0.95
     elif any(q in text for q in ["?", "why", "how", "kya", "kyon"]):
-        speech_rate = 1.05
+        _speech_rate = 1.05
     else:
-        speech_rate = 1.0
+        _speech_rate = 1.0
 
-    try:
-        for phrase in phrases:
-            phrase = phrase.strip()
-            if not phrase:
-                continue
+    with metrics.span("speak", lang=lang):
+        return _record_playback(playback.speak(_split_phrases(text), lang))
 
-            filename = os.path.join(tempfile.gettempdir(), f"riverdale_{uuid.uuid4().hex}.mp3")
-            tts = gTTS(text=phrase, lang=lang, slow=False)
-            tts.save(filename)
 
-            pygame.mixer.init()
-            pygame.mixer.music.load(filename)
-            pygame.mixer.music.set_volume(random.uniform(0.87, 1.0))
-            pygame.mixer.music.play()
-
-            while pygame.mixer.music.get_busy():
-                time.sleep(0.1 * speech_rate)
+def speak_stream(sentences):
+    """
+    Speak sentences as they arrive (e.g. a SentenceStream filled by a streaming LLM reply),
+    so speech starts before the full reply exists. Blocks until the stream closes.
+    """
+    def phrases():
+        for sentence in sentences:
+            lang = "hi" if _is_hindi_text(sentence) else "en"
+            for phrase in _split_phrases(sentence.strip()):
+                yield phrase, lang
 
-            pygame.mixer.music.unload()
-            pygame.mixer.quit()
-            if os.path.exists(filename):
-                os.remove(filename)
+    with metrics.span("speak", streamed=True):
+        return _record_playback(playback.speak(phrases()))
 
-            # pause depending on punctuation
-            last_char = phrase[-1] if phrase else ""
-            time.sleep(_pause_for_punctuation(last_char))
 
-    except Exception as e:
-        print(f"⚠️ gTTS failed ({e}) — switching to offline voice.")
-        try:
-            for phrase in phrases:
-                _engine.say(phrase)
-                _engine.runAndWait()
-                time.sleep(_pause_for_punctuation(phrase[-1] if phrase else "."))
-        except Exception as e:
-            print("⚠️ pyttsx3 error:", e)
+# ---------- Speech recognition ----------
+# One pipeline for the process: noise calibration is reused, en-IN and hi-IN run in parallel
+recognition = RecognitionPipeline()
 
 
 def listen(language_mode="auto"):
     """
     Listen and transcribe speech using Google STT.
+    In auto mode English and Hindi are recognized concurrently and the more
+    confident transcript wins.
     """
-    r = sr.Recognizer()
-    with sr.Microphone() as source:
-        print("🎤 Listening…")
-        r.adjust_for_ambient_noise(source, duration=0.5)
-        audio = r.listen(source, phrase_time_limit=8)
-    try:
-        if language_mode == "en":
-            return r.recognize_google(audio, language="en-IN")
-        elif language_mode == "hi":
-            return r.recognize_google(audio, language="hi-IN")
-        else:
-            try:
-                return r.recognize_google(audio, language="en-IN")
-            except Exception:
-                return r.recognize_google(audio, language="hi-IN")
-    except sr.UnknownValueError:
-        return ""
-    except sr.RequestError as e:
-        print("⚠️ STT error:", e)
-        return ""
+    return recognition.listen(language_mode)